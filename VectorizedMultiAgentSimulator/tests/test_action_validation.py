@@ -0,0 +1,57 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+from vmas import make_env
+
+
+class TestActionValidation(unittest.TestCase):
+    def setup_env(self, **kwargs):
+        self.n_envs = 4
+        self.env = make_env(
+            scenario="simple_reference",
+            num_envs=self.n_envs,
+            device="cpu",
+            continuous_actions=True,
+            seed=0,
+            **kwargs,
+        )
+
+    def actions(self, scale: float = 1.0):
+        return [
+            torch.rand(self.n_envs, self.env.get_agent_action_size(agent)) * scale
+            for agent in self.env.agents
+        ]
+
+    def test_strict(self):
+        self.setup_env()
+        self.env.step(self.actions())
+        with self.assertRaises(AssertionError):
+            self.env.step(self.actions(scale=2.0))
+
+    def test_deferred(self):
+        self.setup_env(action_validation="deferred", validation_interval=3)
+        self.env.step(self.actions(scale=2.0))
+        self.env.step(self.actions())
+        # actions are clamped until the violation is reported
+        for agent in self.env.agents:
+            self.assertTrue((agent.action.c <= 1).all())
+        with self.assertRaises(AssertionError):
+            self.env.step(self.actions())
+        # flags are cleared after being reported
+        for _ in range(3):
+            self.env.step(self.actions())
+
+    def test_off(self):
+        self.setup_env(action_validation="off")
+        for _ in range(5):
+            self.env.step(self.actions(scale=2.0))
+        for agent in self.env.agents:
+            self.assertTrue((agent.action.c <= 1).all())
+            self.assertTrue((agent.action.u.abs() <= agent.u_range).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+
+from vmas.simulator.core import Agent, Box, Landmark, Sphere, World
+
+
+class TestBroadPhase(unittest.TestCase):
+    def test_candidates(self):
+        world = World(batch_dim=3, device=torch.device("cpu"))
+        for i in range(3):
+            world.add_agent(Agent(name=f"agent_{i}", shape=Sphere(radius=0.1)))
+        world.add_landmark(Landmark(name="box", shape=Box(length=0.4, width=0.4)))
+        world.add_landmark(Landmark(name="ghost", collide=False))
+        # agent_0 and agent_1 touch in env 2 only, agent_2 is always on the box
+        world.agents[0].set_pos(torch.tensor([[0.0, 0.0]] * 3), batch_index=None)
+        world.agents[1].set_pos(
+            torch.tensor([[1.0, 0.0], [0.0, 1.0], [0.15, 0.0]]), batch_index=None
+        )
+        world.agents[2].set_pos(torch.tensor([[5.0, 5.0]] * 3), batch_index=None)
+        world.landmarks[0].set_pos(torch.tensor([[5.2, 5.0]] * 3), batch_index=None)
+        world.landmarks[1].set_pos(torch.tensor([[0.0, 0.0]] * 3), batch_index=None)
+
+        entities = world.entities
+        pairs = [
+            (a, b)
+            for a in range(len(entities))
+            for b in range(a + 1, len(entities))
+            if world._can_collide(entities[a], entities[b])
+        ]
+        candidates = world._get_collision_candidates(pairs)
+        self.assertEqual(
+            {frozenset({entities[a].name, entities[b].name}) for a, b in candidates},
+            {frozenset({"agent_0", "agent_1"}), frozenset({"agent_2", "box"})},
+        )
+        for a, b in pairs:
+            self.assertEqual(
+                (a, b) in candidates, world.collides(entities[a], entities[b])
+            )
+
+
+class TestInteractionPairs(unittest.TestCase):
+    @staticmethod
+    def expected_pairs(world):
+        entities = world.entities
+        sphere_pairs, other_pairs = [], []
+        for a in range(len(entities)):
+            for b in range(a + 1, len(entities)):
+                if not world._can_collide(entities[a], entities[b]):
+                    continue
+                if isinstance(entities[a].shape, Sphere) and isinstance(
+                    entities[b].shape, Sphere
+                ):
+                    sphere_pairs.append((a, b))
+                else:
+                    other_pairs.append((a, b))
+        return sphere_pairs, other_pairs
+
+    def test_cache_invalidation(self):
+        world = World(batch_dim=2, device=torch.device("cpu"))
+        for i in range(3):
+            world.add_agent(Agent(name=f"agent_{i}", shape=Sphere(radius=0.1)))
+        world.add_landmark(Landmark(name="box", shape=Box(length=0.4, width=0.4)))
+        self.assertEqual(world._get_interaction_pairs(), self.expected_pairs(world))
+
+        # collision filters are checked again at every call
+        blocked = {"agent_1"}
+        world.agents[0].collision_filter = lambda e: e.name not in blocked
+        self.assertEqual(world._get_interaction_pairs(), self.expected_pairs(world))
+        blocked.clear()
+        self.assertEqual(world._get_interaction_pairs(), self.expected_pairs(world))
+
+        world.agents[2]._collide = False
+        self.assertEqual(world._get_interaction_pairs(), self.expected_pairs(world))
+        world.add_landmark(
+            Landmark(name="wall", shape=Box(length=0.1, width=1.0), movable=True)
+        )
+        self.assertEqual(world._get_interaction_pairs(), self.expected_pairs(world))
+
+
+if __name__ == "__main__":
+    unittest.main()
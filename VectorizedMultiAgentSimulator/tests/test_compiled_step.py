@@ -0,0 +1,111 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import shutil
+import unittest
+
+import torch
+from vmas import make_env
+from vmas.simulator.core import Agent, World
+from vmas.simulator.environment import environment
+from vmas.simulator.scenario import BaseScenario
+
+
+class BranchingScenario(BaseScenario):
+    """Scenario whose reward branches on the values of the state"""
+
+    def make_world(self, batch_dim: int, device: torch.device, **kwargs):
+        world = World(batch_dim, device)
+        world.add_agent(Agent(name="agent_0"))
+        return world
+
+    def reset_world_at(self, env_index: int = None):
+        for agent in self.world.agents:
+            agent.set_pos(torch.zeros(1, self.world.dim_p), batch_index=env_index)
+
+    def observation(self, agent: Agent):
+        return torch.cat([agent.state.pos, agent.state.vel], dim=-1)
+
+    def reward(self, agent: Agent):
+        if (agent.state.pos[:, 0] > 0).any():
+            return agent.state.pos[:, 0]
+        return torch.zeros(self.world.batch_dim, device=self.world.device)
+
+
+@unittest.skipIf(
+    shutil.which("g++") is None and shutil.which("clang++") is None,
+    "torch.compile needs a C++ compiler on CPU",
+)
+class TestCompiledStep(unittest.TestCase):
+    def rollout(self, scenario, compile_step: bool, n_steps: int = 5, **kwargs):
+        env = make_env(
+            scenario=scenario,
+            num_envs=4,
+            device="cpu",
+            seed=0,
+            compile_step=compile_step,
+            **kwargs,
+        )
+        generator = torch.Generator().manual_seed(1)
+        bounds = [
+            (torch.tensor(space.low), torch.tensor(space.high))
+            for space in env.action_space
+        ]
+        outputs = []
+        for _ in range(n_steps):
+            obs, rews, dones, _ = env.step(
+                [
+                    low + (high - low) * torch.rand(4, *low.shape, generator=generator)
+                    for low, high in bounds
+                ]
+            )
+            outputs += [*obs, *rews, dones]
+        return env, outputs
+
+    def test_same_outputs(self):
+        _, outputs = self.rollout("simple_reference_idiolect", False)
+        env, compiled_outputs = self.rollout("simple_reference_idiolect", True)
+        self.assertIsNotNone(environment._COMPILED_STEPS[type(env.scenario)])
+        for output, compiled_output in zip(outputs, compiled_outputs):
+            self.assertTrue(torch.allclose(output, compiled_output, atol=1e-5))
+
+    def assert_same_rollouts(self, scenario, n_steps: int = 40, **kwargs):
+        _, outputs = self.rollout(scenario, False, n_steps=n_steps, **kwargs)
+        env, compiled_outputs = self.rollout(scenario, True, n_steps=n_steps, **kwargs)
+        for output, compiled_output in zip(outputs, compiled_outputs):
+            self.assertTrue(torch.allclose(output, compiled_output, atol=1e-4))
+        return env
+
+    def test_same_outputs_with_memory(self):
+        # The memory pointer changes at every step and must not cause recompilations
+        env = self.assert_same_rollouts("simple_reference_family", memory_length=20)
+        self.assertIsNotNone(environment._COMPILED_STEPS[type(env.scenario)])
+
+    def test_same_outputs_with_collisions(self):
+        self.assert_same_rollouts("navigation")
+
+    def test_fall_back_on_different_results(self):
+        def wrong_step(scenario):
+            # Steps like eager mode but then drifts away from it
+            outputs = environment._step_world_and_scenario(scenario)
+            for agent in scenario.world.agents:
+                agent.state.pos += 1
+            return outputs
+
+        _, outputs = self.rollout(BranchingScenario(), False)
+        environment._COMPILED_STEPS[BranchingScenario] = wrong_step
+        self.addCleanup(environment._COMPILED_STEPS.pop, BranchingScenario, None)
+        with self.assertWarns(UserWarning):
+            env, compiled_outputs = self.rollout(BranchingScenario(), True)
+        self.assertIsNone(environment._COMPILED_STEPS[BranchingScenario])
+        # The step that is found wrong already returns the eager results and continues from the eager state
+        for output, compiled_output in zip(outputs, compiled_outputs):
+            self.assertTrue(torch.equal(output, compiled_output))
+
+    def test_fall_back_to_eager(self):
+        _, outputs = self.rollout(BranchingScenario(), False)
+        with self.assertWarns(UserWarning):
+            env, compiled_outputs = self.rollout(BranchingScenario(), True)
+        self.assertIsNone(environment._COMPILED_STEPS[BranchingScenario])
+        for output, compiled_output in zip(outputs, compiled_outputs):
+            self.assertTrue(torch.equal(output, compiled_output))
@@ -0,0 +1,73 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import math
+import unittest
+
+import torch
+
+from vmas.simulator.core import Agent, Box, Landmark, Line, Sphere, World
+from vmas.simulator.sensors import Lidar
+
+
+class TestCastRays(unittest.TestCase):
+    def setUp(self):
+        self.world = World(batch_dim=2, device=torch.device("cpu"))
+        self.agent = Agent(name="agent", shape=Sphere(radius=0.05))
+        self.world.add_agent(self.agent)
+        self.agent.set_pos(torch.zeros(2, 2), batch_index=None)
+
+    def add_landmark(self, name, shape, pos, rot=0.0):
+        landmark = Landmark(name=name, shape=shape)
+        self.world.add_landmark(landmark)
+        landmark.set_pos(torch.tensor(pos), batch_index=None)
+        landmark.set_rot(torch.full((2, 1), rot), batch_index=None)
+        return landmark
+
+    def test_shapes(self):
+        # Sphere on the right, box above, line on the left, nothing below
+        self.add_landmark("sphere", Sphere(radius=0.2), [[1.0, 0.0], [0.5, 0.0]])
+        self.add_landmark("box", Box(length=0.4, width=0.2), [[0.0, 1.0], [0.0, 2.0]])
+        self.add_landmark(
+            "line", Line(length=1.0), [[-1.5, 0.0], [-0.5, 0.0]], rot=math.pi / 2
+        )
+        angles = torch.tensor([0.0, math.pi / 2, math.pi, -math.pi / 2]).expand(2, 4)
+
+        dists = self.world.cast_rays(
+            self.agent, angles, max_range=3.0, entity_filter=lambda _: True
+        )
+        expected = torch.tensor([[0.8, 0.9, 1.5, 3.0], [0.3, 1.9, 0.5, 3.0]])
+        self.assertTrue(torch.allclose(dists, expected, atol=1e-5))
+        for i in range(angles.shape[1]):
+            self.assertTrue(
+                torch.allclose(
+                    self.world.cast_ray(
+                        self.agent,
+                        angles[:, i],
+                        max_range=3.0,
+                        entity_filter=lambda _: True,
+                    ),
+                    dists[:, i],
+                )
+            )
+
+    def test_filter_and_range(self):
+        self.add_landmark("near", Sphere(radius=0.1), [[0.5, 0.0]] * 2)
+        self.add_landmark("far", Sphere(radius=0.1), [[5.0, 0.0]] * 2)
+        angles = torch.zeros(2, 1)
+
+        dists = self.world.cast_rays(
+            self.agent, angles, max_range=2.0, entity_filter=lambda e: e.name == "far"
+        )
+        self.assertTrue(torch.allclose(dists, torch.full((2, 1), 2.0)))
+
+    def test_lidar(self):
+        self.add_landmark("sphere", Sphere(radius=0.2), [[1.0, 0.0], [0.0, 1.0]])
+        lidar = Lidar(self.world, n_rays=4, max_range=2.0, entity_filter=lambda _: True)
+        lidar.agent = self.agent
+
+        measurement = lidar.measure()
+        self.assertEqual(measurement.shape, (2, 4))
+        # Rays start at angle 0 and go counterclockwise
+        expected = torch.tensor([[0.8, 2.0, 2.0, 2.0], [2.0, 0.8, 2.0, 2.0]])
+        self.assertTrue(torch.allclose(measurement, expected, atol=1e-5))
@@ -0,0 +1,52 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+
+from vmas.simulator.core import World
+from vmas.simulator.memory import EpisodicMemory
+
+
+class _MemoryHolder:
+    def __init__(self, memory: EpisodicMemory):
+        self.memory = memory
+
+
+class TestEpisodicMemory(unittest.TestCase):
+    def test_matches_shifted_history(self):
+        batch_dim, dim, length = 5, 21, 7
+        world = World(batch_dim, torch.device("cpu"))
+        agent = _MemoryHolder(
+            EpisodicMemory(batch_dim, torch.device("cpu"), dim=dim, length=length)
+        )
+        history = torch.zeros(batch_dim, dim, length)
+
+        for _ in range(3 * length):
+            obs = torch.randn(batch_dim, dim)
+
+            memory_t = torch.transpose(history, 1, 2)
+            weights = torch.softmax(torch.bmm(memory_t, obs.unsqueeze(2)), dim=1)
+            expected = torch.bmm(torch.transpose(weights, 1, 2), memory_t).squeeze(1)
+            self.assertTrue(
+                torch.allclose(world.weight_mem(obs, agent), expected, atol=1e-6)
+            )
+
+            agent.memory.push(obs)
+            history = torch.cat([history, obs.unsqueeze(2)], dim=-1)[:, :, 1:]
+            self.assertTrue(torch.equal(agent.memory.ordered(), history))
+
+    def test_reset(self):
+        memory = EpisodicMemory(3, torch.device("cpu"), dim=2, length=4)
+        buffer = memory.buffer
+        for _ in range(5):
+            memory.push(torch.ones(3, 2))
+        memory.reset(env_index=1)
+        self.assertTrue((memory.buffer[1] == 0).all())
+        self.assertTrue((memory.buffer[0] == 1).all())
+        memory.reset()
+        self.assertEqual(int(memory.ptr), 0)
+        self.assertTrue((memory.buffer == 0).all())
+        # The buffer is never reallocated
+        self.assertIs(memory.buffer, buffer)
@@ -0,0 +1,58 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+from vmas import make_env
+
+
+class TestPreallocatedOutputs(unittest.TestCase):
+    def rollout(self, scenario: str, preallocate_outputs: bool, **kwargs):
+        torch.manual_seed(0)
+        env = make_env(
+            scenario=scenario,
+            num_envs=4,
+            device="cpu",
+            seed=0,
+            preallocate_outputs=preallocate_outputs,
+            **kwargs,
+        )
+        outputs = [torch.stack(env.reset(), dim=1).clone()]
+        for _ in range(5):
+            obs, rews, _, _ = env.step(
+                [
+                    torch.rand(4, env.get_agent_action_size(agent))
+                    for agent in env.agents
+                ]
+            )
+            outputs.append(torch.stack(obs, dim=1).clone())
+            outputs.append(torch.stack(rews, dim=1).clone())
+        return env, obs, rews, outputs
+
+    def test_same_outputs(self):
+        for scenario in ["simple_reference_idiolect", "navigation"]:
+            _, _, _, outputs = self.rollout(scenario, False)
+            _, _, _, preallocated_outputs = self.rollout(scenario, True)
+            for output, preallocated_output in zip(outputs, preallocated_outputs):
+                self.assertTrue(torch.equal(output, preallocated_output))
+
+    def test_views(self):
+        env, obs, rews, _ = self.rollout("simple_reference_idiolect", True)
+        self.assertEqual(
+            env.observation_buffer.shape, (4, env.n_agents, obs[0].shape[-1])
+        )
+        self.assertEqual(env.reward_buffer.shape, (4, env.n_agents))
+        for i in range(env.n_agents):
+            self.assertEqual(obs[i].data_ptr(), env.observation_buffer[:, i].data_ptr())
+            self.assertEqual(rews[i].data_ptr(), env.reward_buffer[:, i].data_ptr())
+        # Copies are returned on request
+        obs = env.get_from_scenario(
+            get_observations=True,
+            get_rewards=False,
+            get_infos=False,
+            get_dones=False,
+            clone=True,
+        )[0]
+        self.assertNotEqual(obs[0].data_ptr(), env.observation_buffer.data_ptr())
+        self.assertTrue(torch.equal(obs[0], env.observation_buffer[:, 0]))
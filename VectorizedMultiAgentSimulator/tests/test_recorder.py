@@ -0,0 +1,43 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import tempfile
+import unittest
+
+import torch
+from vmas import make_env
+from vmas.simulator.recorder import CommRecorder
+
+
+class TestCommRecorder(unittest.TestCase):
+    def test_record(self):
+        n_envs = 4
+        env = make_env(scenario="simple_reference", num_envs=n_envs, seed=0)
+        folder = tempfile.mkdtemp()
+        recorder = CommRecorder(env.world, folder, max_steps=10, chunk_size=3)
+        states = []
+        for _ in range(7):
+            env.step(
+                [
+                    torch.rand(n_envs, env.get_agent_action_size(agent))
+                    for agent in env.agents
+                ]
+            )
+            states.append(env.agents[0].state.c.clone())
+        recorder.close()
+
+        columns = CommRecorder.load(folder)
+        self.assertEqual(columns["step"].shape, (7 * n_envs, 1))
+        self.assertEqual(columns["step"][-1, 0], 6)
+        self.assertEqual(columns["env_index"][-1, 0], n_envs - 1)
+        # row step * n_envs + env holds env at step
+        self.assertTrue(
+            torch.equal(
+                torch.from_numpy(columns[f"{env.agents[0].name}.state_c"].copy()),
+                torch.cat(states),
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
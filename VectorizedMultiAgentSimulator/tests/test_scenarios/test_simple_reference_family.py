@@ -0,0 +1,116 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+from vmas import make_env
+from vmas.scenarios.mpe.simple_reference_family import ADAPT_COLORS, CONST_LANDMARK_POS
+
+
+class TestSimpleReferenceFamily(unittest.TestCase):
+    def setup_env(self, **kwargs) -> None:
+        super().setUp()
+        self.n_envs = 20
+        self.env = make_env(
+            scenario="simple_reference_family",
+            num_envs=self.n_envs,
+            device="cpu",
+            continuous_actions=True,
+            # Environment specific variables
+            **kwargs,
+        )
+        self.env.seed(0)
+
+    def step(self):
+        return self.env.step(
+            [
+                torch.rand(self.n_envs, self.env.get_agent_action_size(agent))
+                for agent in self.env.agents
+            ]
+        )
+
+    def test_sweep_in_one_batch(self):
+        self.setup_env(
+            external_noise=[0.0, 0.4],
+            landmark_colors="adapt",
+            fixed_landmarks=[True, False],
+        )
+        obs = self.env.reset()
+        # envs are split in contiguous blocks, one per value
+        colors = torch.tensor(ADAPT_COLORS)
+        self.assertTrue(torch.equal(self.env.scenario.colors[0], colors[0]))
+        self.assertTrue(torch.equal(self.env.scenario.colors[-1], colors[-1]))
+        landmark_pos = self.env.world.landmarks[0].state.pos
+        const_pos = torch.tensor(CONST_LANDMARK_POS[0])
+        self.assertTrue((landmark_pos[: self.n_envs // 2] == const_pos).all())
+
+        for _ in range(5):
+            obs, _, _, _ = self.step()
+            for i, agent in enumerate(self.env.agents):
+                other = self.env.agents[1 - i]
+                comm = obs[i][:, -self.env.world.dim_c :]
+                # only the second half of the envs has external noise
+                self.assertTrue(
+                    torch.equal(
+                        comm[: self.n_envs // 2], other.state.c[: self.n_envs // 2]
+                    )
+                )
+                self.assertFalse(
+                    torch.equal(
+                        comm[self.n_envs // 2 :], other.state.c[self.n_envs // 2 :]
+                    )
+                )
+
+    def test_goals_per_env(self):
+        self.setup_env(landmark_colors="adapt")
+        self.env.reset()
+        goal_idx = self.env.scenario.goal_idx.clone()
+        self.assertGreater(len(goal_idx.unique()), 1)
+        for _ in range(10):
+            self.env.reset_at(3)
+        # only the reset env gets new goals
+        changed = (self.env.scenario.goal_idx != goal_idx).any(dim=-1)
+        self.assertFalse(changed[:3].any() or changed[4:].any())
+
+        obs, rews, _, _ = self.step()
+        envs = torch.arange(self.n_envs)
+        landmark_pos = torch.stack(
+            [landmark.state.pos for landmark in self.env.world.landmarks], dim=1
+        )
+        expected_rew = torch.zeros(self.n_envs)
+        for i, agent in enumerate(self.env.agents):
+            goal = self.env.scenario.goal_idx[:, i]
+            self.assertTrue(
+                torch.equal(obs[i][:, 8:11], self.env.scenario.colors[envs, goal])
+            )
+            expected_rew -= torch.linalg.vector_norm(
+                self.env.agents[1 - i].state.pos - landmark_pos[envs, goal], dim=-1
+            )
+        self.assertTrue(torch.allclose(rews[0], expected_rew))
+
+    def test_noise_params_per_agent(self):
+        self.setup_env(listener_noise=1.0)
+        self.env.reset()
+        noise_params = [agent.noise_params.clone() for agent in self.env.agents]
+        for params in noise_params:
+            # one draw per agent, shared by all the envs
+            self.assertTrue((params == params[0]).all())
+        self.env.reset_at(3)
+        for agent, params in zip(self.env.agents, noise_params):
+            self.assertTrue(torch.equal(agent.noise_params, params))
+
+    def test_memory_length(self):
+        self.setup_env(memory_length=[0, 5], ref_frame=False)
+        obs = self.env.reset()
+        obs_dim = self.env.scenario.obs_dim
+        self.assertEqual(obs[0].shape, (self.n_envs, 2 * obs_dim))
+        for _ in range(10):
+            obs, _, _, _ = self.step()
+        # the memory read is empty where the memory is disabled
+        self.assertTrue((obs[0][: self.n_envs // 2, obs_dim:] == 0).all())
+        self.assertTrue((obs[0][self.n_envs // 2 :, obs_dim:] != 0).any(dim=-1).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
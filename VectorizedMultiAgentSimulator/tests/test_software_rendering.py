@@ -0,0 +1,62 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import numpy as np
+import torch
+
+from vmas import make_env
+from vmas.simulator import rendering
+
+
+class TestSoftwareViewer(unittest.TestCase):
+    def setUp(self):
+        self.viewer = rendering.SoftwareViewer(100, 50)
+        self.viewer.set_bounds(
+            torch.tensor(-2.0), torch.tensor(2.0), torch.tensor(-1.0), torch.tensor(1.0)
+        )
+
+    def test_polygon(self):
+        box = rendering.make_polygon(
+            [(-0.5, -0.5), (-0.5, 0.5), (0.5, 0.5), (0.5, -0.5)], draw_border=False
+        )
+        box.set_color(1, 0, 0)
+        xform = rendering.Transform()
+        xform.set_translation(1.0, 0.0)
+        box.add_attr(xform)
+        self.viewer.add_onetime(box)
+
+        frame = self.viewer.render(return_rgb_array=True)
+        self.assertEqual(frame.shape, (50, 100, 3))
+        self.assertEqual(frame.dtype, np.uint8)
+        # The box covers x in [0.5, 1.5] and y in [-0.5, 0.5]
+        self.assertTrue(np.all(frame[20:30, 65:85] == (255, 0, 0)))
+        self.assertTrue(np.all(frame[:, :60] == 255))
+        # One time geoms are removed after rendering
+        self.assertTrue(np.all(self.viewer.render(return_rgb_array=True) == 255))
+
+    def test_line_alpha(self):
+        line = rendering.Line((-2.0, 0.0), (2.0, 0.0), width=3)
+        line.set_color(0, 0, 1, alpha=0.5)
+        self.viewer.add_geom(line)
+
+        frame = self.viewer.render(return_rgb_array=True)
+        self.assertTrue(np.all(frame[25, :, 2] == 255))
+        self.assertTrue(np.all(np.abs(frame[25, :, 0].astype(int) - 128) <= 1))
+        self.assertTrue(np.all(frame[:20] == 255))
+
+
+class TestNumpyBackend(unittest.TestCase):
+    def test_render_batch(self):
+        env = make_env("navigation", num_envs=3, seed=0)
+        frames = env.render(mode="rgb_array", env_index=[0, 2], backend="numpy")
+        self.assertEqual(frames.shape, (2, *env.scenario.viewer_size[::-1], 3))
+        self.assertTrue(
+            np.array_equal(
+                frames[1], env.render(mode="rgb_array", env_index=2, backend="numpy")
+            )
+        )
+        self.assertFalse(np.array_equal(frames[0], frames[1]))
+        with self.assertRaises(AssertionError):
+            env.render(mode="rgb_array", backend="pyglet")
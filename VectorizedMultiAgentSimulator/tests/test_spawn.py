@@ -0,0 +1,59 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+
+from vmas.simulator.core import Agent, World
+from vmas.simulator.utils import ScenarioUtils
+
+
+class TestSpawnEntitiesRandomly(unittest.TestCase):
+    def setUp(self):
+        self.world = World(batch_dim=500, device=torch.device("cpu"))
+        for i in range(6):
+            self.world.add_agent(Agent(name=f"agent_{i}"))
+
+    def positions(self):
+        return torch.stack([agent.state.pos for agent in self.world.agents], dim=1)
+
+    def test_min_distance(self):
+        ScenarioUtils.spawn_entities_randomly(
+            self.world.agents, self.world, None, 0.3, (-1, 1), (-1, 1)
+        )
+        pos = self.positions()
+        dist = torch.cdist(pos, pos) + torch.eye(len(self.world.agents)) * 10
+        self.assertTrue(torch.all(dist >= 0.3))
+        self.assertTrue(torch.all(pos.abs() <= 1))
+
+    def test_env_index(self):
+        ScenarioUtils.spawn_entities_randomly(
+            self.world.agents, self.world, None, 0.3, (-1, 1), (-1, 1)
+        )
+        before = self.positions()
+        ScenarioUtils.spawn_entities_randomly(
+            self.world.agents, self.world, 3, 0.3, (-1, 1), (-1, 1)
+        )
+        after = self.positions()
+        self.assertFalse(torch.allclose(before[3], after[3]))
+        self.assertTrue(torch.equal(before[:3], after[:3]))
+        self.assertTrue(torch.equal(before[4:], after[4:]))
+
+    def test_dense_layout(self):
+        # Six entities at distance 3 do not fit in a 2x2 square
+        ScenarioUtils.spawn_entities_randomly(
+            self.world.agents, self.world, None, 3, (-1, 1), (-1, 1), max_rounds=5
+        )
+        self.assertTrue(torch.all(self.positions().abs() <= 1))
+        with self.assertRaises(AssertionError):
+            ScenarioUtils.spawn_entities_randomly(
+                self.world.agents,
+                self.world,
+                None,
+                3,
+                (-1, 1),
+                (-1, 1),
+                max_rounds=5,
+                fallback=False,
+            )
@@ -0,0 +1,68 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+import unittest
+
+import torch
+from vmas import make_env
+
+
+class TestVectorizedStep(unittest.TestCase):
+    def rollout(self, scenario: str, vectorized_step: bool, n_steps: int = 10):
+        n_envs = 8
+        torch.manual_seed(0)
+        env = make_env(
+            scenario=scenario,
+            num_envs=n_envs,
+            device="cpu",
+            continuous_actions=True,
+            seed=0,
+            vectorized_step=vectorized_step,
+        )
+        generator = torch.Generator().manual_seed(1)
+        for _ in range(n_steps):
+            env.step(
+                [
+                    (
+                        torch.rand(
+                            n_envs,
+                            env.get_agent_action_size(agent),
+                            generator=generator,
+                        )
+                        * 2
+                        - 1
+                    )
+                    * agent.u_range
+                    for agent in env.agents
+                ]
+            )
+        return torch.stack(
+            [
+                torch.cat(
+                    [
+                        entity.state.pos,
+                        entity.state.vel,
+                        entity.state.rot,
+                        entity.state.ang_vel,
+                    ],
+                    dim=-1,
+                )
+                for entity in env.world.entities
+            ]
+        )
+
+    def test_matches_entity_step(self):
+        # spheres only, boxes and lines, joints
+        for scenario in ["flocking", "football", "joint_passage"]:
+            self.assertTrue(
+                torch.allclose(
+                    self.rollout(scenario, vectorized_step=False),
+                    self.rollout(scenario, vectorized_step=True),
+                    atol=1e-5,
+                ),
+                scenario,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
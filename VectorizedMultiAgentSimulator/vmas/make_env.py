@@ -22,6 +22,11 @@ def make_env(
     max_steps: Optional[int] = None,
     seed: Optional[int] = None,
     dict_spaces: bool = False,
+    vectorized_step: bool = False,
+    action_validation: str = "strict",
+    validation_interval: int = 100,
+    preallocate_outputs: bool = False,
+    compile_step: bool = False,
     **kwargs,
 ):
     """
@@ -36,6 +41,18 @@ def make_env(
         seed: seed
         dict_spaces:  Weather to use dictionary i/o spaces with format {agent_name: tensor}
         for obs, rewards, and info instead of tuples.
+        vectorized_step: Weather to step the physics of all entities at once on batched tensors
+        instead of entity by entity. Scenarios with many entities step with far fewer kernel launches.
+        action_validation: How actions out of range are handled. One of "strict" (assert at every step),
+        "deferred" (accumulate violations on device and assert every `validation_interval` steps, clamping meanwhile)
+        and "off" (clamp silently). Only "strict" syncs with the device at every step.
+        validation_interval: Number of steps between checks in deferred validation.
+        preallocate_outputs: Weather to write the observations and rewards in buffers owned by the environment
+        instead of cloning them at every step. The returned tensors are then views of these buffers,
+        overwritten at the next step.
+        compile_step: Weather to compile the world step with the observations and rewards of the scenario
+        using torch.compile. Scenarios that cannot be compiled, or whose compiled step does not match the eager one,
+        fall back to eager mode with a warning.
         **kwargs ():
 
     Returns:
@@ -55,6 +72,11 @@ def make_env(
         max_steps=max_steps,
         seed=seed,
         dict_spaces=dict_spaces,
+        vectorized_step=vectorized_step,
+        action_validation=action_validation,
+        validation_interval=validation_interval,
+        preallocate_outputs=preallocate_outputs,
+        compile_step=compile_step,
         **kwargs,
     )
 
@@ -1,23 +1,36 @@
 #  Copyright (c) 2022.
 #  ProrokLab (https://www.proroklab.org/)
 #  All rights reserved.
+import functools
 import importlib
 import os
 import os.path as osp
 from pathlib import Path
+from typing import Dict
 
 
-def load(name: str):
-    pathname = None
+@functools.lru_cache(maxsize=None)
+def _scenario_paths() -> Dict[str, str]:
+    # Index from file name and full path to path of the scenario files, walked once per process
+    paths = {}
     for dirpath, dirnames, filenames in os.walk(osp.dirname(__file__)):
-        if pathname is None:
-            for filename in filenames:
-                if name == filename or name == str(Path(dirpath) / Path(filename)):
-                    pathname = os.path.join(dirpath, filename)
-                    break
-    assert pathname is not None, f"{name} scenario not found."
+        for filename in filenames:
+            pathname = os.path.join(dirpath, filename)
+            paths.setdefault(filename, pathname)
+            paths.setdefault(str(Path(dirpath) / Path(filename)), pathname)
+    return paths
 
+
+@functools.lru_cache(maxsize=None)
+def _load_module(pathname: str):
     spec = importlib.util.spec_from_file_location("", pathname)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
     return module
+
+
+def load(name: str):
+    pathname = _scenario_paths().get(name)
+    assert pathname is not None, f"{name} scenario not found."
+    # Scenario modules are imported the first time they are loaded
+    return _load_module(pathname)
@@ -3,6 +3,7 @@
 import torch
 
 from vmas.simulator.core import World, Agent, Landmark
+from vmas.simulator.memory import EpisodicMemory
 from vmas.simulator.scenario import BaseScenario
 
 class Scenario(BaseScenario):
@@ -62,7 +63,9 @@ class Scenario(BaseScenario):
 
             # Make everything for memory store
             for agent in self.world.agents:
-                agent.memory = torch.zeros((self.world.batch_dim, 21, 500))
+                agent.memory = EpisodicMemory(
+                    self.world.batch_dim, self.world.device, dim=21, length=500
+                )
 
         # set random initial states
         for agent in self.world.agents:
@@ -138,21 +141,17 @@ class Scenario(BaseScenario):
         )
     
     def observation(self, agent: Agent):
-            obs = self.observation_no_mem(agent)
-            if agent.memory != None:
-                out = torch.cat(
+        obs = self.observation_no_mem(agent)
+        if agent.memory is not None:
+            out = torch.cat(
                 [
                     obs,
-                    self.world.weight_mem(obs, agent)
+                    self.world.weight_mem(obs, agent),
                 ],
-                dim=-1
-                )
-                agent.memory = torch.cat(
-                    [agent.memory,
-                        torch.unsqueeze(obs, 2)],
-                        dim = -1
-                )[:, :, 1:]
-                return out
-            else:
-                return obs
+                dim=-1,
+            )
+            agent.memory.push(obs)
+            return out
+        else:
+            return obs
 
@@ -0,0 +1,381 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+
+import torch
+from torch import Tensor
+
+from vmas.simulator.core import World, Agent, Landmark
+from vmas.simulator.memory import EpisodicMemory
+from vmas.simulator.scenario import BaseScenario
+from vmas.simulator.utils import TorchUtils
+
+# Landmark colours of simple_reference
+DEFAULT_COLORS = [
+    [0.75, 0.25, 0.25],
+    [0.25, 0.75, 0.25],
+    [0.25, 0.25, 0.75],
+]
+# Landmark colours of the novel_color scenarios
+PURE_COLORS = [
+    [1.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.0, 0.0, 1.0],
+]
+# Landmark colours of adapt_color_{i}, one entry per i
+ADAPT_COLORS = [
+    [
+        [0.82271645, 0.44610688, 0.93966175],
+        [0.0278034, 0.75915109, 0.79179741],
+        [0.06993397, 0.88966843, 0.81844021],
+    ],
+    [
+        [0.5459428, 0.70191707, 0.32869117],
+        [0.4298633, 0.70046802, 0.14097923],
+        [0.65749074, 0.05481696, 0.34342548],
+    ],
+    [
+        [0.49499374, 0.12011904, 0.42012681],
+        [0.35678811, 0.11135403, 0.85474062],
+        [0.89998341, 0.05672149, 0.82084172],
+    ],
+    [
+        [0.0607103781, 0.954713269, 0.400395304],
+        [0.843802356, 0.591663097, 0.770336708],
+        [0.582358321, 0.146604746, 0.000651536714],
+    ],
+    [
+        [0.06002518, 0.05998185, 0.6771494],
+        [0.05517648, 0.81501307, 0.05885222],
+        [0.00088263, 0.77384509, 0.53162081],
+    ],
+    [
+        [0.44838321, 0.16839406, 0.05772603],
+        [0.33821408, 0.18677087, 0.25459189],
+        [0.4850128, 0.69049697, 0.27538108],
+    ],
+    [
+        [0.05366605, 0.99556967, 0.28615281],
+        [0.2233982, 0.26297057, 0.35569658],
+        [0.16546759, 0.64553364, 0.60657187],
+    ],
+    [
+        [0.43612918, 0.5773245, 0.90387858],
+        [0.96693974, 0.44678552, 0.54637898],
+        [0.18536073, 0.26313892, 0.80105569],
+    ],
+    [
+        [0.75996964, 0.95323119, 0.84281999],
+        [0.58307859, 0.16856888, 0.02680049],
+        [0.47334232, 0.86563882, 0.29770234],
+    ],
+    [
+        [0.5598136, 0.78172008, 0.28490428],
+        [0.34628072, 0.8350758, 0.11225597],
+        [0.02149317, 0.27452798, 0.02416028],
+    ],
+]
+# Landmark positions of the _const scenarios
+CONST_LANDMARK_POS = [
+    [-0.3065, -0.7480],
+    [-0.2694, -0.6261],
+    [0.8436, -0.0874],
+]
+# Per agent observation frames of simple_reference
+REF_FRAMES = [
+    [[0.4973, 0.3819], [0.0203, 0.8856]],
+    [[0.7729, 0.8743], [0.1327, 0.7566]],
+]
+
+
+class Scenario(BaseScenario):
+    """
+    Parametric version of the simple_reference variants (idiolect, ext_noise, const, mem_buffer,
+    adapt_color, novel_coord, speed_*).
+
+    Every knob marked as per-env accepts either a single value, shared by all envs, or a list of values.
+    With a list of n values, the envs are split into n contiguous blocks of (almost) equal size,
+    block i using value i. This lets a whole sweep run in one batch.
+    """
+
+    def make_world(self, batch_dim: int, device: torch.device, **kwargs):
+        world = World(batch_dim=batch_dim, device=device, dim_c=10)
+
+        self.n_agents = 2
+        self.n_landmarks = 3
+
+        # Scale of the agent's own Beta noise added to the messages it sends (per-env).
+        # No simple_reference variant has it, everyone hears this noise
+        self.speaker_noise = self._per_env(kwargs.get("speaker_noise", 0.0), world)
+        # Scale of the agent's own Beta noise added to the messages it receives (per-env).
+        # This is the idiolect noise, the idiolect variants have 1
+        self.listener_noise = self._per_env(kwargs.get("listener_noise", 0.0), world)
+        # Std of the Gaussian noise added to the messages received, on the listener side too
+        # (per-env, ext_noiseK is K / 10)
+        self.external_noise = self._per_env(kwargs.get("external_noise", 0.0), world)
+        # Also observe the noiseless messages, as in simple_reference_idiolect
+        self.observe_clean_comm = kwargs.get("observe_clean_comm", False)
+        # Number of past observations attended to (per-env, 0 disables the memory)
+        self.memory_length = self._per_env(
+            kwargs.get("memory_length", 0), world, dtype=torch.long
+        )
+        # "default", "pure", "random" (the speed_new colours), "adapt" (all adapt_color_i colours)
+        # or a list of (n_landmarks, 3) colours
+        self.landmark_colors = kwargs.get("landmark_colors", "default")
+        # Centre of the spawn square (per-env), "random" draws it in [2, 12] at every reset like novel_coord
+        self.spawn_center = kwargs.get("spawn_center", 0.0)
+        # Put the landmarks in the _const positions (per-env)
+        self.fixed_landmarks = self._per_env(
+            kwargs.get("fixed_landmarks", False), world, dtype=torch.bool
+        )
+        # Observe landmarks in the agent reference frame instead of plain relative positions (per-env)
+        self.use_ref_frame = self._per_env(
+            kwargs.get("ref_frame", True), world, dtype=torch.bool
+        )
+
+        if self.landmark_colors == "adapt":
+            self.landmark_colors = ADAPT_COLORS
+        elif self.landmark_colors == "pure":
+            self.landmark_colors = PURE_COLORS
+        elif self.landmark_colors == "default":
+            self.landmark_colors = DEFAULT_COLORS
+        self.random_colors = self.landmark_colors == "random"
+        if self.random_colors:
+            self.colors = torch.zeros((batch_dim, self.n_landmarks, 3), device=device)
+        else:
+            self.colors = self._per_env(
+                self.landmark_colors, world, shape=(self.n_landmarks, 3)
+            )
+        self.random_spawn_center = self.spawn_center == "random"
+        if not self.random_spawn_center:
+            self.spawn_center = self._per_env(self.spawn_center, world)
+
+        # Goal landmark of each agent's partner, per env
+        self.all_envs = torch.arange(batch_dim, device=device)
+        self.goal_idx = torch.zeros(
+            (batch_dim, self.n_agents), device=device, dtype=torch.long
+        )
+
+        self.max_memory_length = int(self.memory_length.max())
+        self.obs_dim = (
+            2
+            + 2 * self.n_landmarks
+            + 3
+            + world.dim_c
+            * ((self.n_agents - 1) * (2 if self.observe_clean_comm else 1))
+        )
+
+        # Add agents
+        for i in range(self.n_agents):
+            agent = Agent(name=f"agent_{i}", collide=False, silent=False)
+            if self.max_memory_length > 0:
+                agent.memory = EpisodicMemory(
+                    batch_dim, device, dim=self.obs_dim, length=self.max_memory_length
+                )
+            # Beta noise concentrations of the agent, drawn once at each full reset as in the idiolect variants
+            agent.noise_params = torch.zeros((batch_dim, 2), device=device)
+            agent.ref_frame = (
+                torch.tensor(REF_FRAMES[i], device=device)
+                .unsqueeze(0)
+                .repeat(batch_dim, 1, 1)
+            )
+            agent.ref_frame[~self.use_ref_frame.squeeze(-1)] = torch.eye(
+                world.dim_p, device=device
+            )
+            world.add_agent(agent)
+        # Add landmarks
+        for i in range(self.n_landmarks):
+            landmark = Landmark(
+                name=f"landmark {i}",
+                collide=False,
+            )
+            world.add_landmark(landmark)
+
+        return world
+
+    def _per_env(self, value, world: World, shape=(), dtype=torch.float32) -> Tensor:
+        """Broadcasts a per-env knob to shape (batch_dim, *shape), or (batch_dim, 1) for scalars"""
+        value = torch.as_tensor(value, dtype=dtype, device=world.device)
+        if value.dim() == len(shape):
+            value = value.unsqueeze(0)
+        assert (
+            value.shape[1:] == shape
+        ), f"Expected values of shape {shape}, got {tuple(value.shape[1:])}"
+        index = (
+            torch.arange(world.batch_dim, device=world.device) * value.shape[0]
+        ) // world.batch_dim
+        value = value[index]
+        return value if len(shape) else value.unsqueeze(-1)
+
+    def _sample_positions(self, center: Tensor, env_index) -> Tensor:
+        if env_index is not None:
+            center = center[env_index]
+        return (
+            center
+            - 1
+            + 2
+            * torch.rand(
+                center.shape[:-1] + (self.world.dim_p,), device=self.world.device
+            )
+        )
+
+    def reset_world_at(self, env_index: int = None):
+        batch_index = slice(None) if env_index is None else env_index
+
+        # want other agent to go to the goal landmark, sampled for all the reset envs at once
+        self.goal_idx[batch_index] = torch.randint(
+            0,
+            self.n_landmarks,
+            self.goal_idx[batch_index].shape,
+            device=self.world.device,
+        )
+        if env_index is None:
+            # assign goals to agents
+            for i, agent in enumerate(self.world.agents):
+                agent.goal_a = self.world.agents[1 - i]
+
+        if self.random_colors:
+            # landmark i peaks at 0.75 in channel i, the other channels are in [0, 0.6]
+            colors = 0.6 * torch.rand(
+                self.colors[batch_index].shape, device=self.world.device
+            )
+            colors[..., range(self.n_landmarks), range(self.n_landmarks)] = 0.75
+            self.colors[batch_index] = colors
+
+        if env_index is None:
+            # random properties for agents
+            for agent in self.world.agents:
+                agent.color = torch.tensor(
+                    [0.25, 0.25, 0.25], device=self.world.device, dtype=torch.float32
+                )
+            # rendering uses the colors of the first env
+            for i, landmark in enumerate(self.world.landmarks):
+                landmark.color = self.colors[0, i]
+        # special colors for goals
+        for i, agent in enumerate(self.world.agents):
+            agent.goal_a.color = self.colors[0, self.goal_idx[0, i]]
+
+        # Make everything for noise and memory
+        for agent in self.world.agents:
+            if env_index is None:
+                agent.noise_params[:] = torch.rand(2, device=self.world.device)
+            if agent.memory is not None:
+                agent.memory.reset(env_index)
+
+        # set random initial states
+        if self.random_spawn_center:
+            center = 2 + 10 * torch.rand(
+                (self.world.batch_dim, 1), device=self.world.device
+            )
+        else:
+            center = self.spawn_center
+        for agent in self.world.agents:
+            agent.set_pos(
+                self._sample_positions(center, env_index), batch_index=env_index
+            )
+        for i, landmark in enumerate(self.world.landmarks):
+            landmark.set_pos(
+                torch.where(
+                    self.fixed_landmarks[batch_index],
+                    torch.tensor(CONST_LANDMARK_POS[i], device=self.world.device),
+                    self._sample_positions(center, env_index),
+                ),
+                batch_index=env_index,
+            )
+
+    def process_action(self, agent: Agent):
+        # The speaker noise goes into the message itself, everyone hears it
+        agent.action.c = (
+            agent.action.c + self.speaker_noise * self._sample_noise(agent) / 2
+        )
+
+    def _sample_noise(self, agent: Agent) -> Tensor:
+        shape = (self.world.batch_dim, self.world.dim_c)
+        return torch.distributions.Beta(
+            agent.noise_params[:, :1].expand(shape),
+            agent.noise_params[:, 1:].expand(shape),
+        ).sample()
+
+    def reward(self, agent: Agent):
+        is_first = agent == self.world.agents[0]
+        if is_first:
+            landmark_pos = torch.stack(
+                [landmark.state.pos for landmark in self.world.landmarks], dim=1
+            )
+            self.rew = torch.zeros(self.world.batch_dim, device=self.world.device)
+            for i, a in enumerate(self.world.agents):
+                self.rew += -torch.sqrt(
+                    torch.sum(
+                        torch.square(
+                            a.goal_a.state.pos
+                            - landmark_pos[self.all_envs, self.goal_idx[:, i]]
+                        ),
+                        dim=-1,
+                    )
+                )
+        return self.rew
+
+    def observation_no_mem(self, agent: Agent):
+        return torch.cat(self._observation_parts(agent), dim=-1)
+
+    def _observation_parts(self, agent: Agent):
+        # goal color
+        goal_color = self.colors[
+            self.all_envs, self.goal_idx[:, self.world.agents.index(agent)]
+        ]
+
+        # get positions of all entities in this agent's reference frame
+        entity_pos = []
+        for entity in self.world.landmarks:
+            entity_pos.append(
+                torch.bmm(
+                    agent.ref_frame, (entity.state.pos - agent.state.pos).unsqueeze(2)
+                ).squeeze(2)
+            )
+
+        # communication of all other agents
+        comm = []
+        for other in self.world.agents:
+            if other is agent:
+                continue
+            if self.observe_clean_comm:
+                comm.append(other.state.c)
+            comm.append(
+                other.state.c
+                + self.listener_noise * self._sample_noise(agent) / 2
+                + self.external_noise * torch.randn_like(other.state.c)
+            )
+        return [agent.state.vel, *entity_pos, goal_color, *comm]
+
+    def weight_mem(self, obs: Tensor, agent: Agent) -> Tensor:
+        """World.weight_mem restricted to the last memory_length entries of each env"""
+        memory = agent.memory
+        MT = torch.transpose(memory.buffer, 1, 2)
+        scores = torch.bmm(MT, obs.unsqueeze(2)).squeeze(2)
+        # age 0 is the last written slot
+        age = (
+            memory.ptr - 1 - torch.arange(memory.length, device=self.world.device)
+        ) % memory.length
+        in_memory = age.unsqueeze(0) < self.memory_length
+        W = torch.softmax(scores.masked_fill(~in_memory, float("-inf")), dim=1)
+        S = torch.bmm(W.nan_to_num(0.0).unsqueeze(1), MT).squeeze(1)
+        return S
+
+    def observation(self, agent: Agent):
+        obs = self.observation_no_mem(agent)
+        if agent.memory is not None:
+            out = torch.cat([obs, self.weight_mem(obs, agent)], dim=-1)
+            agent.memory.push(obs)
+            return out
+        else:
+            return obs
+
+    def observation_into(self, agent: Agent, out: Tensor):
+        if agent.memory is not None:
+            obs = TorchUtils.cat_into(
+                self._observation_parts(agent), out[:, : agent.memory.dim]
+            )
+            out[:, agent.memory.dim :] = self.weight_mem(obs, agent)
+            agent.memory.push(obs)
+        else:
+            TorchUtils.cat_into(self._observation_parts(agent), out)
@@ -24,23 +24,30 @@ class Scenario(BaseScenario):
             )
             world.add_landmark(landmark)
 
+        # Goal landmark of each agent's partner and landmark colors, per env
+        self.all_envs = torch.arange(batch_dim, device=device)
+        self.goal_idx = torch.zeros(
+            (batch_dim, n_agents), device=device, dtype=torch.long
+        )
+        self.landmark_colors = torch.zeros(
+            (batch_dim, n_landmarks, 3), device=device, dtype=torch.float32
+        )
+
         return world
 
     def reset_world_at(self, env_index: int = None):
+        # want other agent to go to the goal landmark, sampled for all the reset envs at once
+        batch_index = slice(None) if env_index is None else env_index
+        self.goal_idx[batch_index] = torch.randint(
+            0,
+            len(self.world.landmarks),
+            self.goal_idx[batch_index].shape,
+            device=self.world.device,
+        )
         if env_index is None:
             # assign goals to agents
-            for agent in self.world.agents:
-                agent.goal_a = None
-                agent.goal_b = None
-            # want other agent to go to the goal landmark
-            self.world.agents[0].goal_a = self.world.agents[1]
-            self.world.agents[0].goal_b = self.world.landmarks[
-                torch.randint(0, len(self.world.landmarks), (1,)).item()
-            ]
-            self.world.agents[1].goal_a = self.world.agents[0]
-            self.world.agents[1].goal_b = self.world.landmarks[
-                torch.randint(0, len(self.world.landmarks), (1,)).item()
-            ]
+            for i, agent in enumerate(self.world.agents):
+                agent.goal_a = self.world.agents[1 - i]
             # random properties for agents
             for i, agent in enumerate(self.world.agents):
                 agent.color = torch.tensor(
@@ -62,14 +69,18 @@ class Scenario(BaseScenario):
             self.world.landmarks[0].color = colors[0]
             self.world.landmarks[1].color = colors[1]
             self.world.landmarks[2].color = colors[2]
-            # special colors for goals
-            self.world.agents[0].goal_a.color = self.world.agents[0].goal_b.color
-            self.world.agents[1].goal_a.color = self.world.agents[1].goal_b.color
+            self.landmark_colors[:] = torch.stack(
+                [landmark.color for landmark in self.world.landmarks]
+            )
 
             # Make everything for noise (need to make this not hard-coded)
             for agent in self.world.agents:
                 agent.noise = torch.distributions.Beta(torch.rand(1), torch.rand(1))
 
+        # special colors for goals (rendering shows the first env)
+        for i, agent in enumerate(self.world.agents):
+            agent.goal_a.color = self.landmark_colors[0, self.goal_idx[0, i]]
+
         # set random initial states
         for idx, agent in enumerate(self.world.agents):
             agent.set_pos(
@@ -110,28 +121,30 @@ class Scenario(BaseScenario):
     def reward(self, agent: Agent):
         is_first = agent == self.world.agents[0]
         if is_first:
+            landmark_pos = torch.stack(
+                [landmark.state.pos for landmark in self.world.landmarks], dim=1
+            )
             self.rew = torch.zeros(self.world.batch_dim, device=self.world.device)
-            for a in self.world.agents:
-                if a.goal_a is None or a.goal_b is None:
-                    return torch.zeros(
-                        self.world.batch_dim,
-                        device=self.world.device,
-                        dtype=torch.float32,
-                    )
+            for i, a in enumerate(self.world.agents):
                 self.rew += -torch.sqrt(
                     torch.sum(
-                        torch.square(a.goal_a.state.pos - a.goal_b.state.pos), dim=-1
+                        torch.square(
+                            a.goal_a.state.pos
+                            - landmark_pos[self.all_envs, self.goal_idx[:, i]]
+                        ),
+                        dim=-1,
                     )
                 )
         return self.rew
 
     def observation(self, agent: Agent):
         # goal color
-        goal_color = agent.goal_b.color
+        goal_color = self.landmark_colors[
+            self.all_envs, self.goal_idx[:, self.world.agents.index(agent)]
+        ]
 
         # get positions of all entities in this agent's reference frame
         entity_pos = []
-        entity_cols = []
         for entity in self.world.landmarks:
             entity_pos.append(
                 torch.bmm(
@@ -139,10 +152,6 @@ class Scenario(BaseScenario):
                     (entity.state.pos - agent.state.pos).unsqueeze(2)
                 ).squeeze(2)
             )
-            color = torch.Tensor(entity.color)
-            entity_cols.append(
-                color.repeat(self.world.batch_dim, 1)
-            )
 
         # communication of all other agents
         comm = []
@@ -156,8 +165,7 @@ class Scenario(BaseScenario):
             [
                 agent.state.vel,
                 *entity_pos,
-                # *entity_cols,
-                goal_color.repeat(self.world.batch_dim, 1),
+                goal_color,
                 *comm,
             ],
             dim=-1,
@@ -3,6 +3,7 @@
 import torch
 
 from vmas.simulator.core import World, Agent, Landmark
+from vmas.simulator.memory import EpisodicMemory
 from vmas.simulator.scenario import BaseScenario
 
 class Scenario(BaseScenario):
@@ -24,23 +25,30 @@ class Scenario(BaseScenario):
             )
             world.add_landmark(landmark)
 
+        # Goal landmark of each agent's partner and landmark colors, per env
+        self.all_envs = torch.arange(batch_dim, device=device)
+        self.goal_idx = torch.zeros(
+            (batch_dim, n_agents), device=device, dtype=torch.long
+        )
+        self.landmark_colors = torch.zeros(
+            (batch_dim, n_landmarks, 3), device=device, dtype=torch.float32
+        )
+
         return world
 
     def reset_world_at(self, env_index: int = None):
+        # want other agent to go to the goal landmark, sampled for all the reset envs at once
+        batch_index = slice(None) if env_index is None else env_index
+        self.goal_idx[batch_index] = torch.randint(
+            0,
+            len(self.world.landmarks),
+            self.goal_idx[batch_index].shape,
+            device=self.world.device,
+        )
         if env_index is None:
             # assign goals to agents
-            for agent in self.world.agents:
-                agent.goal_a = None
-                agent.goal_b = None
-            # want other agent to go to the goal landmark
-            self.world.agents[0].goal_a = self.world.agents[1]
-            self.world.agents[0].goal_b = self.world.landmarks[
-                torch.randint(0, len(self.world.landmarks), (1,)).item()
-            ]
-            self.world.agents[1].goal_a = self.world.agents[0]
-            self.world.agents[1].goal_b = self.world.landmarks[
-                torch.randint(0, len(self.world.landmarks), (1,)).item()
-            ]
+            for i, agent in enumerate(self.world.agents):
+                agent.goal_a = self.world.agents[1 - i]
             # random properties for agents
             for i, agent in enumerate(self.world.agents):
                 agent.color = torch.tensor(
@@ -56,13 +64,19 @@ class Scenario(BaseScenario):
             self.world.landmarks[2].color = torch.tensor(
                 [0.25, 0.25, 0.75], device=self.world.device, dtype=torch.float32
             )
-            # special colors for goals
-            self.world.agents[0].goal_a.color = self.world.agents[0].goal_b.color
-            self.world.agents[1].goal_a.color = self.world.agents[1].goal_b.color
+            self.landmark_colors[:] = torch.stack(
+                [landmark.color for landmark in self.world.landmarks]
+            )
 
             # Make everything for memory
             for agent in self.world.agents:
-                agent.memory = torch.zeros((self.world.batch_dim, 21, 500))
+                agent.memory = EpisodicMemory(
+                    self.world.batch_dim, self.world.device, dim=21, length=500
+                )
+
+        # special colors for goals (rendering shows the first env)
+        for i, agent in enumerate(self.world.agents):
+            agent.goal_a.color = self.landmark_colors[0, self.goal_idx[0, i]]
 
         # set random initial states
         for agent in self.world.agents:
@@ -84,45 +98,48 @@ class Scenario(BaseScenario):
                 landmark.set_pos(
                     torch.Tensor(
                         [-0.3065, -0.7480],
-                    ).repeat(self.world.batch_dim, 1),
+                    ),
                     batch_index=env_index,
                 )
             elif idx == 1: 
                 landmark.set_pos(
                     torch.Tensor(
                         [-0.2694, -0.6261]
-                    ).repeat(self.world.batch_dim, 1),
+                    ),
                     batch_index=env_index,
                 )
             elif idx == 2: 
                 landmark.set_pos(
                     torch.Tensor(
                         [ 0.8436, -0.0874]
-                    ).repeat(self.world.batch_dim, 1),
+                    ),
                     batch_index=env_index,
                 )
 
     def reward(self, agent: Agent):
         is_first = agent == self.world.agents[0]
         if is_first:
+            landmark_pos = torch.stack(
+                [landmark.state.pos for landmark in self.world.landmarks], dim=1
+            )
             self.rew = torch.zeros(self.world.batch_dim, device=self.world.device)
-            for a in self.world.agents:
-                if a.goal_a is None or a.goal_b is None:
-                    return torch.zeros(
-                        self.world.batch_dim,
-                        device=self.world.device,
-                        dtype=torch.float32,
-                    )
+            for i, a in enumerate(self.world.agents):
                 self.rew += -torch.sqrt(
                     torch.sum(
-                        torch.square(a.goal_a.state.pos - a.goal_b.state.pos), dim=-1
+                        torch.square(
+                            a.goal_a.state.pos
+                            - landmark_pos[self.all_envs, self.goal_idx[:, i]]
+                        ),
+                        dim=-1,
                     )
                 )
         return self.rew
 
     def observation_no_mem(self, agent: Agent):
         # goal color
-        goal_color = agent.goal_b.color
+        goal_color = self.landmark_colors[
+            self.all_envs, self.goal_idx[:, self.world.agents.index(agent)]
+        ]
 
         # get positions of all entities in this agent's reference frame
         entity_pos = []
@@ -139,27 +156,23 @@ class Scenario(BaseScenario):
             [
                 agent.state.vel,
                 *entity_pos,
-                goal_color.repeat(self.world.batch_dim, 1),
+                goal_color,
                 *comm,
             ],
             dim=-1,
         )
     
     def observation(self, agent: Agent):
-            obs = self.observation_no_mem(agent)
-            if agent.memory != None:
-                out = torch.cat(
+        obs = self.observation_no_mem(agent)
+        if agent.memory is not None:
+            out = torch.cat(
                 [
                     obs,
-                    self.world.weight_mem(obs, agent)
+                    self.world.weight_mem(obs, agent),
                 ],
-                dim=-1
-                )
-                agent.memory = torch.cat(
-                    [agent.memory,
-                        torch.unsqueeze(obs, 2)],
-                        dim = -1
-                )[:, :, 1:]
-                return out
-            else:
-                return obs
+                dim=-1,
+            )
+            agent.memory.push(obs)
+            return out
+        else:
+            return obs
@@ -7,7 +7,7 @@ from __future__ import annotations
 import math
 import typing
 from abc import ABC, abstractmethod
-from typing import Callable, List, Tuple
+from typing import Callable, List, Set, Tuple
 
 import torch
 from torch import Tensor
@@ -446,6 +446,11 @@ class Action(TorchVectorizedObject):
                     attr[env_index] = 0.0
 
 
+def _collide_with_all(entity) -> bool:
+    """Default collision filter of the entities"""
+    return True
+
+
 # properties and state of physical world entity
 class Entity(TorchVectorizedObject, Observable, ABC):
     def __init__(
@@ -465,7 +470,7 @@ class Entity(TorchVectorizedObject, Observable, ABC):
         linear_friction: float = None,
         angular_friction: float = None,
         gravity: typing.Union[float, Tensor] = None,
-        collision_filter: Callable[[Entity], bool] = lambda _: True,
+        collision_filter: Callable[[Entity], bool] = _collide_with_all,
     ):
         TorchVectorizedObject.__init__(self)
         Observable.__init__(self)
@@ -710,7 +715,7 @@ class Landmark(Entity):
         linear_friction: float = None,
         angular_friction: float = None,
         gravity: float = None,
-        collision_filter: Callable[[Entity], bool] = lambda _: True,
+        collision_filter: Callable[[Entity], bool] = _collide_with_all,
     ):
         super().__init__(
             name,
@@ -768,7 +773,7 @@ class Agent(Entity):
         linear_friction: float = None,
         angular_friction: float = None,
         gravity: float = None,
-        collision_filter: Callable[[Entity], bool] = lambda _: True,
+        collision_filter: Callable[[Entity], bool] = _collide_with_all,
         render_action: bool = False,
         noise = None,
         memory = None,
@@ -960,6 +965,8 @@ class Agent(Entity):
         self.action.to(device)
         for sensor in self.sensors:
             sensor.to(device)
+        if self.memory is not None:
+            self.memory.to(device)
 
     @override(Entity)
     def render(self, env_index: int = 0) -> "List[Geom]":
@@ -1004,6 +1011,7 @@ class World(TorchVectorizedObject):
         joint_force: float = JOINT_FORCE,
         contact_margin: float = 1e-3,
         gravity: Tuple[float, float] = (0.0, 0.0),
+        vectorized: bool = False,
     ):
         assert batch_dim > 0, f"Batch dim must be greater than 0, got {batch_dim}"
 
@@ -1048,6 +1056,16 @@ class World(TorchVectorizedObject):
         self._normal_vector = torch.tensor(
             [1.0, 0.0], dtype=torch.float32, device=self.device
         ).repeat(self._batch_dim, 1)
+        # step all entities at once on (batch_dim, n_entities, ...) tensors
+        self._vectorized = vectorized
+        # entity properties packed by the vectorized step, reused while they do not change
+        self._packed_properties = {}
+        # pairs that passed the broad phase in the current substep, None outside of step()
+        self._collision_candidates = None
+        # split of the interaction pairs, reused while the entities and joints do not change
+        self._interaction_pairs = None
+        # called with the world after the comm states are updated at each step
+        self._comm_hooks: List[Callable[["World"], None]] = []
 
     def add_agent(self, agent: Agent):
         """Only way to add agents to the world"""
@@ -1108,6 +1126,21 @@ class World(TorchVectorizedObject):
     def dim_c(self):
         return self._dim_c
 
+    @property
+    def vectorized(self):
+        return self._vectorized
+
+    @vectorized.setter
+    def vectorized(self, vectorized: bool):
+        self._vectorized = vectorized
+
+    def register_comm_hook(self, hook: Callable[["World"], None]):
+        """Calls `hook(world)` at every step, right after the comm states of the agents are updated"""
+        self._comm_hooks.append(hook)
+
+    def remove_comm_hook(self, hook: Callable[["World"], None]):
+        self._comm_hooks.remove(hook)
+
     @property
     def joints(self):
         return self._joints.values()
@@ -1127,156 +1160,40 @@ class World(TorchVectorizedObject):
     def scripted_agents(self) -> List[Agent]:
         return [agent for agent in self._agents if agent.action_script is not None]
 
-    def _cast_ray_to_box(
-        self,
-        box: Entity,
-        ray_origin: Tensor,
-        ray_direction: Tensor,
-        max_range: float,
-    ):
-        """
-        Inspired from https://tavianator.com/2011/ray_box.html
-        Computes distance of ray originating from pos at angle to a box and sets distance to
-        max_range if there is no intersection.
-        """
-        assert ray_origin.ndim == 2 and ray_direction.ndim == 1
-        assert ray_origin.shape[0] == ray_direction.shape[0]
-        assert isinstance(box.shape, Box)
-
-        pos_origin = ray_origin - box.state.pos
-        pos_aabb = TorchUtils.rotate_vector(pos_origin, -box.state.rot)
-        ray_dir_world = torch.stack(
-            [torch.cos(ray_direction), torch.sin(ray_direction)], dim=-1
-        )
-        ray_dir_aabb = TorchUtils.rotate_vector(ray_dir_world, -box.state.rot)
-
-        tx1 = (-box.shape.length / 2 - pos_aabb[:, X]) / ray_dir_aabb[:, X]
-        tx2 = (box.shape.length / 2 - pos_aabb[:, X]) / ray_dir_aabb[:, X]
-        tx = torch.stack([tx1, tx2], dim=-1)
-        tmin, _ = torch.min(tx, dim=-1)
-        tmax, _ = torch.max(tx, dim=-1)
-
-        ty1 = (-box.shape.width / 2 - pos_aabb[:, Y]) / ray_dir_aabb[:, Y]
-        ty2 = (box.shape.width / 2 - pos_aabb[:, Y]) / ray_dir_aabb[:, Y]
-        ty = torch.stack([ty1, ty2], dim=-1)
-        tymin, _ = torch.min(ty, dim=-1)
-        tymax, _ = torch.max(ty, dim=-1)
-        tmin, _ = torch.max(torch.stack([tmin, tymin], dim=-1), dim=-1)
-        tmax, _ = torch.min(torch.stack([tmax, tymax], dim=-1), dim=-1)
-
-        intersect_aabb = tmin.unsqueeze(1) * ray_dir_aabb + pos_aabb
-        intersect_world = (
-            TorchUtils.rotate_vector(intersect_aabb, box.state.rot) + box.state.pos
-        )
-
-        collision = (tmax >= tmin) & (tmin > 0.0)
-        dist = torch.linalg.norm(ray_origin - intersect_world, dim=1)
-        dist[~collision] = max_range
-        return dist
-
-    def _cast_ray_to_sphere(
-        self,
-        sphere: Entity,
-        ray_origin: Tensor,
-        ray_direction: Tensor,
-        max_range: float,
-    ):
-        ray_dir_world = torch.stack(
-            [torch.cos(ray_direction), torch.sin(ray_direction)], dim=-1
-        )
-        test_point_pos = sphere.state.pos
-        line_rot = ray_direction
-        line_length = max_range
-        line_pos = ray_origin + ray_dir_world * (line_length / 2)
-
-        closest_point = self._get_closest_point_line(
-            line_pos, line_rot, line_length, test_point_pos, limit_to_line_length=False
-        )
-
-        d = test_point_pos - closest_point
-        d_norm = torch.linalg.vector_norm(d, dim=1)
-        ray_intersects = d_norm < sphere.shape.radius
-        m = torch.sqrt(sphere.shape.radius**2 - d_norm**2)
-
-        u = test_point_pos - ray_origin
-        u1 = closest_point - ray_origin
-
-        # Dot product of u and u1
-        u_dot_ray = torch.einsum("bs,bs->b", u, ray_dir_world)
-        sphere_is_in_front = u_dot_ray > 0.0
-        dist = torch.linalg.vector_norm(u1, dim=1) - m
-        dist[~(ray_intersects & sphere_is_in_front)] = max_range
-
-        return dist
-
-    def _cast_ray_to_line(
+    def cast_ray(
         self,
-        line: Entity,
-        ray_origin: Tensor,
-        ray_direction: Tensor,
+        entity: Entity,
+        angles: Tensor,
         max_range: float,
+        entity_filter: Callable[[Entity], bool] = lambda _: False,
     ):
-        """
-        Inspired by https://stackoverflow.com/questions/563198/how-do-you-detect-where-two-line-segments-intersect/565282#565282
-        Computes distance of ray originating from pos at angle to a line and sets distance to
-        max_range if there is no intersection.
-        """
-        assert ray_origin.ndim == 2 and ray_direction.ndim == 1
-        assert ray_origin.shape[0] == ray_direction.shape[0]
-        assert isinstance(line.shape, Line)
-
-        p = line.state.pos
-        r = (
-            torch.stack(
-                [
-                    torch.cos(line.state.rot.squeeze(1)),
-                    torch.sin(line.state.rot.squeeze(1)),
-                ],
-                dim=-1,
-            )
-            * line.shape.length
-        )
+        pos = entity.state.pos
 
-        q = ray_origin
-        s = torch.stack(
-            [
-                torch.cos(ray_direction),
-                torch.sin(ray_direction),
-            ],
-            dim=-1,
-        )
+        assert pos.ndim == 2 and angles.ndim == 1
+        assert pos.shape[0] == angles.shape[0]
 
-        rxs = TorchUtils.cross(r, s)
-        t = TorchUtils.cross(q - p, s / rxs.unsqueeze(1))
-        u = TorchUtils.cross(q - p, r / rxs.unsqueeze(1))
-        d = torch.linalg.norm(u.unsqueeze(1) * s, dim=1)
-
-        perpendicular = rxs == 0.0
-        above_line = t > 0.5
-        below_line = t < -0.5
-        behind_line = u < 0.0
-        d[perpendicular] = max_range
-        d[above_line] = max_range
-        d[below_line] = max_range
-        d[behind_line] = max_range
-        return d
+        return self.cast_rays(
+            entity, angles.unsqueeze(-1), max_range, entity_filter=entity_filter
+        )[:, 0]
 
-    def cast_ray(
+    def cast_rays(
         self,
         entity: Entity,
         angles: Tensor,
         max_range: float,
         entity_filter: Callable[[Entity], bool] = lambda _: False,
     ):
+        """
+        Casts rays at `angles` of shape (batch_dim, n_rays) from the position of `entity`
+        and returns the distance to the closest entity hit by each ray, or `max_range`.
+        All rays are cast against all the entities of a shape class in one batched computation.
+        """
         pos = entity.state.pos
 
-        assert pos.ndim == 2 and angles.ndim == 1
+        assert pos.ndim == 2 and angles.ndim == 2
         assert pos.shape[0] == angles.shape[0]
 
-        # Initialize with full max_range to avoid dists being empty when all entities are filtered
-        dists = [
-            torch.full((self.batch_dim,), fill_value=max_range, device=self.device)
-        ]
+        spheres, boxes, lines = [], [], []
         for e in self.entities:
             if entity is e or not entity_filter(e):
                 continue
@@ -1284,17 +1201,125 @@ class World(TorchVectorizedObject):
                 e
             ), "Rays are only casted among collidables"
             if isinstance(e.shape, Box):
-                d = self._cast_ray_to_box(e, pos, angles, max_range)
+                boxes.append(e)
             elif isinstance(e.shape, Sphere):
-                d = self._cast_ray_to_sphere(e, pos, angles, max_range)
+                spheres.append(e)
             elif isinstance(e.shape, Line):
-                d = self._cast_ray_to_line(e, pos, angles, max_range)
+                lines.append(e)
             else:
                 assert False, f"Shape {e.shape} currently not handled by cast_ray"
-            dists.append(d)
-        dist, _ = torch.min(torch.stack(dists, dim=-1), dim=-1)
+
+        # (batch_dim, n_rays, 1, 2) ray origins and directions against (batch_dim, 1, n_entities) entities
+        ray_origin = pos.view(-1, 1, 1, 2)
+        ray_dir = torch.stack([torch.cos(angles), torch.sin(angles)], dim=-1).unsqueeze(
+            2
+        )
+        # Initialize with full max_range to avoid dists being empty when all entities are filtered
+        dists = [
+            torch.full((*angles.shape, 1), fill_value=max_range, device=self.device)
+        ]
+        if len(spheres):
+            dists.append(
+                self._cast_rays_to_spheres(spheres, ray_origin, ray_dir, max_range)
+            )
+        if len(boxes):
+            dists.append(
+                self._cast_rays_to_boxes(boxes, ray_origin, ray_dir, max_range)
+            )
+        if len(lines):
+            dists.append(
+                self._cast_rays_to_lines(lines, ray_origin, ray_dir, max_range)
+            )
+        dist, _ = torch.min(torch.cat(dists, dim=-1), dim=-1)
         return dist
 
+    @staticmethod
+    def _stack_state(entities: List[Entity], name: str) -> Tensor:
+        # (batch_dim, 1, n_entities, ...) state of the entities
+        return torch.stack([getattr(e.state, name) for e in entities], dim=1).unsqueeze(
+            1
+        )
+
+    def _cast_rays_to_spheres(
+        self, spheres: List[Entity], ray_origin: Tensor, ray_dir: Tensor, max_range
+    ):
+        radius = self._pack_property(
+            "ray_sphere_radius", [e.shape.radius for e in spheres]
+        ).transpose(1, 2)
+        # Closest point to the sphere center on the ray line, at distance proj from the origin
+        u = self._stack_state(spheres, "pos") - ray_origin
+        proj = (u * ray_dir).sum(-1)
+        d_norm = torch.linalg.vector_norm(u - ray_dir * proj.unsqueeze(-1), dim=-1)
+        ray_intersects = d_norm < radius
+        sphere_is_in_front = proj > 0.0
+        m = torch.sqrt(radius**2 - d_norm**2)
+        return torch.where(
+            ray_intersects & sphere_is_in_front, proj.abs() - m, max_range
+        )
+
+    def _cast_rays_to_boxes(
+        self, boxes: List[Entity], ray_origin: Tensor, ray_dir: Tensor, max_range
+    ):
+        """
+        Inspired from https://tavianator.com/2011/ray_box.html
+        Works in the frame of each box, where it is axis aligned.
+        """
+        length = self._pack_property(
+            "ray_box_length", [e.shape.length for e in boxes]
+        ).transpose(1, 2)
+        width = self._pack_property(
+            "ray_box_width", [e.shape.width for e in boxes]
+        ).transpose(1, 2)
+        rot = self._stack_state(boxes, "rot").squeeze(-1)
+        cos, sin = torch.cos(rot), torch.sin(rot)
+
+        def to_aabb(vector):
+            return (
+                vector[..., X] * cos + vector[..., Y] * sin,
+                -vector[..., X] * sin + vector[..., Y] * cos,
+            )
+
+        pos_x, pos_y = to_aabb(ray_origin - self._stack_state(boxes, "pos"))
+        dir_x, dir_y = to_aabb(ray_dir)
+
+        tx1 = (-length / 2 - pos_x) / dir_x
+        tx2 = (length / 2 - pos_x) / dir_x
+        ty1 = (-width / 2 - pos_y) / dir_y
+        ty2 = (width / 2 - pos_y) / dir_y
+        tmin = torch.maximum(torch.minimum(tx1, tx2), torch.minimum(ty1, ty2))
+        tmax = torch.minimum(torch.maximum(tx1, tx2), torch.maximum(ty1, ty2))
+
+        # The ray direction is a unit vector, so tmin is the distance to the entry point
+        collision = (tmax >= tmin) & (tmin > 0.0)
+        return torch.where(collision, tmin, max_range)
+
+    def _cast_rays_to_lines(
+        self, lines: List[Entity], ray_origin: Tensor, ray_dir: Tensor, max_range
+    ):
+        """
+        Inspired by https://stackoverflow.com/questions/563198/how-do-you-detect-where-two-line-segments-intersect/565282#565282
+        """
+        length = self._pack_property(
+            "ray_line_length", [e.shape.length for e in lines]
+        ).transpose(1, 2)
+        rot = self._stack_state(lines, "rot")
+        r = torch.cat([torch.cos(rot), torch.sin(rot)], dim=-1) * length.unsqueeze(-1)
+
+        def cross(vector_a, vector_b):
+            return (
+                vector_a[..., X] * vector_b[..., Y]
+                - vector_a[..., Y] * vector_b[..., X]
+            )
+
+        q_p = ray_origin - self._stack_state(lines, "pos")
+        rxs = cross(r, ray_dir)
+        # t is the position of the hit along the line (centered), u along the ray
+        t = cross(q_p, ray_dir) / rxs
+        u = cross(q_p, r) / rxs
+
+        hit = (rxs != 0.0) & (t <= 0.5) & (t >= -0.5) & (u >= 0.0)
+        return torch.where(hit, u, max_range)
+
     def get_distance_from_point(
         self, entity: Entity, test_point_pos, env_index: int = None
     ):
@@ -1450,6 +1475,10 @@ class World(TorchVectorizedObject):
 
     # update state of the world
     def step(self):
+        if self._vectorized:
+            self._vectorized_step()
+            return
+
         # forces
         self.force = torch.zeros(
             self._batch_dim,
@@ -1466,10 +1495,19 @@ class World(TorchVectorizedObject):
             dtype=torch.float32,
         )
 
+        sphere_pairs, other_pairs = self._get_interaction_pairs()
+        collision_pairs = sphere_pairs + [
+            (a, b)
+            for a, b in other_pairs
+            if self._can_collide(self.entities[a], self.entities[b])
+        ]
+
         for substep in range(self._substeps):
             # gather forces applied to entities
             self.force[:] = 0
             self.torque[:] = 0
+            # broad phase
+            self._collision_candidates = self._get_collision_candidates(collision_pairs)
 
             for i, entity in enumerate(self.entities):
                 # apply agent force controls
@@ -1485,11 +1523,14 @@ class World(TorchVectorizedObject):
             for i, entity in enumerate(self.entities):
                 # integrate physical state
                 self._integrate_state(entity, i, substep)
+        self._collision_candidates = None
 
         # update non-differentiable comm state
         if self._dim_c > 0:
             for agent in self._agents:
                 self._update_comm_state(agent)
+            for hook in self._comm_hooks:
+                hook(self)
 
     # gather agent action forces
     def _apply_action_force(self, entity: Entity, index: int):
@@ -1514,7 +1555,8 @@ class World(TorchVectorizedObject):
                         entity.action.u, -entity.f_range, entity.f_range
                     )
                 self.force[:, index] += entity.action.u
-            assert not self.force.isnan().any()
+            if not TorchUtils.is_compiling():
+                assert not self.force.isnan().any()
 
     def _apply_action_torque(self, entity: Entity, index: int):
         if isinstance(entity, Agent) and entity.u_rot_range != 0:
@@ -1542,11 +1584,12 @@ class World(TorchVectorizedObject):
                         entity.action.u_rot, -entity.t_range, entity.t_range
                     )
                 self.torque[:, index] += entity.action.u_rot
-            assert not self.torque.isnan().any()
+            if not TorchUtils.is_compiling():
+                assert not self.torque.isnan().any()
 
     def _apply_gravity(self, entity: Entity, index: int):
         if entity.movable:
-            if not (self._gravity == 0.0).all():
+            if TorchUtils.is_compiling() or not (self._gravity == 0.0).all():
                 self.force[:, index] += entity.mass * self._gravity
             if entity.gravity is not None:
                 self.force[:, index] += entity.mass * entity.gravity
@@ -1600,6 +1643,12 @@ class World(TorchVectorizedObject):
 
     # gather physical forces acting on entities
     def _apply_environment_force(self, entity_a: Entity, a: int):
+        for b, entity_b in enumerate(self.entities):
+            if b <= a:
+                continue
+            self._apply_pair_force(entity_a, a, entity_b, b)
+
+    def _apply_pair_force(self, entity_a: Entity, a: int, entity_b: Entity, b: int):
         def apply_env_forces(f_a, t_a, f_b, t_b):
             if entity_a.movable:
                 self.force[:, a] += f_a
@@ -1610,34 +1659,82 @@ class World(TorchVectorizedObject):
             if entity_b.rotatable:
                 self.torque[:, b] += t_b
 
-        for b, entity_b in enumerate(self.entities):
-            if b <= a:
-                continue
-            # Joints
-            if frozenset({entity_a.name, entity_b.name}) in self._joints:
-                joint = self._joints[frozenset({entity_a.name, entity_b.name})]
-                apply_env_forces(*self._get_joint_forces(entity_a, entity_b, joint))
-                if joint.dist == 0:
-                    continue
-            # Collisions
-            if self.collides(entity_a, entity_b):
-                apply_env_forces(*self._get_collision_force(entity_a, entity_b))
+        # Joints
+        if frozenset({entity_a.name, entity_b.name}) in self._joints:
+            joint = self._joints[frozenset({entity_a.name, entity_b.name})]
+            apply_env_forces(*self._get_joint_forces(entity_a, entity_b, joint))
+            if joint.dist == 0:
+                return
+        # Collisions
+        if (
+            (a, b) in self._collision_candidates
+            if self._collision_candidates is not None
+            else self.collides(entity_a, entity_b)
+        ):
+            apply_env_forces(*self._get_collision_force(entity_a, entity_b))
 
     def collides(self, a: Entity, b: Entity) -> bool:
-        if (not a.collides(b)) or (not b.collides(a)) or a is b:
+        if not self._can_collide(a, b):
             return False
-        a_shape = a.shape
-        b_shape = b.shape
         if (
             torch.linalg.vector_norm(a.state.pos - b.state.pos, dim=1)
             > a.shape.circumscribed_radius() + b.shape.circumscribed_radius()
         ).all():
             return False
+        return True
+
+    def _can_collide(self, a: Entity, b: Entity) -> bool:
+        """Whether two entities can ever collide, regardless of their state"""
+        if (not a.collides(b)) or (not b.collides(a)):
+            return False
+        return self._can_collide_unfiltered(a, b)
+
+    def _can_collide_unfiltered(self, a: Entity, b: Entity) -> bool:
+        """_can_collide without the collision filters of the entities"""
+        if (not a.collide) or (not b.collide) or a is b:
+            return False
         if not a.movable and not a.rotatable and not b.movable and not b.rotatable:
             return False
-        if {a_shape.__class__, b_shape.__class__} in self._collidable_pairs:
-            return True
-        return False
+        return {a.shape.__class__, b.shape.__class__} in self._collidable_pairs
+
+    def _get_collision_candidates(
+        self, pairs: List[Tuple[int, int]], pos: Tensor = None
+    ) -> Set[Tuple[int, int]]:
+        """
+        Broad phase of the collision detection.
+        One batched check of the circumscribed circles of all the given pairs, in all envs.
+        Only the pairs that overlap in at least one env go through the narrow phase (_get_collision_force),
+        so the host waits for the device once per substep instead of once per pair.
+
+        Args:
+            pairs: pairs of entity indices that can collide
+            pos: positions of all entities of shape (batch_dim, n_entities, dim_p), stacked if not given
+
+        Returns: the candidate pairs
+        """
+        if not len(pairs):
+            return set()
+        if TorchUtils.is_compiling():
+            # The narrow phase gives no force to pairs that do not overlap,
+            # checking all of them keeps the compiled step free of data-dependent branches
+            return set(pairs)
+        entities = self.entities
+        if pos is None:
+            pos = torch.stack([entity.state.pos for entity in entities], dim=1)
+        index_a = torch.tensor([a for a, _ in pairs], device=self.device)
+        index_b = torch.tensor([b for _, b in pairs], device=self.device)
+        radius = self._pack_property(
+            "circumscribed_radius",
+            [entity.shape.circumscribed_radius() for entity in entities],
+        ).view(-1)
+        overlapping = torch.linalg.vector_norm(
+            pos[:, index_a] - pos[:, index_b], dim=-1
+        ) <= (radius[index_a] + radius[index_b])
+        return {
+            pair
+            for pair, candidate in zip(pairs, overlapping.any(dim=0).tolist())
+            if candidate
+        }
 
     def _get_joint_forces(
         self, entity_a: Entity, entity_b: Entity, joint: JointConstraint
@@ -2016,7 +2113,8 @@ class World(TorchVectorizedObject):
             closest_point[is_closest] = p[is_closest]
             distance[is_closest] = d[is_closest]
 
-        assert not closest_point.isinf().any()
+        if not TorchUtils.is_compiling():
+            assert not closest_point.isinf().any()
 
         return closest_point
 
@@ -2150,7 +2248,8 @@ class World(TorchVectorizedObject):
             force[dist > dist_min] = 0
         else:
             force[dist < dist_min] = 0
-        assert not force.isnan().any()
+        if not TorchUtils.is_compiling():
+            assert not force.isnan().any()
         return force, -force
 
     # integrate physical state
@@ -2195,9 +2294,410 @@ class World(TorchVectorizedObject):
             ) * self._sub_dt
             entity.state.rot += entity.state.ang_vel * self._sub_dt
 
-    # Performs attention to receive weighted memory vector                 
+    def _pack_property(self, name: str, values: List, width: int = 1) -> Tensor:
+        """
+        Packs one property of all entities in a tensor broadcastable to (batch_dim, n_entities, width).
+        Numeric properties are packed once and reused until one of them changes.
+        """
+        if any(isinstance(value, Tensor) for value in values):
+            return torch.stack(
+                [
+                    torch.as_tensor(
+                        value, device=self.device, dtype=torch.float32
+                    ).expand(self._batch_dim, width)
+                    for value in values
+                ],
+                dim=1,
+            )
+        values = tuple(values)
+        cached = self._packed_properties.get(name)
+        if cached is None or cached[0] != values:
+            cached = (
+                values,
+                torch.tensor(values, device=self.device, dtype=torch.float32).view(
+                    1, -1, 1
+                ),
+            )
+            self._packed_properties[name] = cached
+        return cached[1]
+
+    def _get_interaction_pairs(self):
+        """
+        Splits the entity pairs that can interact in sphere-sphere collisions, computed in batch,
+        and all the other pairs (joints, other shapes), computed pair by pair.
+
+        The split is cached and computed again when the entities, the joints or the collide flags, mobility,
+        shapes and collision filters of the entities change.
+        Collision filters can depend on the scenario state, so the pairs of entities with a filter other
+        than the default one are filtered again at every call.
+        """
+        entities = self.entities
+        structure = (
+            tuple(
+                (
+                    entity,
+                    entity.collide,
+                    entity.movable,
+                    entity.rotatable,
+                    entity.shape.__class__,
+                    entity.collision_filter,
+                )
+                for entity in entities
+            ),
+            tuple(self._joints),
+        )
+        if self._interaction_pairs is None or self._interaction_pairs[0] != structure:
+            self._interaction_pairs = (
+                structure,
+                *self._find_interaction_pairs(entities),
+                None,
+                None,
+            )
+        _, pairs, filtered_pairs, filters, split = self._interaction_pairs
+        new_filters = tuple(
+            bool(entities[a].collides(entities[b]))
+            and bool(entities[b].collides(entities[a]))
+            for a, b in filtered_pairs
+        )
+        if new_filters != filters:
+            excluded = {
+                pair
+                for pair, allowed in zip(filtered_pairs, new_filters)
+                if not allowed
+            }
+            split = (
+                [pair for pair, sphere in pairs if sphere and pair not in excluded],
+                [pair for pair, sphere in pairs if not sphere and pair not in excluded],
+            )
+            self._interaction_pairs = (
+                structure,
+                pairs,
+                filtered_pairs,
+                new_filters,
+                split,
+            )
+        return split
+
+    def _find_interaction_pairs(self, entities: List[Entity]):
+        """
+        O(n^2) scan behind _get_interaction_pairs.
+
+        Returns: the pairs that can interact, each with whether it is a sphere-sphere collision pair,
+            and the collision pairs that go through collision filters
+        """
+        pairs = []
+        filtered_pairs = []
+        for a, entity_a in enumerate(entities):
+            for b in range(a + 1, len(entities)):
+                entity_b = entities[b]
+                if frozenset({entity_a.name, entity_b.name}) in self._joints:
+                    pairs.append(((a, b), False))
+                    continue
+                if not self._can_collide_unfiltered(entity_a, entity_b):
+                    continue
+                pairs.append(
+                    (
+                        (a, b),
+                        isinstance(entity_a.shape, Sphere)
+                        and isinstance(entity_b.shape, Sphere),
+                    )
+                )
+                if (
+                    entity_a.collision_filter is not _collide_with_all
+                    or entity_b.collision_filter is not _collide_with_all
+                ):
+                    filtered_pairs.append((a, b))
+        return pairs, filtered_pairs
+
+    def _get_batched_constraint_forces(
+        self,
+        pos_a: Tensor,
+        pos_b: Tensor,
+        dist_min: Tensor,
+        force_multiplier: float,
+    ) -> Tensor:
+        """Repulsive _get_constraint_forces on (batch_dim, n_pairs, dim_p) positions, returns the force on a"""
+        min_dist = 1e-6
+        delta_pos = pos_a - pos_b
+        dist = torch.linalg.vector_norm(delta_pos, dim=-1)
+
+        # softmax penetration
+        k = self._contact_margin
+        penetration = torch.logaddexp(torch.zeros_like(dist), (dist_min - dist) / k) * k
+        force = (
+            force_multiplier
+            * delta_pos
+            / dist.unsqueeze(-1)
+            * penetration.unsqueeze(-1)
+        )
+        return torch.where(
+            ((dist < min_dist) | (dist > dist_min)).unsqueeze(-1), 0.0, force
+        )
+
+    def _get_batched_friction_force(
+        self, vel: Tensor, coeff: Tensor, mass: Tensor
+    ) -> Tensor:
+        speed = torch.linalg.vector_norm(vel, dim=-1, keepdim=True)
+        friction_force = -(vel / speed) * torch.minimum(
+            coeff * mass, (vel.abs() / self._sub_dt) * mass
+        )
+        return torch.where(speed == 0, 0.0, friction_force)
+
+    @staticmethod
+    def _batched_clamp_with_norm(tensor: Tensor, max_norm: Tensor) -> Tensor:
+        norm = torch.linalg.vector_norm(tensor, dim=-1, keepdim=True)
+        return torch.where(norm > max_norm, tensor / norm * max_norm, tensor)
+
+    def _vectorized_step(self):
+        """
+        Same physics as the entity by entity step, with the states of all entities packed in
+        (batch_dim, n_entities, ...) tensors. Action forces, friction, gravity, sphere-sphere collisions
+        and the semi-implicit euler integration are single batched ops.
+        Joints and collisions involving other shapes are still computed pair by pair.
+        """
+        entities = self.entities
+        inf = float("inf")
+        self.force = torch.zeros(
+            self._batch_dim,
+            len(entities),
+            self._dim_p,
+            device=self.device,
+            dtype=torch.float32,
+        )
+        self.torque = torch.zeros(
+            self._batch_dim,
+            len(entities),
+            1,
+            device=self.device,
+            dtype=torch.float32,
+        )
+
+        movable = [i for i, entity in enumerate(entities) if entity.movable]
+        rotatable = [i for i, entity in enumerate(entities) if entity.rotatable]
+        pushed = [i for i in movable if isinstance(entities[i], Agent)]
+        twisted = [
+            i
+            for i in rotatable
+            if isinstance(entities[i], Agent) and entities[i].u_rot_range != 0
+        ]
+        sphere_pairs, other_pairs = self._get_interaction_pairs()
+        other_collision_pairs = [
+            (a, b)
+            for a, b in other_pairs
+            if self._can_collide(entities[a], entities[b])
+        ]
+
+        mass = self._pack_property("mass", [entity.mass for entity in entities])
+        moment_of_inertia = self._pack_property(
+            "moment_of_inertia", [entity.moment_of_inertia for entity in entities]
+        )
+        linear_friction = self._pack_property(
+            "linear_friction",
+            [
+                entity.linear_friction
+                if entity.linear_friction is not None
+                else max(self._linear_friction, 0)
+                for entity in entities
+            ],
+            self._dim_p,
+        )
+        angular_friction = self._pack_property(
+            "angular_friction",
+            [
+                entity.angular_friction
+                if entity.angular_friction is not None
+                else max(self._angular_friction, 0)
+                for entity in entities
+            ],
+        )
+        drag = self._pack_property(
+            "drag",
+            [
+                entity.drag if entity.drag is not None else self._drag
+                for entity in entities
+            ],
+        )
+        max_speed = self._pack_property(
+            "max_speed",
+            [
+                entity.max_speed if entity.max_speed is not None else inf
+                for entity in entities
+            ],
+        )
+        v_range = self._pack_property(
+            "v_range",
+            [
+                entity.v_range if entity.v_range is not None else inf
+                for entity in entities
+            ],
+        )
+        if len(sphere_pairs):
+            index_a = torch.tensor(
+                [a for a, _ in sphere_pairs], device=self.device, dtype=torch.long
+            )
+            index_b = torch.tensor(
+                [b for _, b in sphere_pairs], device=self.device, dtype=torch.long
+            )
+            radius = self._pack_property(
+                "radius",
+                [
+                    entity.shape.radius if isinstance(entity.shape, Sphere) else 0.0
+                    for entity in entities
+                ],
+            )
+            dist_min = (radius[:, index_a] + radius[:, index_b]).squeeze(-1)
+            is_movable = self._pack_property(
+                "movable", [float(entity.movable) for entity in entities]
+            )
+            movable_a = is_movable[:, index_a]
+            movable_b = is_movable[:, index_b]
+
+        for substep in range(self._substeps):
+            # gather forces applied to entities
+            self.force[:] = 0
+            self.torque[:] = 0
+            pos = torch.stack([entity.state.pos for entity in entities], dim=1)
+            vel = torch.stack([entity.state.vel for entity in entities], dim=1)
+            ang_vel = torch.stack([entity.state.ang_vel for entity in entities], dim=1)
+
+            # apply agent force controls
+            if len(pushed):
+                agents = [entities[i] for i in pushed]
+                u = torch.stack([agent.action.u for agent in agents], dim=1)
+                if any(agent.u_noise for agent in agents):
+                    u = u + torch.randn_like(u) * self._pack_property(
+                        "u_noise", [agent.u_noise or 0.0 for agent in agents]
+                    )
+                u = self._batched_clamp_with_norm(
+                    u,
+                    self._pack_property(
+                        "max_f",
+                        [
+                            agent.max_f if agent.max_f is not None else inf
+                            for agent in agents
+                        ],
+                    ),
+                )
+                f_range = self._pack_property(
+                    "f_range",
+                    [
+                        agent.f_range if agent.f_range is not None else inf
+                        for agent in agents
+                    ],
+                )
+                u = torch.clamp(u, -f_range, f_range)
+                for j, agent in enumerate(agents):
+                    agent.action.u = u[:, j]
+                self.force[:, pushed] += u
+            # apply agent torque controls
+            if len(twisted):
+                agents = [entities[i] for i in twisted]
+                u_rot = torch.stack(
+                    [agent.action.u_rot.view(self._batch_dim, 1) for agent in agents],
+                    dim=1,
+                )
+                if any(agent.action.u_rot_noise for agent in agents):
+                    u_rot = u_rot + torch.randn_like(u_rot) * self._pack_property(
+                        "u_rot_noise",
+                        [agent.action.u_rot_noise or 0.0 for agent in agents],
+                    )
+                u_rot = self._batched_clamp_with_norm(
+                    u_rot,
+                    self._pack_property(
+                        "max_t",
+                        [
+                            agent.max_t if agent.max_t is not None else inf
+                            for agent in agents
+                        ],
+                    ),
+                )
+                t_range = self._pack_property(
+                    "t_range",
+                    [
+                        agent.t_range if agent.t_range is not None else inf
+                        for agent in agents
+                    ],
+                )
+                u_rot = torch.clamp(u_rot, -t_range, t_range)
+                for j, agent in enumerate(agents):
+                    agent.action.u_rot = u_rot[:, j]
+                self.torque[:, twisted] += u_rot
+            # apply friction
+            self.force += self._get_batched_friction_force(vel, linear_friction, mass)
+            self.torque += self._get_batched_friction_force(
+                ang_vel, angular_friction, moment_of_inertia
+            )
+            # apply gravity
+            if len(movable):
+                self.force[:, movable] += mass[:, movable] * self._gravity
+                for i in movable:
+                    if entities[i].gravity is not None:
+                        self.force[:, i] += entities[i].mass * entities[i].gravity
+            # apply environment forces (constraints)
+            # sphere-sphere forces are zero out of contact, so they need no broad phase
+            if len(sphere_pairs):
+                force = self._get_batched_constraint_forces(
+                    pos[:, index_a], pos[:, index_b], dist_min, self._collision_force
+                )
+                self.force.index_add_(1, index_a, force * movable_a)
+                self.force.index_add_(1, index_b, -force * movable_b)
+            self._collision_candidates = self._get_collision_candidates(
+                other_collision_pairs, pos
+            )
+            for a, b in other_pairs:
+                self._apply_pair_force(entities[a], a, entities[b], b)
+
+            # integrate physical state
+            if len(movable):
+                vel = vel[:, movable]
+                if substep == 0:
+                    vel = vel * (1 - drag[:, movable])
+                vel = vel + self.force[:, movable] / mass[:, movable] * self._sub_dt
+                vel = self._batched_clamp_with_norm(vel, max_speed[:, movable])
+                vel = torch.clamp(vel, -v_range[:, movable], v_range[:, movable])
+                new_pos = pos[:, movable] + vel * self._sub_dt
+                if self._x_semidim is not None:
+                    new_pos[..., X] = torch.clamp(
+                        new_pos[..., X], -self._x_semidim, self._x_semidim
+                    )
+                if self._y_semidim is not None:
+                    new_pos[..., Y] = torch.clamp(
+                        new_pos[..., Y], -self._y_semidim, self._y_semidim
+                    )
+                for j, i in enumerate(movable):
+                    entities[i].state.vel = vel[:, j]
+                    entities[i].state.pos = new_pos[:, j]
+            if len(rotatable):
+                ang_vel = ang_vel[:, rotatable]
+                if substep == 0:
+                    ang_vel = ang_vel * (1 - drag[:, rotatable])
+                ang_vel = (
+                    ang_vel
+                    + self.torque[:, rotatable]
+                    / moment_of_inertia[:, rotatable]
+                    * self._sub_dt
+                )
+                rot = (
+                    torch.stack([entities[i].state.rot for i in rotatable], dim=1)
+                    + ang_vel * self._sub_dt
+                )
+                for j, i in enumerate(rotatable):
+                    entities[i].state.ang_vel = ang_vel[:, j]
+                    entities[i].state.rot = rot[:, j]
+
+        self._collision_candidates = None
+
+        # update non-differentiable comm state
+        if self._dim_c > 0:
+            for agent in self._agents:
+                self._update_comm_state(agent)
+            for hook in self._comm_hooks:
+                hook(self)
+
+    # Performs attention to receive weighted memory vector
+    # Attention is invariant to the order of the slots, so it is computed directly on the ring buffer
     def weight_mem(self, obs, agent):
-        MT = torch.transpose(agent.memory, 1, 2)
+        MT = torch.transpose(agent.memory.buffer, 1, 2)
         obs = torch.unsqueeze(obs, 2)
         W = torch.nn.functional.softmax(torch.bmm(MT, obs), dim = 1)
         S = torch.bmm(torch.transpose(W, 1, 2), MT)
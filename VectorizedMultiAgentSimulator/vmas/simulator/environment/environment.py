@@ -1,7 +1,9 @@
 #  Copyright (c) 2022-2023.
 #  ProrokLab (https://www.proroklab.org/)
 #  All rights reserved.
+import copy
 import random
+import warnings
 from ctypes import byref
 from typing import List, Tuple, Callable, Optional, Union, Dict
 
@@ -24,6 +26,84 @@ from vmas.simulator.utils import (
     TorchUtils,
 )
 
+# Compiled world steps per scenario class, shared by all its environments.
+# None for the scenarios that fell back to eager mode.
+_COMPILED_STEPS: Dict[type, Optional[Callable]] = {}
+
+
+def _step_world_and_scenario(scenario: BaseScenario):
+    """Steps the world and returns the observations, rewards and infos of the policy agents"""
+    scenario.world.step()
+    observations, rewards, infos = [], [], []
+    for agent in scenario.world.policy_agents:
+        rewards.append(scenario.reward(agent))
+        observations.append(scenario.observation(agent))
+        infos.append(scenario.info(agent))
+    return observations, rewards, infos
+
+
+def _outputs_close(outputs, reference) -> bool:
+    if isinstance(outputs, Tensor):
+        return outputs.shape == reference.shape and torch.allclose(
+            outputs, reference, rtol=1e-4, atol=1e-5, equal_nan=True
+        )
+    if isinstance(outputs, dict):
+        return outputs.keys() == reference.keys() and all(
+            _outputs_close(outputs[key], reference[key]) for key in outputs
+        )
+    if isinstance(outputs, (list, tuple)):
+        return len(outputs) == len(reference) and all(
+            _outputs_close(output, ref) for output, ref in zip(outputs, reference)
+        )
+    return outputs == reference
+
+
+def _copy_state(target, source, memo: set):
+    """
+    Copies the state of source, a deep copy of target stepped separately, into target.
+    Tensors are copied in place, so the views and buffers sharing them see the new values.
+    """
+    if id(target) in memo:
+        return
+    memo.add(id(target))
+    if isinstance(target, (list, tuple)):
+        for target_item, source_item in zip(target, source):
+            _copy_state(target_item, source_item, memo)
+        return
+    items = (
+        target.items()
+        if isinstance(target, dict)
+        else vars(target).items()
+        if hasattr(target, "__dict__")
+        and not isinstance(target, (type, torch.nn.Module))
+        and not callable(target)
+        else ()
+    )
+    for name, value in list(items):
+        source_value = (
+            source.get(name)
+            if isinstance(source, dict)
+            else getattr(source, name, None)
+        )
+        if isinstance(value, Tensor):
+            if (
+                isinstance(source_value, Tensor)
+                and value.shape == source_value.shape
+                and value.dtype == source_value.dtype
+            ):
+                value.copy_(source_value)
+            elif isinstance(target, dict):
+                target[name] = source_value
+            else:
+                setattr(target, name, source_value)
+        elif isinstance(value, (bool, int, float, str, type(None))):
+            if isinstance(target, dict):
+                target[name] = source_value
+            else:
+                setattr(target, name, source_value)
+        else:
+            _copy_state(value, source_value, memo)
+
 
 # environment for all agents in the multiagent world
 # currently code assumes that no agents will be created/destroyed at runtime!
@@ -42,18 +122,49 @@ class Environment(TorchVectorizedObject):
         continuous_actions: bool = True,
         seed: Optional[int] = None,
         dict_spaces: bool = False,
+        vectorized_step: bool = False,
+        action_validation: str = "strict",
+        validation_interval: int = 100,
+        preallocate_outputs: bool = False,
+        compile_step: bool = False,
         **kwargs,
     ):
+        assert action_validation in (
+            "strict",
+            "deferred",
+            "off",
+        ), f"Unknown action validation {action_validation}, use one of strict, deferred and off"
+        assert validation_interval > 0, "Validation interval must be positive"
         self.scenario = scenario
         self.num_envs = num_envs
         TorchVectorizedObject.__init__(self, num_envs, torch.device(device))
         self.world = self.scenario.env_make_world(self.num_envs, self.device, **kwargs)
+        if vectorized_step:
+            self.world.vectorized = True
 
         self.agents = self.world.policy_agents
         self.n_agents = len(self.agents)
         self.max_steps = max_steps
         self.continuous_actions = continuous_actions
         self.dict_spaces = dict_spaces
+        self.action_validation = action_validation
+        self.validation_interval = validation_interval
+        # Violation flags kept on device in deferred validation, keyed by message
+        self._action_violations = {}
+        self._validation_steps = 0
+        self.preallocate_outputs = preallocate_outputs
+        # Output buffers of shape (num_envs, n_agents, obs_dim) and (num_envs, n_agents) when preallocate_outputs is set,
+        # the observation buffer is allocated at the first observations
+        self.observation_buffer = None
+        self.reward_buffer = (
+            torch.zeros((num_envs, self.n_agents), device=self.device)
+            if preallocate_outputs
+            else None
+        )
+
+        self.compile_step = compile_step
+        # Number of compiled steps of this environment, used to schedule the checks against eager steps
+        self._compiled_step_count = 0
 
         self.reset(seed=seed)
 
@@ -63,6 +174,7 @@ class Environment(TorchVectorizedObject):
 
         # rendering
         self.viewer = None
+        self.render_backend = None
         self.headless = None
         self.visible_display = None
         self.text_lines = None
@@ -123,11 +235,24 @@ class Environment(TorchVectorizedObject):
         get_infos: bool,
         get_dones: bool,
         dict_agent_names: Optional[bool] = None,
+        clone: Optional[bool] = None,
+        scenario_outputs: Optional[Tuple[List, List, List]] = None,
     ):
+        """
+        Gets the outputs of the scenario for all agents.
+
+        With preallocated outputs, observations and rewards are written in `observation_buffer` and `reward_buffer`
+        and the returned tensors are views of these buffers, overwritten at the next call.
+        Pass `clone=True` to get copies instead. Without preallocated outputs, copies are returned unless `clone=False`.
+        `scenario_outputs` are the observations, rewards and infos of all agents when already computed
+        by the compiled step.
+        """
         if not get_infos and not get_dones and not get_rewards and not get_observations:
             return
         if dict_agent_names is None:
             dict_agent_names = self.dict_spaces
+        if clone is None:
+            clone = not self.preallocate_outputs
 
         obs = rewards = infos = dones = None
 
@@ -138,34 +263,80 @@ class Environment(TorchVectorizedObject):
         if get_infos:
             infos = {} if dict_agent_names else []
 
-        for agent in self.agents:
+        for i, agent in enumerate(self.agents):
             if get_rewards:
-                reward = self.scenario.reward(agent).clone()
+                reward = (
+                    self.scenario.reward(agent)
+                    if scenario_outputs is None
+                    else scenario_outputs[1][i]
+                )
+                if self.preallocate_outputs:
+                    reward = self.reward_buffer[:, i].copy_(reward)
+                if clone:
+                    reward = reward.clone()
                 if dict_agent_names:
                     rewards.update({agent.name: reward})
                 else:
                     rewards.append(reward)
             if get_observations:
-                observation = TorchUtils.recursive_clone(
-                    self.scenario.observation(agent)
-                )
+                if self.observation_buffer is not None:
+                    observation = self.observation_buffer[:, i]
+                    if scenario_outputs is None:
+                        self.scenario.observation_into(agent, observation)
+                    else:
+                        observation.copy_(scenario_outputs[0][i])
+                elif scenario_outputs is None:
+                    observation = self.scenario.observation(agent)
+                else:
+                    observation = scenario_outputs[0][i]
+                if clone:
+                    observation = TorchUtils.recursive_clone(observation)
                 if dict_agent_names:
                     obs.update({agent.name: observation})
                 else:
                     obs.append(observation)
             if get_infos:
-                info = TorchUtils.recursive_clone(self.scenario.info(agent))
+                info = (
+                    self.scenario.info(agent)
+                    if scenario_outputs is None
+                    else scenario_outputs[2][i]
+                )
+                if clone:
+                    info = TorchUtils.recursive_clone(info)
                 if dict_agent_names:
                     infos.update({agent.name: info})
                 else:
                     infos.append(info)
 
+        if (
+            get_observations
+            and self.preallocate_outputs
+            and self.observation_buffer is None
+        ):
+            # First observations, the buffer takes their size
+            self._allocate_observation_buffer(
+                list(obs.values()) if dict_agent_names else obs
+            )
+            if not clone:
+                views = [self.observation_buffer[:, i] for i in range(self.n_agents)]
+                obs = dict(zip(obs.keys(), views)) if dict_agent_names else views
+
         if get_dones:
             dones = self.done()
 
         result = [obs, rewards, dones, infos]
         return [data for data in result if data is not None]
 
+    def _allocate_observation_buffer(self, observations: List[Tensor]):
+        for observation in observations:
+            assert isinstance(
+                observation, Tensor
+            ), "Preallocated outputs require tensor observations"
+            assert (
+                observation.shape == observations[0].shape
+            ), "Preallocated outputs require observations of the same size for all agents"
+        self.observation_buffer = torch.stack(observations, dim=1)
+
     def seed(self, seed=None):
         if seed is None:
             seed = 0
@@ -225,13 +396,25 @@ class Environment(TorchVectorizedObject):
         # Scenarios can define a custom action processor. This step takes care also of scripted agents automatically
         for agent in self.world.agents:
             self.scenario.env_process_action(agent)
+        if self.action_validation == "deferred":
+            self._validation_steps += 1
+            if self._validation_steps % self.validation_interval == 0:
+                self.check_action_violations()
 
         # advance world state
-        self.world.step()
+        scenario_outputs = None
+        if self.compile_step:
+            scenario_outputs = self._compiled_world_step()
+        else:
+            self.world.step()
 
         self.steps += 1
         obs, rewards, dones, infos = self.get_from_scenario(
-            get_observations=True, get_infos=True, get_rewards=True, get_dones=True
+            get_observations=True,
+            get_infos=True,
+            get_rewards=True,
+            get_dones=True,
+            scenario_outputs=scenario_outputs,
         )
 
         # print("\nStep results in unwrapped environment")
@@ -252,6 +435,86 @@ class Environment(TorchVectorizedObject):
         # print(f"Info len (n_agents): {len(infos)}, info[0] (infos agent 0): {infos[0]}")
         return obs, rewards, dones, infos
 
+    def _compiled_world_step(self) -> Optional[Tuple[List, List, List]]:
+        """
+        Steps the world with the step compiled for the scenario by torch.compile, and returns the observations,
+        rewards and infos of the agents. Returns None when the world was stepped in eager mode.
+
+        The world step and the scenario outputs are traced into one graph per scenario class, with fixed shapes.
+        The compiled results are checked against an eager step from the same state at steps 1, 2, 4, 8, ... of each
+        environment, so that late divergences are caught at a logarithmic cost.
+        If the scenario cannot be traced at any step (for example because of data-dependent Python control flow
+        or because it keeps recompiling) or the results differ, the scenario falls back to eager mode with a warning.
+        """
+        scenario_type = type(self.scenario)
+        if scenario_type not in _COMPILED_STEPS:
+            _COMPILED_STEPS[scenario_type] = torch.compile(
+                _step_world_and_scenario,
+                fullgraph=True,
+                dynamic=False,
+                # Random numbers are drawn as in eager mode, from the same generator
+                options={"fallback_random": True},
+            )
+        compiled_step = _COMPILED_STEPS[scenario_type]
+        if compiled_step is None:
+            self.world.step()
+            return None
+        self._compiled_step_count += 1
+        check = self._compiled_step_count & (self._compiled_step_count - 1) == 0
+
+        rng_state = self._get_rng_state()
+        try:
+            reference = copy.deepcopy(self.scenario) if check else None
+            outputs = compiled_step(self.scenario)
+        except Exception as error:
+            # Tracing fails before running the graph, the world was not stepped
+            self._fall_back_to_eager(f"it could not be compiled: {error}")
+            self._set_rng_state(rng_state)
+            self.world.step()
+            return None
+        if not check:
+            return outputs
+        compiled_rng_state = self._get_rng_state()
+        self._set_rng_state(rng_state)
+        reference_outputs = _step_world_and_scenario(reference)
+
+        states, reference_states = [
+            [
+                [entity.state.pos, entity.state.vel, entity.state.rot]
+                for entity in scenario.world.entities
+            ]
+            for scenario in (self.scenario, reference)
+        ]
+        if not _outputs_close((outputs, states), (reference_outputs, reference_states)):
+            self._fall_back_to_eager(
+                f"its results differ from eager mode at step {self._compiled_step_count}"
+            )
+            # The world continues from the eager step
+            _copy_state(self.scenario, reference, set())
+            return reference_outputs
+        self._set_rng_state(compiled_rng_state)
+        return outputs
+
+    def _fall_back_to_eager(self, reason: str):
+        scenario_type = type(self.scenario)
+        warnings.warn(
+            f"Falling back to eager mode for the step of {scenario_type.__name__}, as {reason}"
+        )
+        _COMPILED_STEPS[scenario_type] = None
+
+    def _get_rng_state(self):
+        return (
+            torch.get_rng_state(),
+            torch.cuda.get_rng_state(self.device)
+            if self.device.type == "cuda"
+            else None,
+        )
+
+    def _set_rng_state(self, rng_state):
+        torch.set_rng_state(rng_state[0])
+        if rng_state[1] is not None:
+            torch.cuda.set_rng_state(rng_state[1], self.device)
+
     def done(self):
         dones = self.scenario.done().clone()
         if self.max_steps is not None:
@@ -355,11 +618,45 @@ class Environment(TorchVectorizedObject):
                 f"Invalid type of observation {obs} for agent {agent.name}"
             )
 
+    def check_action_violations(self):
+        """Reports the actions out of range accumulated since the last call in deferred validation.
+        This is the only host sync of the deferred mode, it is run every `validation_interval` steps.
+        """
+        if not len(self._action_violations):
+            return
+        messages = list(self._action_violations.keys())
+        flags = torch.stack(list(self._action_violations.values())).tolist()
+        self._action_violations = {}
+        violations = [message for message, flag in zip(messages, flags) if flag]
+        assert not len(violations), "\n".join(violations)
+
+    def _validate_action(self, violation: Tensor, message: str):
+        # violation is a boolean mask of the actions out of range
+        if self.action_validation == "strict":
+            assert not torch.any(violation), message
+        elif self.action_validation == "deferred":
+            violation = torch.any(violation)
+            if message in self._action_violations:
+                self._action_violations[message] |= violation
+            else:
+                self._action_violations[message] = violation
+
+    def _check_continuous_action(
+        self, action: Tensor, low: float, high: float, message: str
+    ):
+        self._validate_action((action < low) | (action > high), message)
+        if self.action_validation != "strict":
+            action = action.clamp(low, high)
+        return action
+
     def _check_discrete_action(self, action: Tensor, low: int, high: int, type: str):
-        assert torch.all(
-            (action >= torch.tensor(low, device=self.device))
-            * (action < torch.tensor(high, device=self.device))
-        ), f"Discrete {type} actions are out of bounds, allowed int range [{low},{high})"
+        self._validate_action(
+            (action < low) | (action >= high),
+            f"Discrete {type} actions are out of bounds, allowed int range [{low},{high})",
+        )
+        if self.action_validation != "strict":
+            action = action.clamp(low, high - 1)
+        return action
 
     # set env action for a particular agent
     def _set_action(self, action, agent):
@@ -377,15 +674,18 @@ class Environment(TorchVectorizedObject):
         if self.continuous_actions:
             physical_action = action[:, action_index : action_index + self.world.dim_p]
             action_index += self.world.dim_p
-            assert not torch.any(
-                torch.abs(physical_action) > agent.u_range
-            ), f"Physical actions of agent {agent.name} are out of its range {agent.u_range}"
+            physical_action = self._check_continuous_action(
+                physical_action,
+                -agent.u_range,
+                agent.u_range,
+                f"Physical actions of agent {agent.name} are out of its range {agent.u_range}",
+            )
 
             agent.action.u = physical_action.to(torch.float32)
         else:
             physical_action = action[:, action_index].unsqueeze(-1)
             action_index += 1
-            self._check_discrete_action(
+            physical_action = self._check_discrete_action(
                 physical_action,
                 low=0,
                 high=self.world.dim_p * 2 + 1,
@@ -409,9 +709,12 @@ class Environment(TorchVectorizedObject):
             if self.continuous_actions:
                 physical_action = action[:, action_index].unsqueeze(-1)
                 action_index += 1
-                assert not torch.any(
-                    torch.abs(physical_action) > agent.u_rot_range
-                ), f"Physical rotation actions of agent {agent.name} are out of its range {agent.u_rot_range}"
+                physical_action = self._check_continuous_action(
+                    physical_action,
+                    -agent.u_rot_range,
+                    agent.u_rot_range,
+                    f"Physical rotation actions of agent {agent.name} are out of its range {agent.u_rot_range}",
+                )
                 agent.action.u_rot = physical_action.to(torch.float32)
 
             else:
@@ -420,7 +723,7 @@ class Environment(TorchVectorizedObject):
                 )
                 physical_action = action[:, action_index].unsqueeze(-1)
                 action_index += 1
-                self._check_discrete_action(
+                physical_action = self._check_discrete_action(
                     physical_action,
                     low=0,
                     high=3,
@@ -439,7 +742,7 @@ class Environment(TorchVectorizedObject):
         if self.world.dim_c > 0 and not agent.silent:
             if not self.continuous_actions:
                 comm_action = action[:, action_index:]
-                self._check_discrete_action(
+                comm_action = self._check_discrete_action(
                     comm_action, 0, self.world.dim_c, "communication"
                 )
                 comm_action = comm_action.long()
@@ -453,15 +756,15 @@ class Environment(TorchVectorizedObject):
                 agent.action.c.scatter_(1, comm_action, 1)
             else:
                 comm_action = action[:, action_index:]
-                assert not torch.any(comm_action > 1) and not torch.any(
-                    comm_action < 0
-                ), "Comm actions are out of range [0,1]"
+                comm_action = self._check_continuous_action(
+                    comm_action, 0, 1, "Comm actions are out of range [0,1]"
+                )
                 agent.action.c = comm_action
 
     def render(
         self,
         mode="human",
-        env_index=0,
+        env_index: Union[int, List[int], np.ndarray] = 0,
         agent_index_focus: int = None,
         visualize_when_rgb: bool = False,
         plot_position_function: Callable = None,
@@ -475,9 +778,10 @@ class Environment(TorchVectorizedObject):
         ] = None,
         plot_position_function_cmap_range: Optional[Tuple[float, float]] = None,
         plot_position_function_cmap_alpha: Optional[float] = 1.0,
+        backend: str = "pyglet",
     ):
         """
-        Render function for environment using pyglet
+        Render function for environment using pyglet or a NumPy software rasterizer
 
         On servers use mode="rgb_array" and set
         ```
@@ -486,7 +790,8 @@ class Environment(TorchVectorizedObject):
         ```
 
         :param mode: One of human or rgb_array
-        :param env_index: Index of the environment to render
+        :param env_index: Index of the environment to render. With mode=="rgb_array", it can be a list of indices
+                          and the frames of these environments are returned stacked in one array
         :param agent_index_focus: If specified the camera will stay on the agent with this index.
                                   If None, the camera will stay in the center and zoom out to contain all agents
         :param visualize_when_rgb: Also run human visualization when mode=="rgb_array"
@@ -501,12 +806,39 @@ class Environment(TorchVectorizedObject):
         If Tuple[Tuple[float, float], Tuple[float, float]], the first tuple is the x range and the second tuple is the y range
         :param plot_position_function_cmap_range: The range of the cmap in case plot_position_function outputs a single value
         :param plot_position_function_cmap_alpha: The alpha of the cmap in case plot_position_function outputs a single value
+        :param backend: One of pyglet or numpy. The numpy backend draws the frames without pyglet, OpenGL or a display,
+                        it only supports mode=="rgb_array" without visualization and does not draw text
         :return: Rgb array or None, depending on the mode
         """
-        self._check_batch_index(env_index)
         assert (
             mode in self.metadata["render.modes"]
         ), f"Invalid mode {mode} received, allowed modes: {self.metadata['render.modes']}"
+        if isinstance(env_index, (list, tuple, range, np.ndarray)):
+            assert (
+                mode == "rgb_array"
+            ), "Several environments can only be rendered in rgb_array mode"
+            return np.stack(
+                [
+                    self.render(
+                        mode=mode,
+                        env_index=int(index),
+                        agent_index_focus=agent_index_focus,
+                        visualize_when_rgb=visualize_when_rgb,
+                        plot_position_function=plot_position_function,
+                        plot_position_function_precision=plot_position_function_precision,
+                        plot_position_function_range=plot_position_function_range,
+                        plot_position_function_cmap_range=plot_position_function_cmap_range,
+                        plot_position_function_cmap_alpha=plot_position_function_cmap_alpha,
+                        backend=backend,
+                    )
+                    for index in env_index
+                ]
+            )
+        self._check_batch_index(env_index)
+        assert backend in (
+            "pyglet",
+            "numpy",
+        ), f"Unknown render backend {backend}, use one of pyglet and numpy"
         if agent_index_focus is not None:
             assert 0 <= agent_index_focus < self.n_agents, (
                 f"Agent focus in rendering should be a valid agent index"
@@ -525,7 +857,11 @@ class Environment(TorchVectorizedObject):
             assert self.visible_display is not headless
 
         # First time rendering
-        if self.viewer is None:
+        if self.viewer is None and backend == "numpy":
+            assert headless, "The numpy backend can only render rgb arrays"
+            self.render_backend = backend
+            self._init_rendering()
+        elif self.viewer is None:
             try:
                 import pyglet
             except ImportError:
@@ -549,7 +885,13 @@ class Environment(TorchVectorizedObject):
                 self.headless = False
             pyglet.options["headless"] = self.headless
 
+            self.render_backend = backend
             self._init_rendering()
+        # All other times the backend should be the same
+        else:
+            assert (
+                self.render_backend == backend
+            ), f"Rendering started with the {self.render_backend} backend, got {backend}"
 
         zoom = max(VIEWER_MIN_ZOOM, self.scenario.viewer_zoom)
 
@@ -648,11 +990,15 @@ class Environment(TorchVectorizedObject):
     def _init_rendering(self):
         from vmas.simulator import rendering
 
+        self.text_lines = []
+        if self.render_backend == "numpy":
+            self.viewer = rendering.SoftwareViewer(*self.scenario.viewer_size)
+            return
+
         self.viewer = rendering.Viewer(
             *self.scenario.viewer_size, visible=self.visible_display
         )
 
-        self.text_lines = []
         idx = 0
         if self.world.dim_c > 0:
             for agent in self.world.agents:
@@ -664,7 +1010,7 @@ class Environment(TorchVectorizedObject):
 
     def _set_agent_comm_messages(self, env_index: int):
         # Render comm messages
-        if self.world.dim_c > 0:
+        if self.world.dim_c > 0 and len(self.text_lines):
             idx = 0
             for agent in self.world.agents:
                 if not agent.silent:
@@ -116,36 +116,28 @@ class VectorEnvWrapper(rllib.VectorEnv):
 
     def _action_list_to_tensor(self, list_in: List) -> List:
         if len(list_in) == self.num_envs:
-            actions = []
-            for agent in self._env.agents:
-                actions.append(
-                    torch.zeros(
-                        self.num_envs,
-                        self._env.get_agent_action_size(agent),
-                        device=self._env.device,
-                        dtype=torch.float32,
-                    )
-                )
             for j in range(self.num_envs):
                 assert (
                     len(list_in[j]) == self._env.n_agents
                 ), f"Expecting actions for {self._env.n_agents} agents, got {len(list_in[j])} actions"
-                for i in range(self._env.n_agents):
-                    act = torch.tensor(
-                        list_in[j][i], dtype=torch.float32, device=self._env.device
+            actions = []
+            for i, agent in enumerate(self._env.agents):
+                # One array and one transfer per agent for the actions of all envs
+                act = np.asarray(
+                    [env_actions[i] for env_actions in list_in], dtype=np.float32
+                )
+                action_size = self._env.get_agent_action_size(agent)
+                if len(act.shape) == 1:
+                    assert (
+                        action_size == 1
+                    ), f"Actions of agent {i} are supposed to be scalar ints"
+                    act = act.reshape(self.num_envs, 1)
+                else:
+                    assert len(act.shape) == 2 and act.shape[1] == action_size, (
+                        f"Actions of agent {i} have wrong shape: "
+                        f"expected {action_size}, got {act.shape[1:]}"
                     )
-                    if len(act.shape) == 0:
-                        assert (
-                            self._env.get_agent_action_size(self._env.agents[i]) == 1
-                        ), f"Action of agent {i} in env {j} is supposed to be an scalar int"
-                    else:
-                        assert len(act.shape) == 1 and act.shape[
-                            0
-                        ] == self._env.get_agent_action_size(self._env.agents[i]), (
-                            f"Action of agent {i} in env {j} hase wrong shape: "
-                            f"expected {self._env.get_agent_action_size(self._env.agents[i])}, got {act.shape[0]}"
-                        )
-                    actions[i][j] = act
+                actions.append(torch.from_numpy(act).to(self._env.device))
             return actions
         else:
             assert False, "Input action is not in correct format"
@@ -157,102 +149,98 @@ class VectorEnvWrapper(rllib.VectorEnv):
         reward: Optional[REWARD_TYPE] = None,
         env_index: Optional[int] = None,
     ):
-        if env_index is None:
-            obs_list = []
-            if info:
-                info_list = []
-            if reward:
-                rew_list = []
+        n_envs = self.num_envs
+        if env_index is not None:
+            # Only the rows of this env are moved to the host
+            obs, info, reward = (
+                self._select_env(data, env_index) if data else data
+                for data in (obs, info, reward)
+            )
+            n_envs = 1
 
-            for env_index in range(self.num_envs):
-                (
-                    observations_processed,
-                    info_processed,
-                    reward_processed,
-                ) = self._get_data_at_env_index(env_index, obs, info, reward)
-                obs_list.append(observations_processed)
-                if info:
-                    info_list.append(info_processed)
-                if reward:
-                    rew_list.append(reward_processed)
-
-            return obs_list, info_list if info else None, rew_list if reward else None
-        else:
-            return self._get_data_at_env_index(env_index, obs, info, reward)
-
-    def _get_data_at_env_index(
-        self,
-        env_index: int,
-        obs: Optional[OBS_TYPE],
-        info: Optional[INFO_TYPE] = None,
-        reward: Optional[REWARD_TYPE] = None,
-    ):
         assert len(obs) == self._env.n_agents
-        total_rew = 0.0
-        if info:
-            new_info = {"rewards": {}}
         if isinstance(obs, Dict):
-            new_obs = {}
-            for agent_index, agent in enumerate(self._env.agents):
-                new_obs[agent.name] = self._get_agent_data_at_env_index(
-                    env_index, obs[agent.name]
-                )
-                if info:
-                    new_info[agent.name] = self._get_agent_data_at_env_index(
-                        env_index, info[agent.name]
-                    )
-                if reward:
-                    agent_rew = self._get_agent_data_at_env_index(
-                        env_index, reward[agent.name]
-                    )
-                    new_info["rewards"].update({agent_index: agent_rew})
-                    total_rew += agent_rew
-
+            keys = [agent.name for agent in self._env.agents]
         elif isinstance(obs, List):
-            new_obs = []
-            for agent_index, agent in enumerate(self._env.agents):
-                new_obs.append(
-                    self._get_agent_data_at_env_index(env_index, obs[agent_index])
-                )
-                if info:
-                    new_info[agent.name] = self._get_agent_data_at_env_index(
-                        env_index, info[agent_index]
-                    )
-                if reward:
-                    agent_rew = self._get_agent_data_at_env_index(
-                        env_index, reward[agent_index]
-                    )
-                    new_info["rewards"].update({agent_index: agent_rew})
-                    total_rew += agent_rew
-
+            keys = list(range(self._env.n_agents))
         else:
             raise ValueError(f"Unsupported obs type {obs}")
 
-        return (
-            new_obs,
-            new_info if info else None,
-            total_rew / self._env.n_agents if reward else None,
-        )
+        # Each agent data is moved to the host once and split in rows, one per env
+        obs_rows = [self._get_agent_rows(obs[key], n_envs) for key in keys]
+        if info:
+            info_rows = [self._get_agent_rows(info[key], n_envs) for key in keys]
+        if reward:
+            rew_rows = [self._get_agent_rows(reward[key], n_envs) for key in keys]
 
-    def _get_agent_data_at_env_index(
-        self,
-        env_index: int,
-        agent_data,
-    ):
+        if isinstance(obs, Dict):
+            obs_list = [
+                {key: rows[j] for key, rows in zip(keys, obs_rows)}
+                for j in range(n_envs)
+            ]
+        else:
+            obs_list = [[rows[j] for rows in obs_rows] for j in range(n_envs)]
+
+        if info:
+            info_list = []
+            for j in range(n_envs):
+                new_info = {"rewards": {}}
+                for agent, rows in zip(self._env.agents, info_rows):
+                    new_info[agent.name] = rows[j]
+                info_list.append(new_info)
+        if reward:
+            rew_list = []
+            for j in range(n_envs):
+                total_rew = 0.0
+                for agent_index, rows in enumerate(rew_rows):
+                    if info:
+                        info_list[j]["rewards"].update({agent_index: rows[j]})
+                    total_rew += rows[j]
+                rew_list.append(total_rew / self._env.n_agents)
+
+        if env_index is not None:
+            return (
+                obs_list[0],
+                info_list[0] if info else None,
+                rew_list[0] if reward else None,
+            )
+        return obs_list, info_list if info else None, rew_list if reward else None
+
+    def _select_env(self, data, env_index: int):
+        if isinstance(data, (ndarray, Tensor)):
+            assert data.shape[0] == self._env.num_envs
+            return data[env_index : env_index + 1]
+        elif isinstance(data, Dict):
+            return {
+                key: self._select_env(value, env_index) for key, value in data.items()
+            }
+        elif isinstance(data, List):
+            return [self._select_env(value, env_index) for value in data]
+        else:
+            raise ValueError(f"Unsupported data type {data}")
+
+    def _get_agent_rows(self, agent_data, n_envs: int) -> List:
+        """
+        Returns the data of one agent for each env, as python scalars for scalar data
+        and as row views of one host array otherwise
+        """
         if isinstance(agent_data, (ndarray, Tensor)):
-            assert agent_data.shape[0] == self._env.num_envs
+            assert agent_data.shape[0] == n_envs
+            if isinstance(agent_data, Tensor):
+                agent_data = TorchUtils.to_numpy(agent_data)
             if len(agent_data.shape) == 1 or (
                 len(agent_data.shape) == 2 and agent_data.shape[1] == 1
             ):
-                return agent_data[env_index].item()
-            elif isinstance(agent_data, Tensor):
-                return agent_data[env_index].cpu().detach().numpy()
+                return agent_data.reshape(-1).tolist()
             else:
-                return agent_data[env_index]
+                return list(agent_data)
         elif isinstance(agent_data, Dict):
-            return {
-                key: self._get_agent_data_at_env_index(env_index, value)
-                for key, value in agent_data.items()
-            }
+            rows = [
+                self._get_agent_rows(value, n_envs) for value in agent_data.values()
+            ]
+            return [
+                {key: values[j] for key, values in zip(agent_data.keys(), rows)}
+                for j in range(n_envs)
+            ]
         else:
             raise ValueError(f"Unsupported data type {agent_data}")
@@ -0,0 +1,84 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+
+import typing
+
+import torch
+from torch import Tensor
+
+from vmas.simulator.core import TorchVectorizedObject
+
+
+class EpisodicMemory(TorchVectorizedObject):
+    """
+    Fixed-length episodic memory of agent observations.
+
+    The memory is a preallocated circular buffer of shape (batch_dim, dim, length) living on the world device.
+    Writes go to the slot pointed by a write pointer which then advances, overwriting the oldest entry.
+    This avoids reallocating and copying the whole history at every step.
+
+    Slots are stored in ring order (the oldest entry is at the write pointer).
+    Use `ordered` to get the entries in chronological order.
+    The write pointer is a tensor on the world device, so a compiled step does not depend on its value.
+    """
+
+    def __init__(
+        self,
+        batch_dim: int,
+        device: torch.device,
+        dim: int,
+        length: int = 500,
+    ):
+        assert dim > 0, f"Memory dim must be > 0, got {dim}"
+        assert length > 0, f"Memory length must be > 0, got {length}"
+        super().__init__(batch_dim, device)
+        self._dim = dim
+        self._length = length
+        self._buffer = torch.zeros(
+            (batch_dim, dim, length), device=device, dtype=torch.float32
+        )
+        # index of the slot that will be written next (always the oldest one)
+        self._ptr = torch.zeros((), device=device, dtype=torch.long)
+
+    @property
+    def dim(self):
+        return self._dim
+
+    @property
+    def length(self):
+        return self._length
+
+    @property
+    def buffer(self) -> Tensor:
+        """Memory slots in ring order, shape (batch_dim, dim, length)"""
+        return self._buffer
+
+    @property
+    def ptr(self) -> Tensor:
+        """Index of the slot written next, 0-dim tensor"""
+        return self._ptr
+
+    def push(self, value: Tensor):
+        """Writes `value` of shape (batch_dim, dim) in place of the oldest entry"""
+        assert value.shape == (
+            self.batch_dim,
+            self.dim,
+        ), f"Memory entries must have shape {(self.batch_dim, self.dim)}, got {tuple(value.shape)}"
+        self._buffer.index_copy_(2, self._ptr.view(1), value.unsqueeze(-1))
+        self._ptr.add_(1).remainder_(self._length)
+
+    def ordered(self) -> Tensor:
+        """Memory slots in chronological order (oldest first). Allocates a new tensor."""
+        order = (
+            self._ptr + torch.arange(self._length, device=self.device)
+        ) % self._length
+        return self._buffer[:, :, order]
+
+    def reset(self, env_index: typing.Optional[int] = None):
+        self._check_batch_index(env_index)
+        if env_index is None:
+            self._buffer.zero_()
+            self._ptr.zero_()
+        else:
+            self._buffer[env_index] = 0.0
@@ -0,0 +1,183 @@
+#  Copyright (c) 2022-2023.
+#  ProrokLab (https://www.proroklab.org/)
+#  All rights reserved.
+
+import json
+import os
+import typing
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import torch
+from torch import Tensor
+
+if typing.TYPE_CHECKING:
+    from vmas.simulator.core import World
+
+
+class CommRecorder:
+    """
+    Streams the messages exchanged by the agents to memory-mapped files, one file per column.
+
+    At every step of the world, for every env, the recorder stores the step and the env index and,
+    for each agent, its comm action `action.c` and its comm state `state.c` (the message with noise).
+    Extra columns can be recorded with `extra_columns`, a dict of callables taking the world and returning
+    a tensor of shape (batch_dim, ...), for example the goal colour from the scenario.
+
+    Steps are buffered on the world device and written to the files in chunks of `chunk_size` steps,
+    with one transfer to the host per chunk. The files are preallocated for `max_steps` steps,
+    they can be read back with `CommRecorder.load` without loading them in memory.
+
+    Example:
+        >>> env = make_env("simple_reference_idiolect", num_envs=1000)
+        >>> scenario = env.scenario
+        >>> recorder = CommRecorder(
+        ...     env.world,
+        ...     "comms",
+        ...     max_steps=100_000,
+        ...     extra_columns={
+        ...         "goal_color": lambda world: scenario.landmark_colors[
+        ...             scenario.all_envs.unsqueeze(-1), scenario.goal_idx
+        ...         ]
+        ...     },
+        ... )
+        >>> ...  # step the env
+        >>> recorder.close()
+        >>> columns = CommRecorder.load("comms")
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(
+        self,
+        world: "World",
+        folder: str,
+        max_steps: int,
+        chunk_size: int = 1000,
+        extra_columns: Optional[Dict[str, Callable[["World"], Tensor]]] = None,
+    ):
+        assert world.dim_c > 0, "The world has no communication to record"
+        self.world = world
+        self.folder = folder
+        self.max_steps = max_steps
+        self.chunk_size = min(chunk_size, max_steps)
+        self.extra_columns = extra_columns if extra_columns is not None else {}
+
+        self._sources: Dict[str, Callable[["World"], Tensor]] = {}
+        for agent in world.agents:
+            if agent.silent:
+                continue
+            self._sources[
+                f"{agent.name}.action_c"
+            ] = lambda world, agent=agent: agent.action.c
+            self._sources[
+                f"{agent.name}.state_c"
+            ] = lambda world, agent=agent: agent.state.c
+        self._sources.update(self.extra_columns)
+
+        # Allocated at the first step, when the width of the extra columns is known
+        self._buffers: Dict[str, Tensor] = {}
+        self._files: Dict[str, np.memmap] = {}
+        self._buffered_steps = 0
+        self._written_steps = 0
+
+        os.makedirs(folder, exist_ok=True)
+        # Known on the host, written at each flush without touching the device
+        for name in ("step", "env_index"):
+            self._files[name] = self._open(name, np.dtype(np.int64), 1)
+        world.register_comm_hook(self.record)
+
+    @property
+    def n_steps(self) -> int:
+        return self._written_steps + self._buffered_steps
+
+    def record(self, world: "World"):
+        """Buffers the current step, called by the world after the comm states are updated"""
+        assert (
+            self.n_steps < self.max_steps
+        ), f"Comm recorder is full, it was allocated for {self.max_steps} steps"
+        for name, source in self._sources.items():
+            value = source(world).reshape(world.batch_dim, -1)
+            if name not in self._buffers:
+                self._allocate(name, value)
+            self._buffers[name][self._buffered_steps] = value
+        self._buffered_steps += 1
+        if self._buffered_steps == self.chunk_size:
+            self.flush()
+
+    def _allocate(self, name: str, value: Tensor):
+        self._buffers[name] = torch.zeros(
+            self.chunk_size, *value.shape, device=value.device, dtype=value.dtype
+        )
+        self._files[name] = self._open(
+            name, torch.zeros(0, dtype=value.dtype).numpy().dtype, value.shape[-1]
+        )
+
+    def _open(self, name: str, dtype: np.dtype, width: int) -> np.memmap:
+        return np.memmap(
+            os.path.join(self.folder, f"{name}.bin"),
+            dtype=dtype,
+            mode="w+",
+            shape=(self.max_steps * self.world.batch_dim, width),
+        )
+
+    def flush(self):
+        """Writes the buffered steps to the files"""
+        n = self._buffered_steps
+        batch_dim = self.world.batch_dim
+        if n > 0:
+            rows = slice(
+                self._written_steps * batch_dim, (self._written_steps + n) * batch_dim
+            )
+            steps = np.arange(self._written_steps, self._written_steps + n)
+            self._files["step"][rows, 0] = np.repeat(steps, batch_dim)
+            self._files["env_index"][rows, 0] = np.tile(np.arange(batch_dim), n)
+            for name, buffer in self._buffers.items():
+                self._files[name][rows] = (
+                    buffer[:n].reshape(n * batch_dim, -1).cpu().numpy()
+                )
+            for file in self._files.values():
+                file.flush()
+            self._written_steps += n
+            self._buffered_steps = 0
+
+        columns = {
+            name: {"dtype": file.dtype.str, "width": file.shape[-1]}
+            for name, file in self._files.items()
+        }
+        with open(os.path.join(self.folder, self.META_FILE), "w+") as f:
+            json.dump(
+                {
+                    "batch_dim": batch_dim,
+                    "max_steps": self.max_steps,
+                    "n_steps": self._written_steps,
+                    "columns": columns,
+                },
+                f,
+                indent=4,
+            )
+
+    def close(self):
+        """Writes the remaining steps and stops recording"""
+        self.flush()
+        self.world.remove_comm_hook(self.record)
+
+    @staticmethod
+    def load(folder: str) -> Dict[str, np.ndarray]:
+        """
+        Opens a recording without loading it in memory.
+        Returns a dict of arrays of shape (n_steps * batch_dim, width) with the columns "step", "env_index"
+        and the recorded columns.
+        """
+        with open(os.path.join(folder, CommRecorder.META_FILE), "r") as f:
+            meta = json.load(f)
+        batch_dim, n_steps = meta["batch_dim"], meta["n_steps"]
+        columns = {}
+        for name, column in meta["columns"].items():
+            columns[name] = np.memmap(
+                os.path.join(folder, f"{name}.bin"),
+                dtype=np.dtype(column["dtype"]),
+                mode="r",
+                shape=(meta["max_steps"] * batch_dim, column["width"]),
+            )[: n_steps * batch_dim]
+        return columns
@@ -14,13 +14,20 @@ from itertools import chain
 from typing import Callable, Tuple, Optional, Union
 
 import numpy as np
-import pyglet
 import six
 import torch
 
 from vmas.simulator.utils import x_to_rgb_colormap, TorchUtils
 
+GL_IMPORT_ERROR = (
+    "Error occurred while running `from pyglet.gl import *`, HINT: make sure you have OpenGL installed. "
+    "On Ubuntu, you can run 'apt-get install python-opengl'. If you're running on a server, you may need a "
+    "virtual frame buffer; something like this should work:"
+    "'xvfb-run -s \"-screen 0 1400x900x24\" python <your_script.py>'"
+)
+
 try:
+    import pyglet
     from pyglet.gl import (
         GL_BLEND,
         GL_LINE_LOOP,
@@ -56,12 +63,8 @@ try:
         glVertex3f,
     )
 except ImportError:
-    raise ImportError(
-        "Error occurred while running `from pyglet.gl import *`, HINT: make sure you have OpenGL installed. "
-        "On Ubuntu, you can run 'apt-get install python-opengl'. If you're running on a server, you may need a "
-        "virtual frame buffer; something like this should work:"
-        "'xvfb-run -s \"-screen 0 1400x900x24\" python <your_script.py>'"
-    )
+    # Geoms can still be built and drawn by the SoftwareViewer
+    pyglet = None
 
 
 if "Apple" in sys.version:
@@ -70,6 +73,10 @@ if "Apple" in sys.version:
         # (JDS 2016/04/15): avoid bug on Anaconda 2.3.0 / Yosemite
 
 RAD2DEG = 57.29577951308232
+# Line width set by the Viewer, used by the SoftwareViewer for geoms without a LineWidth
+DEFAULT_LINE_WIDTH = 2.0
+# Maximum number of pixel-segment pairs computed at once by the SoftwareViewer
+SEGMENTS_BATCH_SIZE = 2**20
 
 
 def get_display(spec):
@@ -92,6 +99,8 @@ def get_display(spec):
 
 class Viewer(object):
     def __init__(self, width, height, display=None, visible=True):
+        if pyglet is None:
+            raise ImportError(GL_IMPORT_ERROR)
         display = get_display(display)
 
         self.width = width
@@ -112,7 +121,7 @@ class Viewer(object):
         glEnable(GL_LINE_SMOOTH)
         # glHint(GL_LINE_SMOOTH_HINT, GL_DONT_CARE)
         glHint(GL_LINE_SMOOTH_HINT, GL_NICEST)
-        glLineWidth(2.0)
+        glLineWidth(DEFAULT_LINE_WIDTH)
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
     def close(self):
@@ -186,6 +195,260 @@ class Viewer(object):
         return arr
 
 
+class SoftwareViewer(Viewer):
+    """
+    Viewer drawing the geoms in NumPy arrays, without pyglet and OpenGL.
+
+    Filled polygons, lines, points, grids and images are rasterized with alpha blending.
+    Text is not drawn and line styles are drawn as solid lines.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        self.geoms = []
+        self.onetime_geoms = []
+        self.transform = Transform()
+        self.bounds = None
+
+        self._canvas = None
+
+    def close(self):
+        pass
+
+    def render(self, return_rgb_array=False):
+        # Rows go from the bottom to the top like in OpenGL, flipped in get_array
+        self._canvas = np.ones((self.height, self.width, 3), dtype=np.float32)
+        for geom in chain(self.geoms, self.onetime_geoms):
+            self._draw(
+                geom,
+                _transform_matrix(self.transform),
+                (0.0, 0.0, 0.0, 1.0),
+                DEFAULT_LINE_WIDTH,
+            )
+        self.onetime_geoms = []
+        return self.get_array() if return_rgb_array else None
+
+    def get_array(self):
+        return (self._canvas[::-1] * 255 + 0.5).astype(np.uint8)
+
+    def _draw(self, geom, matrix, color, line_width):
+        # Attributes are enabled from the last to the first,
+        # so the first transform is the first applied to the vertices
+        color_attrs = [attr for attr in geom.attrs if isinstance(attr, Color)]
+        if len(color_attrs):
+            color = color_attrs[0].vec4
+        width_attrs = [attr for attr in geom.attrs if isinstance(attr, LineWidth)]
+        if len(width_attrs):
+            line_width = width_attrs[0].stroke
+        for attr in geom.attrs:
+            if isinstance(attr, Transform):
+                matrix = matrix @ _transform_matrix(attr)
+
+        if isinstance(geom, TextLine):
+            return
+        elif isinstance(geom, Compound):
+            for g in geom.gs:
+                self._draw(g, matrix, color, line_width)
+        elif isinstance(geom, FilledPolygon):
+            vertices = _apply(matrix, geom.v)
+            self._fill_polygon(vertices, color)
+            if geom.draw_border:
+                self._draw_segments(
+                    vertices,
+                    np.roll(vertices, -1, axis=0),
+                    line_width,
+                    tuple(c * 0.5 for c in color),
+                )
+        elif isinstance(geom, PolyLine):
+            vertices = _apply(matrix, geom.v)
+            ends = np.roll(vertices, -1, axis=0)
+            if not geom.close:
+                vertices, ends = vertices[:-1], ends[:-1]
+            self._draw_segments(vertices, ends, line_width, color)
+        elif isinstance(geom, Line):
+            self._draw_segments(
+                _apply(matrix, [geom.start]),
+                _apply(matrix, [geom.end]),
+                line_width,
+                color,
+            )
+        elif isinstance(geom, Grid):
+            points = np.arange(-geom.length / 2, geom.length / 2, geom.spacing)
+            low = np.full_like(points, -geom.length / 2)
+            high = np.full_like(points, geom.length / 2)
+            self._draw_segments(
+                _apply(
+                    matrix,
+                    np.concatenate(
+                        [np.stack([points, low], -1), np.stack([low, points], -1)]
+                    ),
+                ),
+                _apply(
+                    matrix,
+                    np.concatenate(
+                        [np.stack([points, high], -1), np.stack([high, points], -1)]
+                    ),
+                ),
+                line_width,
+                color,
+            )
+        elif isinstance(geom, Point):
+            point = _apply(matrix, [(0.0, 0.0)])
+            self._draw_segments(point, point, 1, color)
+        elif isinstance(geom, Image):
+            self._draw_image(geom, matrix)
+        else:
+            raise NotImplementedError(
+                f"Geom {type(geom).__name__} cannot be drawn by the software viewer"
+            )
+
+    def _region(self, points, margin=0.0):
+        # Slices of the canvas covering the points, None if they are out of it
+        x0, y0 = np.floor(points.min(axis=0) - margin).astype(int)
+        x1, y1 = np.ceil(points.max(axis=0) + margin).astype(int)
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.width), min(y1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        # Pixel centers
+        x, y = np.meshgrid(
+            np.arange(x0, x1, dtype=np.float32) + 0.5,
+            np.arange(y0, y1, dtype=np.float32) + 0.5,
+        )
+        return (slice(y0, y1), slice(x0, x1)), x, y
+
+    def _blend(self, region, coverage, color):
+        alpha = (coverage * (color[3] if len(color) > 3 else 1.0))[..., None]
+        canvas = self._canvas[region]
+        canvas *= 1 - alpha
+        canvas += alpha * np.asarray(color[:3], dtype=np.float32)
+
+    def _fill_polygon(self, vertices, color):
+        region = self._region(vertices)
+        if region is None:
+            return
+        region, x, y = region
+        # Even-odd rule over all the edges at once
+        x, y = x[..., None], y[..., None]
+        xi, yi = vertices[:, 0], vertices[:, 1]
+        xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing = ((yi > y) != (yj > y)) & (
+                x < (xj - xi) * (y - yi) / (yj - yi) + xi
+            )
+        inside = crossing.sum(axis=-1) % 2 == 1
+        self._blend(region, inside.astype(np.float32), color)
+
+    def _draw_segments(self, starts, ends, width, color):
+        # Coverage of the union of the segments, so that overlaps are blended once
+        half_width = max(width, 1) / 2
+        region = self._region(np.concatenate([starts, ends]), margin=half_width + 1)
+        if region is None:
+            return
+        region, x, y = region
+        if x.size * len(starts) <= SEGMENTS_BATCH_SIZE:
+            # Small primitives (outlines, lidar rays) are drawn in one pass over all their segments
+            coverage = _segments_coverage(
+                x[..., None], y[..., None], starts, ends, half_width
+            ).max(axis=-1)
+        else:
+            # Long segments (grids) are drawn one by one over their own bounding box
+            coverage = np.zeros_like(x)
+            y0, x0 = region[0].start, region[1].start
+            low = np.minimum(starts, ends) - half_width - 1
+            high = np.maximum(starts, ends) + half_width + 1
+            visible = np.all((high > 0) & (low < (self.width, self.height)), axis=-1)
+            for start, end in zip(starts[visible], ends[visible]):
+                segment_region = self._region(
+                    np.stack([start, end]), margin=half_width + 1
+                )
+                if segment_region is None:
+                    continue
+                (rows, cols), px, py = segment_region
+                sub = (
+                    slice(rows.start - y0, rows.stop - y0),
+                    slice(cols.start - x0, cols.stop - x0),
+                )
+                coverage[sub] = np.maximum(
+                    coverage[sub],
+                    _segments_coverage(
+                        px, py, start[None], end[None], half_width
+                    ).reshape(px.shape),
+                )
+        self._blend(region, coverage, color)
+
+    def _draw_image(self, image, matrix):
+        array = np.asarray(image.array, dtype=np.float32) / 255
+        h, w = array.shape[:2]
+        # Texels are squares of side scale from (x, y), rows from the bottom
+        corners = np.array(
+            [(0, 0), (w, 0), (0, h), (w, h)], dtype=np.float32
+        ) * image.scale + (image.x, image.y)
+        region = self._region(_apply(matrix, corners))
+        if region is None:
+            return
+        region, x, y = region
+        inverse = np.linalg.inv(matrix)
+        u = (
+            inverse[0, 0] * x + inverse[0, 1] * y + inverse[0, 2] - image.x
+        ) / image.scale
+        v = (
+            inverse[1, 0] * x + inverse[1, 1] * y + inverse[1, 2] - image.y
+        ) / image.scale
+        inside = (u >= 0) & (u < w) & (v >= 0) & (v < h)
+        texels = array[
+            np.clip(v, 0, h - 1).astype(int), np.clip(u, 0, w - 1).astype(int)
+        ]
+        alpha = (
+            texels[..., 3:] * inside[..., None]
+            if array.shape[-1] == 4
+            else inside[..., None]
+        )
+        canvas = self._canvas[region]
+        canvas *= 1 - alpha
+        canvas += alpha * texels[..., :3]
+
+
+def _segments_coverage(x, y, starts, ends, half_width):
+    # Antialiased coverage of the pixel centers x, y by each segment, from their distance to it
+    direction = ends - starts
+    length2 = (direction**2).sum(-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.clip(
+            (
+                (x - starts[:, 0]) * direction[:, 0]
+                + (y - starts[:, 1]) * direction[:, 1]
+            )
+            / length2,
+            0,
+            1,
+        )
+    t = np.where(length2 > 0, t, 0)
+    dist = np.hypot(
+        x - starts[:, 0] - t * direction[:, 0], y - starts[:, 1] - t * direction[:, 1]
+    )
+    return np.clip(half_width + 0.5 - dist, 0, 1)
+
+
+def _transform_matrix(transform):
+    # Translation, rotation and scale like Transform.enable
+    cos, sin = math.cos(transform.rotation), math.sin(transform.rotation)
+    sx, sy = transform.scale
+    tx, ty = transform.translation
+    return np.array(
+        [[cos * sx, -sin * sy, tx], [sin * sx, cos * sy, ty], [0, 0, 1]],
+        dtype=np.float64,
+    )
+
+
+def _apply(matrix, points):
+    if not isinstance(points, np.ndarray):
+        points = np.array([[float(c) for c in point] for point in points])
+    return (points @ matrix[:2, :2].T + matrix[:2, 2]).astype(np.float32)
+
+
 class Geom(object):
     def __init__(self):
         self._color = Color((0, 0, 0, 1.0))
@@ -281,6 +544,10 @@ class TextLine(Geom):
     ):
         super().__init__()
 
+        if pyglet is None:
+            # Text is not drawn by the SoftwareViewer
+            self.label = None
+            return
         if pyglet.font.have_font("Courier"):
             font = "Courier"
         elif pyglet.font.have_font("Secret Code"):
@@ -304,6 +571,8 @@ class TextLine(Geom):
             self.label.draw()
 
     def set_text(self, text, font_size: Optional[int] = None):
+        if self.label is None:
+            return
         self.label.text = text
         if font_size is not None:
             self.label.font_size = font_size
@@ -325,6 +594,10 @@ class Image(Geom):
         self.x = x
         self.y = y
         self.scale = scale
+        self.array = img
+        if pyglet is None:
+            self.sprite = None
+            return
         img_shape = img.shape
         img = img.astype(np.uint8).reshape(-1)
         tex_data = (pyglet.gl.GLubyte * img.size)(*img)
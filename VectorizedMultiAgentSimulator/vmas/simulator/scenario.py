@@ -190,6 +190,19 @@ class BaseScenario(ABC):
 
         raise NotImplementedError()
 
+    def observation_into(self, agent: Agent, out: Tensor):
+        """
+        This function writes the observations for 'agent' in 'out', a preallocated tensor of shape (n_envs, n_agent_obs).
+        It is used instead of `observation` when the environment preallocates its outputs.
+
+        By default it copies the result of `observation`. Implementors can override it to write
+        the observation components directly in 'out', for example with `TorchUtils.cat_into`.
+
+        :param agent: Agent batch to compute observation of
+        :param out: Tensor of shape (n_envs, n_agent_obs) to write the observations in
+        """
+        out.copy_(self.observation(agent))
+
     @abstractmethod
     def reward(self, agent: Agent) -> AGENT_REWARD_TYPE:
         """
@@ -84,17 +84,12 @@ class Lidar(Sensor):
         self._entity_filter = entity_filter
 
     def measure(self):
-        dists = []
-        for angle in self._angles:
-            dists.append(
-                self._world.cast_ray(
-                    self.agent,
-                    angle,
-                    max_range=self._max_range,
-                    entity_filter=self.entity_filter,
-                )
-            )
-        measurement = torch.stack(dists, dim=1)
+        measurement = self._world.cast_rays(
+            self.agent,
+            self._angles.transpose(1, 0),
+            max_range=self._max_range,
+            entity_filter=self.entity_filter,
+        )
         self._last_measurement = measurement.swapaxes(1, 0)
         return measurement
 
@@ -102,9 +102,20 @@ class Observer(ABC):
 
 
 def save_video(name: str, frame_list: List[np.array], fps: int):
-    """Requres cv2"""
+    """
+    Requres cv2.
+    Frames rendered for several environments at once, with shape (n_envs, height, width, 3),
+    are saved in one video per environment named `{name}_{env_index}`.
+    """
     import cv2
 
+    if frame_list[0].ndim == 4:
+        for env_index in range(frame_list[0].shape[0]):
+            save_video(
+                f"{name}_{env_index}", [frame[env_index] for frame in frame_list], fps
+            )
+        return
+
     video_name = name + ".mp4"
 
     # Produce a video
@@ -154,6 +165,12 @@ def extract_nested_with_index(data: Union[Tensor, Dict[str, Tensor]], index: int
 
 
 class TorchUtils:
+    @staticmethod
+    def is_compiling() -> bool:
+        """Whether the code is being traced by torch.compile"""
+        compiler = getattr(torch, "compiler", None)
+        return compiler is not None and compiler.is_compiling()
+
     @staticmethod
     def clamp_with_norm(tensor: Tensor, max_norm: float):
         norm = torch.linalg.vector_norm(tensor, dim=-1)
@@ -198,6 +215,19 @@ class TorchUtils:
         else:
             raise NotImplementedError(f"Invalid type of data {data}")
 
+    @staticmethod
+    def cat_into(tensors: List[Tensor], out: Tensor) -> Tensor:
+        """Concatenates `tensors` along the last dimension in the preallocated `out`"""
+        start = 0
+        for tensor in tensors:
+            end = start + tensor.shape[-1]
+            out[..., start:end] = tensor
+            start = end
+        assert (
+            start == out.shape[-1]
+        ), f"Concatenated size {start} does not match the output size {out.shape[-1]}"
+        return out
+
     @staticmethod
     def recursive_clone(value: Union[Dict[str, Tensor], Tensor]):
         if isinstance(value, Tensor):
@@ -216,6 +246,9 @@ class ScenarioUtils:
         x_bounds: Tuple[int, int],
         y_bounds: Tuple[int, int],
         occupied_positions: Tensor = None,
+        n_candidates: int = 16,
+        max_rounds: int = 100,
+        fallback: bool = True,
     ):
         batch_size = world.batch_dim if env_index is None else 1
 
@@ -224,16 +257,28 @@ class ScenarioUtils:
                 (batch_size, 0, world.dim_p), device=world.device
             )
 
-        for entity in entities:
+        # Positions of the spawned entities are written in place after the occupied ones
+        n_occupied = occupied_positions.shape[1]
+        positions = torch.empty(
+            (batch_size, n_occupied + len(entities), world.dim_p),
+            device=world.device,
+            dtype=torch.float32,
+        )
+        positions[:, :n_occupied] = occupied_positions
+
+        for i, entity in enumerate(entities):
             pos = ScenarioUtils.find_random_pos_for_entity(
-                occupied_positions,
+                positions[:, : n_occupied + i],
                 env_index,
                 world,
                 min_dist_between_entities,
                 x_bounds,
                 y_bounds,
+                n_candidates=n_candidates,
+                max_rounds=max_rounds,
+                fallback=fallback,
             )
-            occupied_positions = torch.cat([occupied_positions, pos], dim=1)
+            positions[:, n_occupied + i] = pos.squeeze(1)
             entity.set_pos(pos.squeeze(1), batch_index=env_index)
 
     @staticmethod
@@ -244,35 +289,68 @@ class ScenarioUtils:
         min_dist_between_entities: float,
         x_bounds: Tuple[int, int],
         y_bounds: Tuple[int, int],
+        n_candidates: int = 16,
+        max_rounds: int = 100,
+        fallback: bool = True,
     ):
+        """
+        Samples a position at least `min_dist_between_entities` away from the `occupied_positions` in every env.
+
+        Each round proposes `n_candidates` uniform positions per env and keeps, in the envs still unplaced,
+        the first candidate far enough from all the occupied positions.
+        Sampling stops when all envs are placed or after `max_rounds` rounds. In the envs still unplaced then,
+        the candidate furthest from the occupied positions is used if `fallback` is set, otherwise an error is raised.
+
+        Returns:
+            Tensor of shape (batch_size, 1, dim_p)
+        """
         batch_size = world.batch_dim if env_index is None else 1
+        if occupied_positions.shape[1] == 0:
+            n_candidates = 1
 
         pos = None
-        while True:
+        for _ in range(max_rounds):
             proposed_pos = torch.cat(
                 [
                     torch.empty(
-                        (batch_size, 1, 1),
+                        (batch_size, n_candidates, 1),
                         device=world.device,
                         dtype=torch.float32,
                     ).uniform_(*x_bounds),
                     torch.empty(
-                        (batch_size, 1, 1),
+                        (batch_size, n_candidates, 1),
                         device=world.device,
                         dtype=torch.float32,
                     ).uniform_(*y_bounds),
                 ],
                 dim=2,
             )
-            if pos is None:
-                pos = proposed_pos
             if occupied_positions.shape[1] == 0:
-                break
-
-            dist = torch.cdist(occupied_positions, pos)
-            overlaps = torch.any((dist < min_dist_between_entities).squeeze(2), dim=1)
-            if torch.any(overlaps, dim=0):
-                pos[overlaps] = proposed_pos[overlaps]
+                return proposed_pos
+
+            # Distance to the closest occupied position, clamped so that all valid candidates are equal
+            # and argmax picks the first valid one
+            dist = (
+                torch.cdist(occupied_positions, proposed_pos)
+                .min(dim=1)[0]
+                .clamp(max=min_dist_between_entities)
+            )
+            proposed_dist, proposed_index = dist.max(dim=1)
+            proposed_pos = proposed_pos[
+                torch.arange(batch_size, device=world.device), proposed_index
+            ].unsqueeze(1)
+            if pos is None:
+                pos, pos_dist = proposed_pos, proposed_dist
             else:
+                # Placed envs have the maximum distance already and are never replaced
+                improved = proposed_dist > pos_dist
+                pos = torch.where(improved.view(-1, 1, 1), proposed_pos, pos)
+                pos_dist = torch.where(improved, proposed_dist, pos_dist)
+            if torch.all(pos_dist >= min_dist_between_entities):
                 break
+        else:
+            assert fallback, (
+                f"Could not find positions at distance {min_dist_between_entities} from the occupied positions "
+                f"in {max_rounds} rounds of {n_candidates} candidates"
+            )
         return pos
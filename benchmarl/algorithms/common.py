@@ -9,6 +9,7 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any, Dict, Iterable, Optional, Tuple, Type
 
+import torch
 from tensordict import TensorDictBase
 from tensordict.nn import TensorDictModule, TensorDictSequential
 from torchrl.data import (
@@ -22,6 +23,7 @@ from torchrl.data.replay_buffers import RandomSampler, SamplerWithoutReplacement
 from torchrl.objectives import LossModule
 from torchrl.objectives.utils import HardUpdate, SoftUpdate, TargetNetUpdater
 
+from benchmarl.algorithms.storage import CompactTensorStorage
 from benchmarl.models.common import ModelConfig
 from benchmarl.utils import DEVICE_TYPING, read_yaml_config
 
@@ -155,9 +157,20 @@ class Algorithm(ABC):
         sampling_size = self.experiment_config.train_minibatch_size(self.on_policy)
         storing_device = self.device
         sampler = SamplerWithoutReplacement() if self.on_policy else RandomSampler()
+        if not self.on_policy and self.experiment_config.off_policy_compact_storage:
+            observation_dtype = self.experiment_config.off_policy_observation_dtype
+            storage = CompactTensorStorage(
+                memory_size,
+                device=storing_device,
+                observation_dtype=getattr(torch, observation_dtype)
+                if observation_dtype is not None
+                else None,
+            )
+        else:
+            storage = LazyTensorStorage(memory_size, device=storing_device)
 
         return TensorDictReplayBuffer(
-            storage=LazyTensorStorage(memory_size, device=storing_device),
+            storage=storage,
             sampler=sampler,
             batch_size=sampling_size,
         )
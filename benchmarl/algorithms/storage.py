@@ -0,0 +1,308 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from tensordict import TensorDict, TensorDictBase
+from torchrl.data import LazyTensorStorage
+from torchrl.data.replay_buffers.storages import _reset_batch_size
+
+NestedKey = Tuple[str, ...]
+
+# Keys stored in reduced precision when an observation dtype is given
+REDUCED_PRECISION_KEYS = ("observation", "state")
+
+
+class CompactTensorStorage(LazyTensorStorage):
+    """
+    A :class:`~torchrl.data.LazyTensorStorage` for off-policy replay buffers that stores transitions in a compact form.
+
+    - Entries that have a ``"next"`` counterpart (observations, state, done flags, ...) are stored once.
+      For a transition followed by the next step of the same trajectory in the storage, the ``"next"`` entries are
+      read from the following row. The other ``"next"`` entries (at the end of an episode or of a collected batch)
+      are kept in a separate ring that grows as needed.
+    - Entries expanded over a dimension, like the per-agent done, terminated and reward copies made by
+      ``Algorithm.process_batch``, are stored only once along that dimension.
+    - Observations and state can be stored in reduced precision (``observation_dtype``).
+
+    Sampled tensordicts have the same keys, shapes and dtypes as the data written to the storage.
+    Transitions are expected to be written in order by a round-robin writer, as done by the replay buffers.
+
+    Args:
+        max_size (int): size of the storage, i.e. maximum number of elements stored in the buffer.
+        device (torch.device, optional): device where the data is stored. Default is ``"cpu"``.
+        observation_dtype (torch.dtype, optional): dtype used to store observations and state,
+            for example ``torch.float16`` or ``torch.bfloat16``. If ``None``, they are stored in their own dtype.
+
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        device="cpu",
+        observation_dtype: Optional[torch.dtype] = None,
+    ):
+        super().__init__(max_size, device=device)
+        self.observation_dtype = observation_dtype
+        self._init_layout()
+
+    def _init_layout(self):
+        # Dtype and row shape of every entry written to the storage
+        self._layout: Dict[NestedKey, Tuple[torch.dtype, torch.Size]] = {}
+        # "next" keys read from the following row, mapped to their root key
+        self._next_keys: Dict[NestedKey, NestedKey] = {}
+        # Dimensions along which each stored entry is expanded
+        self._expanded_dims: Dict[NestedKey, Tuple[int, ...]] = {}
+        # Ring of the "next" entries that are not in the following row, and row of the storage owning each slot
+        self._next_storage: Optional[TensorDictBase] = None
+        self._next_owner: Optional[torch.Tensor] = None
+        self._next_cursor = 0
+
+    def _init(self, data: TensorDictBase) -> None:
+        if self.device == "auto":
+            self.device = data.device
+        keys = list(data.keys(True, True))
+        for key in keys:
+            key = key if isinstance(key, tuple) else (key,)
+            value = data.get(key)
+            self._layout[key] = (value.dtype, value.shape[1:])
+        for key, (dtype, shape) in self._layout.items():
+            if "next" not in key:
+                continue
+            position = key.index("next")
+            root_key = key[:position] + key[position + 1 :]
+            if self._layout.get(root_key) == (dtype, shape):
+                self._next_keys[key] = root_key
+        for key in self._stored_keys():
+            value = data.get(key)
+            self._expanded_dims[key] = tuple(
+                dim
+                for dim in range(1, value.ndim)
+                if value.stride(dim) == 0 and value.shape[dim] > 1
+            )
+
+        self._storage = self._zeros(
+            {
+                key: self._compress(key, data.get(key)[:1])
+                for key in self._stored_keys()
+            },
+            self.max_size,
+        )
+        self._storage.set(
+            "_next_index",
+            torch.zeros(self.max_size, dtype=torch.long, device=self.device),
+        )
+        self.initialized = True
+
+    def _zeros(self, rows: Dict[NestedKey, torch.Tensor], size: int) -> TensorDictBase:
+        return TensorDict(
+            {
+                key: torch.zeros(
+                    size, *value.shape[1:], dtype=value.dtype, device=self.device
+                )
+                for key, value in rows.items()
+            },
+            batch_size=[size],
+            device=self.device,
+        )
+
+    def _to_index(self, index) -> torch.Tensor:
+        if not isinstance(index, torch.Tensor):
+            index = np.asarray(index)
+        return torch.as_tensor(index, dtype=torch.long).to(self.device)
+
+    def _stored_keys(self):
+        return [key for key in self._layout if key not in self._next_keys]
+
+    def _compress(self, key: NestedKey, value: torch.Tensor) -> torch.Tensor:
+        for dim in self._expanded_dims.get(key, ()):
+            first = value.narrow(dim, 0, 1)
+            if value.stride(dim) != 0 and not (value == first).all():
+                raise ValueError(
+                    f"Entry {key} was expanded over dimension {dim} in the first data written to the storage, "
+                    f"but its values now differ along that dimension"
+                )
+            value = first
+        if self.observation_dtype is not None and key[-1] in REDUCED_PRECISION_KEYS:
+            value = value.to(self.observation_dtype)
+        return value
+
+    def _decompress(self, key: NestedKey, value: torch.Tensor) -> torch.Tensor:
+        dtype, shape = self._layout[key]
+        return value.to(dtype).expand(value.shape[0], *shape).contiguous()
+
+    def set(
+        self,
+        cursor: Union[int, Sequence[int], slice],
+        data: TensorDictBase,
+    ):
+        if isinstance(cursor, (int, np.integer)):
+            cursor = [cursor]
+            data = data.unsqueeze(0)
+        elif isinstance(cursor, slice):
+            cursor = range(*cursor.indices(self.max_size))
+        if not self.initialized:
+            self._init(data)
+        index = self._to_index(cursor)
+        data = data.to(self.device)
+        if len(index) > self.max_size:
+            # The round-robin index wraps onto itself, only the last rows are kept
+            index, data = index[-self.max_size :], data[-self.max_size :]
+        self._len = max(self._len, int(index.max()) + 1)
+
+        # A transition is linked to the following row if that row is its next step
+        linked = index[1:] == index[:-1] + 1
+        for key, root_key in self._next_keys.items():
+            equal = data.get(key)[:-1] == data.get(root_key)[1:]
+            linked &= equal.flatten(1).all(-1) if equal.ndim > 1 else equal
+        linked = torch.cat([linked, linked.new_zeros(1)])
+
+        rows = TensorDict(
+            {key: self._compress(key, data.get(key)) for key in self._stored_keys()},
+            batch_size=[len(index)],
+        )
+        # Out of range until the rows that are not linked get their slot in the ring
+        rows.set(
+            "_next_index",
+            torch.where(linked, index.roll(-1), torch.full_like(index, self.max_size)),
+        )
+        self._storage[index] = rows
+
+        unlinked = (~linked).nonzero().squeeze(-1)
+        slots = self._reserve_next_slots(len(unlinked))
+        self._next_storage[slots] = TensorDict(
+            {
+                root_key: self._compress(root_key, data.get(key)[unlinked])
+                for key, root_key in self._next_keys.items()
+            },
+            batch_size=[len(unlinked)],
+        )
+        self._next_owner[slots] = index[unlinked]
+        self._storage.get("_next_index")[index[unlinked]] = -1 - slots
+
+    def _reserve_next_slots(self, n: int) -> torch.Tensor:
+        # Slots are handed out and freed in the order rows are written, so the ring
+        # only grows when it holds fewer free slots than needed
+        while True:
+            capacity = 0 if self._next_owner is None else len(self._next_owner)
+            if 0 < n <= capacity:
+                slots = (
+                    torch.arange(n, device=self.device) + self._next_cursor
+                ) % capacity
+                owners = self._next_owner[slots]
+                live = (owners >= 0) & (
+                    self._storage.get("_next_index")[owners.clamp(min=0)] == -1 - slots
+                )
+                if not live.any():
+                    self._next_cursor = (self._next_cursor + n) % capacity
+                    return slots
+            elif n == 0:
+                return torch.zeros(0, dtype=torch.long, device=self.device)
+            if capacity == self.max_size:
+                raise RuntimeError(
+                    "The ring of next entries is full, the storage must be written by a round-robin writer"
+                )
+            self._grow_next_storage(min(max(2 * capacity, capacity + n), self.max_size))
+
+    def _grow_next_storage(self, capacity: int):
+        next_storage = self._zeros(
+            {
+                root_key: self._storage.get(root_key)
+                for root_key in self._next_keys.values()
+            },
+            capacity,
+        )
+        next_owner = torch.full((capacity,), -1, dtype=torch.long, device=self.device)
+        if self._next_owner is not None:
+            # The oldest entries move to the start of the new ring, the slots after them are free
+            old_capacity = len(self._next_owner)
+            order = (
+                torch.arange(old_capacity, device=self.device) + self._next_cursor
+            ) % old_capacity
+            next_storage[:old_capacity] = self._next_storage[order]
+            next_owner[:old_capacity] = self._next_owner[order]
+            next_index = self._storage.get("_next_index")
+            in_ring = next_index < 0
+            next_index[in_ring] = -1 - (
+                (-1 - next_index[in_ring] - self._next_cursor) % old_capacity
+            )
+            self._next_cursor = old_capacity
+        self._next_storage = next_storage
+        self._next_owner = next_owner
+
+    def get(self, index: Union[int, Sequence[int], slice]) -> Any:
+        if not self.initialized:
+            raise RuntimeError("Cannot get an item from an unitialized storage")
+        if isinstance(index, (int, np.integer)):
+            return self.get([index])[0]
+        if isinstance(index, slice):
+            index = range(*index.indices(len(self)))
+        index = self._to_index(index)
+
+        rows = self._storage[index]
+        next_index = rows.get("_next_index")
+        linked = next_index >= 0
+        root_keys = list(self._next_keys.values())
+        next_rows = self._storage.select(*root_keys)[
+            next_index.clamp(min=0, max=self.max_size - 1)
+        ]
+        if self._next_storage is not None:
+            ring_rows = self._next_storage[
+                (-1 - next_index).clamp(min=0, max=len(self._next_owner) - 1)
+            ]
+        out = TensorDict({}, batch_size=[len(index)], device=self.device)
+        for key in self._layout:
+            if key in self._next_keys:
+                root_key = self._next_keys[key]
+                value = next_rows.get(root_key)
+                if self._next_storage is not None:
+                    value = torch.where(
+                        linked.reshape(-1, *[1] * (value.ndim - 1)),
+                        value,
+                        ring_rows.get(root_key),
+                    )
+                out.set(key, self._decompress(root_key, value))
+            else:
+                out.set(key, self._decompress(key, rows.get(key)))
+        return _reset_batch_size(out).unlock_()
+
+    def state_dict(self) -> Dict[str, Any]:
+        state_dict = super().state_dict()
+        state_dict.update(
+            {
+                "_layout": self._layout,
+                "_next_keys": self._next_keys,
+                "_expanded_dims": self._expanded_dims,
+                "_next_storage": self._next_storage.state_dict()
+                if self._next_storage is not None
+                else None,
+                "_next_owner": self._next_owner,
+                "_next_cursor": self._next_cursor,
+            }
+        )
+        return state_dict
+
+    def load_state_dict(self, state_dict):
+        super().load_state_dict(state_dict)
+        self._layout = state_dict["_layout"]
+        self._next_keys = state_dict["_next_keys"]
+        self._expanded_dims = state_dict["_expanded_dims"]
+        self._next_owner = state_dict["_next_owner"]
+        self._next_cursor = state_dict["_next_cursor"]
+        if state_dict["_next_storage"] is not None:
+            self._next_storage = TensorDict({}, []).load_state_dict(
+                state_dict["_next_storage"]
+            )
+        else:
+            self._next_storage = None
+
+    def _empty(self):
+        super()._empty()
+        self._next_cursor = 0
+        if self._next_owner is not None:
+            self._next_owner.fill_(-1)
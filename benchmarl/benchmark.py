@@ -4,10 +4,22 @@
 #  LICENSE file in the root directory of this source tree.
 #
 
-from typing import Iterator, Optional, Sequence, Set
+import contextlib
+import copy
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+import torch
 
 from benchmarl.algorithms.common import AlgorithmConfig
 from benchmarl.environments import Task
+from benchmarl.eval_results import BENCHMARK_SUMMARY_FILE
 from benchmarl.experiment import Experiment, ExperimentConfig
 from benchmarl.models.common import ModelConfig
 
@@ -39,10 +51,14 @@ class Benchmark:
         return len(self.algorithm_configs) * len(self.tasks) * len(self.seeds)
 
     def get_experiments(self) -> Iterator[Experiment]:
+        for experiment_kwargs in self.get_experiment_kwargs():
+            yield Experiment(**experiment_kwargs)
+
+    def get_experiment_kwargs(self) -> Iterator[Dict[str, Any]]:
         for algorithm_config in self.algorithm_configs:
             for task in self.tasks:
                 for seed in self.seeds:
-                    yield Experiment(
+                    yield dict(
                         task=task,
                         algorithm_config=algorithm_config,
                         seed=seed,
@@ -60,3 +76,194 @@ class Benchmark:
                 print("\n\nBenchmark was closed gracefully\n\n")
                 experiment.close()
                 raise interrupt
+
+    def run_parallel(
+        self,
+        n_workers: int,
+        threads_per_worker: Optional[int] = None,
+        max_retries: int = 1,
+    ) -> Dict[str, Any]:
+        """
+        Runs the experiments of the benchmark in a pool of processes.
+        See :func:`run_parallel`.
+        """
+        return run_parallel(
+            list(self.get_experiment_kwargs()),
+            n_workers=n_workers,
+            threads_per_worker=threads_per_worker,
+            max_retries=max_retries,
+        )
+
+
+def _init_worker(cpu_slots, threads_per_worker: int):
+    # Each worker process takes a slot of cpus for its lifetime
+    cpus = cpu_slots.get()
+    if cpus is not None:
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(threads_per_worker)
+
+
+def _run_experiment(
+    folder: str,
+    experiment_kwargs: Dict[str, Any],
+    task_config: Dict[str, Any],
+    run_kwargs: Dict[str, Any],
+) -> float:
+    start = time.time()
+    # Enum members are pickled by name, so their config is sent separately
+    experiment_kwargs["task"].config = task_config
+    with open(Path(folder) / "output.log", "a") as log, contextlib.redirect_stdout(
+        log
+    ), contextlib.redirect_stderr(log):
+        experiment = Experiment(**experiment_kwargs)
+        experiment.run(**run_kwargs)
+    return time.time() - start
+
+
+def run_parallel(
+    experiments: Sequence[Dict[str, Any]],
+    n_workers: int,
+    threads_per_worker: Optional[int] = None,
+    max_retries: int = 1,
+    run_kwargs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs experiments in a pool of ``n_workers`` processes.
+
+    Each worker is pinned to its own set of cpus (where the platform supports it) and uses ``threads_per_worker``
+    torch threads. Each experiment gets its own folder ``job_{i}`` in the ``save_folder`` of its config
+    (or the current directory), where its output is written to ``output.log``.
+    Failed experiments are retried up to ``max_retries`` times and a summary of all experiments
+    is kept up to date in ``benchmark_summary.json`` next to the folder of the first experiment.
+    :func:`~benchmarl.eval_results.get_raw_dict_from_multirun_folder` skips this file.
+
+    Args:
+        experiments (list of dict): the keyword arguments of :class:`~benchmarl.experiment.Experiment`
+            for each experiment
+        n_workers (int): number of experiments run at the same time
+        threads_per_worker (int, optional): torch threads of each worker.
+            Defaults to the available cpus divided by ``n_workers``.
+        max_retries (int): number of times a failed experiment is run again
+        run_kwargs (dict, optional): keyword arguments of :meth:`~benchmarl.experiment.Experiment.run`
+
+    Returns: the summary of the experiments
+
+    """
+    if n_workers < 1:
+        raise ValueError(f"n_workers must be at least 1, got {n_workers}")
+    run_kwargs = run_kwargs if run_kwargs is not None else {}
+
+    cpus = (
+        sorted(os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else list(range(os.cpu_count()))
+    )
+    if threads_per_worker is None:
+        threads_per_worker = max(1, len(cpus) // n_workers)
+    # Spawned workers do not inherit the threads and state of the parent
+    context = multiprocessing.get_context("spawn")
+    cpu_slots = context.Queue()
+    for worker in range(n_workers):
+        slot = cpus[worker * threads_per_worker : (worker + 1) * threads_per_worker]
+        pin = hasattr(os, "sched_setaffinity") and len(cpus) >= (
+            n_workers * threads_per_worker
+        )
+        cpu_slots.put(slot if pin else None)
+
+    jobs: List[Dict[str, Any]] = []
+    for i, experiment_kwargs in enumerate(experiments):
+        experiment_kwargs = dict(experiment_kwargs)
+        config = experiment_kwargs["config"]
+        if config.restore_file is not None:
+            raise ValueError(
+                "Experiments restored from a file cannot be run in parallel"
+            )
+        base_folder = Path(
+            config.save_folder if config.save_folder is not None else os.getcwd()
+        )
+        folder = base_folder / f"job_{i}"
+        folder.mkdir(parents=True, exist_ok=True)
+        config = copy.copy(config)
+        config.save_folder = str(folder)
+        experiment_kwargs["config"] = config
+        jobs.append(
+            {
+                "kwargs": experiment_kwargs,
+                "summary": {
+                    "index": i,
+                    "algorithm": experiment_kwargs["algorithm_config"]
+                    .associated_class()
+                    .__name__.lower(),
+                    "task": experiment_kwargs["task"].name.lower(),
+                    "seed": experiment_kwargs["seed"],
+                    "folder": str(folder),
+                    "status": "pending",
+                    "attempts": 0,
+                    "error": None,
+                    "time": None,
+                },
+            }
+        )
+    if not len(jobs):
+        return {}
+    summary_path = (
+        Path(jobs[0]["kwargs"]["config"].save_folder).parent / BENCHMARK_SUMMARY_FILE
+    )
+
+    def write_summary():
+        summaries = [job["summary"] for job in jobs]
+        summary = {
+            status: sum(job_summary["status"] == status for job_summary in summaries)
+            for status in ("pending", "running", "completed", "failed")
+        }
+        summary["experiments"] = summaries
+        with open(summary_path, "w+") as f:
+            json.dump(summary, f, indent=4)
+        return summary
+
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(cpu_slots, threads_per_worker),
+    ) as pool:
+
+        def submit(i):
+            job = jobs[i]
+            job["summary"]["status"] = "running"
+            job["summary"]["attempts"] += 1
+            return pool.submit(
+                _run_experiment,
+                job["summary"]["folder"],
+                job["kwargs"],
+                job["kwargs"]["task"].config,
+                run_kwargs,
+            )
+
+        running = {submit(i): i for i in range(len(jobs))}
+        write_summary()
+        while len(running):
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                job_summary = jobs[i]["summary"]
+                try:
+                    job_summary["time"] = future.result()
+                    job_summary["status"] = "completed"
+                    job_summary["error"] = None
+                except Exception as err:
+                    job_summary["error"] = "".join(
+                        traceback.format_exception(type(err), err, err.__traceback__)
+                    )
+                    if job_summary["attempts"] <= max_retries:
+                        print(f"Experiment {i} failed, retrying: {err!r}")
+                        running[submit(i)] = i
+                    else:
+                        print(f"Experiment {i} failed: {err!r}")
+                        job_summary["status"] = "failed"
+            summary = write_summary()
+            print(
+                f"Completed {summary['completed']}/{len(jobs)} experiments, "
+                f"{summary['failed']} failed, {summary['running']} running."
+            )
+    return summary
@@ -91,6 +91,7 @@ from .vmas.simple_reference_idiolect_ext_noise4 import TaskConfig as SimpleRefer
 from .vmas.simple_reference_idiolect_ext_noise6 import TaskConfig as SimpleReferenceIdiolectExtNoise6Config
 from .vmas.simple_reference_idiolect_ext_noise8 import TaskConfig as SimpleReferenceIdiolectExtNoise8Config
 from .vmas.simple_reference_idiolect_ext_noise10 import TaskConfig as SimpleReferenceIdiolectExtNoise10Config
+from .vmas.simple_reference_family import TaskConfig as SimpleReferenceFamilyConfig
 
 # This is a registry mapping task config schemas names to their python dataclass
 # It is used by hydra to validate loaded configs.
@@ -122,6 +123,7 @@ _task_class_registry = {
     "vmas_simple_reference_idiolect_ext_noise6": SimpleReferenceIdiolectExtNoise6Config, 
     "vmas_simple_reference_idiolect_ext_noise8": SimpleReferenceIdiolectExtNoise8Config, 
     "vmas_simple_reference_idiolect_ext_noise10": SimpleReferenceIdiolectExtNoise10Config, 
+    "vmas_simple_reference_family_config": SimpleReferenceFamilyConfig,
     "pettingzoo_multiwalker_config": MultiwalkerConfig,
     "pettingzoo_waterworld_config": WaterworldConfig,
     "pettingzoo_simple_adversary_config": SimpleAdversaryConfig,
@@ -6,6 +6,8 @@
 
 from __future__ import annotations
 
+import copy
+import functools
 import importlib
 import os
 import os.path as osp
@@ -20,25 +22,38 @@ from torchrl.envs import EnvBase, RewardSum, Transform
 from benchmarl.utils import DEVICE_TYPING, read_yaml_config
 
 
+@functools.lru_cache(maxsize=None)
+def _config_paths() -> Dict[str, str]:
+    # Index from file name to path in the environments package, walked once per process
+    paths = {}
+    for dirpath, _, filenames in os.walk(osp.dirname(__file__)):
+        for filename in filenames:
+            paths.setdefault(filename, os.path.join(dirpath, filename))
+    return paths
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config_module(pathname: str):
+    spec = importlib.util.spec_from_file_location("", pathname)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@functools.lru_cache(maxsize=None)
+def _read_task_yaml(path: str) -> Dict[str, Any]:
+    return read_yaml_config(path)
+
+
 def _load_config(name: str, config: Dict[str, Any]):
     if not name.endswith(".py"):
         name += ".py"
 
-    pathname = None
-    for dirpath, _, filenames in os.walk(osp.dirname(__file__)):
-        if pathname is None:
-            for filename in filenames:
-                if filename == name:
-                    pathname = os.path.join(dirpath, filename)
-                    break
-
+    pathname = _config_paths().get(name)
     if pathname is None:
         raise ValueError(f"Task {name} not found.")
 
-    spec = importlib.util.spec_from_file_location("", pathname)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
-    return module.TaskConfig(**config).__dict__
+    return _load_config_module(pathname).TaskConfig(**config).__dict__
 
 
 class Task(Enum):
@@ -255,7 +270,8 @@ class Task(Enum):
     @staticmethod
     def _load_from_yaml(name: str) -> Dict[str, Any]:
         yaml_path = Path(__file__).parent.parent / "conf" / "task" / f"{name}.yaml"
-        return read_yaml_config(str(yaml_path.resolve()))
+        # Parsed once per process, copied so that callers can modify the config
+        return copy.deepcopy(_read_task_yaml(str(yaml_path.resolve())))
 
     def get_from_yaml(self, path: Optional[str] = None) -> Task:
         """
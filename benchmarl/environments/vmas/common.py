@@ -6,6 +6,7 @@
 
 from typing import Callable, Dict, List, Optional
 
+from tensordict import TensorDictBase
 from torchrl.data import CompositeSpec
 from torchrl.envs import EnvBase
 from torchrl.envs.libs.vmas import VmasEnv
@@ -40,6 +41,7 @@ class VmasTask(Task):
     SIMPLE_REFERENCE_IDIOLECT_EXT_NOISE6 = None
     SIMPLE_REFERENCE_IDIOLECT_EXT_NOISE8 = None
     SIMPLE_REFERENCE_IDIOLECT_EXT_NOISE10 = None
+    SIMPLE_REFERENCE_FAMILY = None
 
     def get_env_fun(
         self,
@@ -67,6 +69,14 @@ class VmasTask(Task):
     def has_render(self, env: EnvBase) -> bool:
         return True
 
+    @staticmethod
+    def render_callback(experiment, env: EnvBase, data: TensorDictBase):
+        # Drawn in NumPy, without pyglet, OpenGL or a display
+        try:
+            return env.render(mode="rgb_array", backend="numpy")
+        except TypeError:
+            return Task.render_callback(experiment, env, data)
+
     def max_steps(self, env: EnvBase) -> int:
         return self.config["max_steps"]
 
@@ -0,0 +1,23 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+from dataclasses import dataclass, MISSING
+from typing import Any
+
+
+@dataclass
+class TaskConfig:
+    max_steps: int = MISSING
+    # The following accept a single value or a list of values, one per block of envs
+    speaker_noise: Any = MISSING
+    listener_noise: Any = MISSING
+    external_noise: Any = MISSING
+    memory_length: Any = MISSING
+    landmark_colors: Any = MISSING
+    spawn_center: Any = MISSING
+    fixed_landmarks: Any = MISSING
+    ref_frame: Any = MISSING
+    observe_clean_comm: bool = MISSING
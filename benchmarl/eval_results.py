@@ -26,6 +26,9 @@ if _has_marl_eval:
     )
     from matplotlib import pyplot as plt
 
+# Written by Benchmark.run_parallel next to the experiment folders, it is not an experiment result
+BENCHMARK_SUMMARY_FILE = "benchmark_summary.json"
+
 
 def get_raw_dict_from_multirun_folder(multirun_folder: str) -> Dict:
     return load_and_merge_json_dicts(_get_json_files_from_multirun(multirun_folder))
@@ -35,7 +38,11 @@ def _get_json_files_from_multirun(multirun_folder: str) -> List[str]:
     files = []
     for dirpath, _, filenames in walk(multirun_folder):
         for file_name in filenames:
-            if file_name.endswith(".json") and "wandb" not in file_name:
+            if (
+                file_name.endswith(".json")
+                and "wandb" not in file_name
+                and file_name != BENCHMARK_SUMMARY_FILE
+            ):
                 files.append(str(Path(dirpath) / Path(file_name)))
     return files
 
@@ -0,0 +1,49 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+from pathlib import Path
+from typing import Dict, Union
+
+import torch
+
+
+def policy_checkpoint_file(checkpoint_file: Union[str, Path]) -> Path:
+    """
+    Returns the path of the policy checkpoint saved next to a full checkpoint.
+
+    ``checkpoints/checkpoint_{frames}.pt`` has its policy checkpoint in ``checkpoints/policy_{frames}.pt``.
+    """
+    checkpoint_file = Path(checkpoint_file)
+    return checkpoint_file.with_name(
+        checkpoint_file.name.replace("checkpoint_", "policy_", 1)
+    )
+
+
+def load_checkpoint(
+    path: Union[str, Path], map_location="cpu", policy_only: bool = True
+) -> Dict:
+    """
+    Loads an experiment checkpoint for evaluation.
+
+    Tensors are memory-mapped, so only the parts of the file that are actually used get read from disk.
+
+    Args:
+        path (str or Path): path to a ``checkpoint_{frames}.pt`` or ``policy_{frames}.pt`` file
+        map_location: passed to :func:`torch.load`
+        policy_only (bool): if ``True`` and a policy checkpoint exists next to ``path``, that one is loaded instead.
+            It does not contain the replay buffers nor the environment state.
+
+    Returns: the loaded state dict
+
+    """
+    path = Path(path)
+    if policy_only and policy_checkpoint_file(path).is_file():
+        path = policy_checkpoint_file(path)
+    try:
+        return torch.load(path, map_location=map_location, mmap=True)
+    except (TypeError, RuntimeError):
+        # Old torch versions do not support mmap and legacy files cannot be memory-mapped
+        return torch.load(path, map_location=map_location)
@@ -0,0 +1,192 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import torch
+from tensordict import TensorDictBase
+from torch import Tensor
+from torchrl.envs.utils import ExplorationType, set_exploration_type
+
+from benchmarl.algorithms.common import AlgorithmConfig
+from benchmarl.environments import Task
+from benchmarl.experiment.checkpoint import load_checkpoint
+from benchmarl.experiment.experiment import ExperimentConfig
+from benchmarl.models.common import ModelConfig
+
+
+class Evaluator:
+    """
+    Inference-only runner for trained policies.
+
+    Unlike :class:`~benchmarl.experiment.Experiment`, it only builds the task environment and the policy:
+    no replay buffers, losses, optimizers, collector or logger are created.
+    The policy is then rolled out in the vectorized environment without gradients.
+
+    Args:
+        task (Task): the task
+        algorithm_config (AlgorithmConfig): the algorithm configuration the policy was trained with
+        model_config (ModelConfig): the policy model configuration
+        seed (int): the seed for the environment
+        config (ExperimentConfig): the experiment configuration.
+            ``sampling_device``, ``train_device``, ``share_policy_params`` and
+            ``prefer_continuous_actions`` are used.
+        n_envs (int): number of vectorized environments
+        critic_model_config (ModelConfig, optional): the critic model configuration.
+            If None, it defaults to model_config
+        checkpoint (str, optional): path to a checkpoint to load the policy from
+        explore (bool): if ``True``, actions are sampled from the exploration policy,
+            like in the collection of ``Experiment.run(eval=True)``. Otherwise the deterministic mode is used.
+
+    """
+
+    def __init__(
+        self,
+        task: Task,
+        algorithm_config: AlgorithmConfig,
+        model_config: ModelConfig,
+        seed: int,
+        config: ExperimentConfig,
+        n_envs: int,
+        critic_model_config: Optional[ModelConfig] = None,
+        checkpoint: Optional[str] = None,
+        explore: bool = True,
+    ):
+        self.config = config
+        self.task = task
+        self.model_config = model_config
+        self.critic_model_config = (
+            critic_model_config if critic_model_config is not None else model_config
+        )
+        self.algorithm_config = algorithm_config
+        self.seed = seed
+        self.n_envs = n_envs
+        self.explore = explore
+
+        self._setup()
+
+        if checkpoint is not None:
+            self.load_state_dict(load_checkpoint(checkpoint))
+
+    @property
+    def on_policy(self) -> bool:
+        """Weather the algorithm has to be run on policy"""
+        return self.algorithm_config.on_policy()
+
+    def _setup(self):
+        self._set_action_type()
+        self._setup_task()
+        self.algorithm = self.algorithm_config.get_algorithm(experiment=self)
+        self.policy = self.algorithm.get_policy_for_collection()
+
+    def _set_action_type(self):
+        if (
+            self.task.supports_continuous_actions()
+            and self.algorithm_config.supports_continuous_actions()
+            and self.config.prefer_continuous_actions
+        ):
+            self.continuous_actions = True
+        elif (
+            self.task.supports_discrete_actions()
+            and self.algorithm_config.supports_discrete_actions()
+        ):
+            self.continuous_actions = False
+        elif (
+            self.task.supports_continuous_actions()
+            and self.algorithm_config.supports_continuous_actions()
+        ):
+            self.continuous_actions = True
+        else:
+            raise ValueError(
+                f"Algorithm {self.algorithm_config} is not compatible"
+                f" with the action space of task {self.task} "
+            )
+
+    def _setup_task(self):
+        env = self.model_config.process_env_fun(
+            self.task.get_env_fun(
+                num_envs=self.n_envs,
+                continuous_actions=self.continuous_actions,
+                seed=self.seed,
+                device=self.config.sampling_device,
+            )
+        )()
+        if env.batch_size == ():
+            raise ValueError(
+                f"Evaluator needs a vectorized environment, task {self.task} is not"
+            )
+
+        self.observation_spec = self.task.observation_spec(env)
+        self.info_spec = self.task.info_spec(env)
+        self.state_spec = self.task.state_spec(env)
+        self.action_mask_spec = self.task.action_mask_spec(env)
+        self.action_spec = self.task.action_spec(env)
+        self.group_map = self.task.group_map(env)
+        self.max_steps = self.task.max_steps(env)
+
+        self.env = env.to(self.config.sampling_device)
+
+    def state_dict(self) -> OrderedDict:
+        """Get the policy state_dict, nested as in experiment checkpoints"""
+        return OrderedDict(
+            collector=OrderedDict(policy_state_dict=self.policy.state_dict())
+        )
+
+    def load_state_dict(self, state_dict: Dict) -> None:
+        """Load the policy from an experiment (or policy) checkpoint state_dict"""
+        self.policy.load_state_dict(state_dict["collector"]["policy_state_dict"])
+
+    @torch.no_grad()
+    def rollout(self, max_steps: Optional[int] = None) -> TensorDictBase:
+        """
+        Rolls out the policy in all environments.
+
+        Args:
+            max_steps (int, optional): number of steps. Defaults to the task max steps.
+
+        Returns: the rollout tensordict with batch size ``(n_envs, max_steps)``
+
+        """
+        with set_exploration_type(
+            ExplorationType.RANDOM if self.explore else ExplorationType.MODE
+        ):
+            return self.env.rollout(
+                max_steps=max_steps if max_steps is not None else self.max_steps,
+                policy=self.policy,
+                auto_cast_to_device=True,
+                break_when_any_done=False,
+            )
+
+    def evaluate(self, max_steps: Optional[int] = None) -> Dict[str, Tensor]:
+        """
+        Rolls out the policy and returns the per-env reward trajectories.
+
+        Args:
+            max_steps (int, optional): number of steps. Defaults to the task max steps.
+
+        Returns: a dictionary mapping each group to its rewards of shape ``(n_envs, max_steps, n_agents, 1)``
+
+        """
+        rollout = self.rollout(max_steps=max_steps)
+        rewards = {}
+        for group in self.group_map.keys():
+            if ("next", group, "reward") in rollout.keys(True, True):
+                reward = rollout.get(("next", group, "reward"))
+            else:
+                reward = (
+                    rollout.get(("next", "reward"))
+                    .expand(rollout.get(group).shape)
+                    .unsqueeze(-1)
+                )
+            rewards[group] = reward
+        return rewards
+
+    def close(self):
+        """Close the environment."""
+        self.env.close()
@@ -28,6 +28,7 @@ from tqdm import tqdm
 from benchmarl.algorithms.common import AlgorithmConfig
 from benchmarl.environments import Task
 from benchmarl.experiment.callback import Callback, CallbackNotifier
+from benchmarl.experiment.checkpoint import policy_checkpoint_file
 from benchmarl.experiment.logger import Logger
 from benchmarl.models.common import ModelConfig
 from benchmarl.utils import read_yaml_config
@@ -80,6 +81,9 @@ class ExperimentConfig:
     off_policy_n_optimizer_steps: int = MISSING
     off_policy_train_batch_size: int = MISSING
     off_policy_memory_size: int = MISSING
+    off_policy_update_block_size: int = MISSING
+    off_policy_compact_storage: bool = MISSING
+    off_policy_observation_dtype: Optional[str] = MISSING
 
     evaluation: bool = MISSING
     render: bool = MISSING
@@ -88,10 +92,12 @@ class ExperimentConfig:
 
     loggers: List[str] = MISSING
     create_json: bool = MISSING
+    async_logging: bool = MISSING
 
     save_folder: Optional[str] = MISSING
     restore_file: Optional[str] = MISSING
     checkpoint_interval: float = MISSING
+    save_policy_checkpoint: bool = MISSING
 
     def train_batch_size(self, on_policy: bool) -> int:
         """
@@ -276,6 +282,11 @@ class ExperimentConfig:
             )
         if self.max_n_frames is None and self.max_n_iters is None:
             raise ValueError("n_iters and total_frames are both not set")
+        if self.off_policy_observation_dtype not in (None, "float16", "bfloat16"):
+            raise ValueError(
+                f"off_policy_observation_dtype ({self.off_policy_observation_dtype}) "
+                "must be null, float16 or bfloat16"
+            )
 
 
 class Experiment(CallbackNotifier):
@@ -423,15 +434,40 @@ class Experiment(CallbackNotifier):
             group: self.algorithm.get_loss_and_updater(group)[1]
             for group in self.group_map.keys()
         }
+        optimizer_kwargs = {}
+        if self._block_updates:
+            # Multi-tensor Adam, fused in a single kernel on GPU
+            optimizer_kwargs = (
+                {"fused": True}
+                if torch.device(self.config.train_device).type == "cuda"
+                else {"foreach": True}
+            )
         self.optimizers = {
             group: {
                 loss_name: torch.optim.Adam(
-                    params, lr=self.config.lr, eps=self.config.adam_eps
+                    params,
+                    lr=self.config.lr,
+                    eps=self.config.adam_eps,
+                    **optimizer_kwargs,
                 )
                 for loss_name, params in self.algorithm.get_parameters(group).items()
             }
             for group in self.group_map.keys()
         }
+        # Parameters of each optimizer, listed once for gradient clipping
+        self._optimizer_params = {
+            optimizer: [
+                param
+                for param_group in optimizer.param_groups
+                for param in param_group["params"]
+            ]
+            for group_optimizers in self.optimizers.values()
+            for optimizer in group_optimizers.values()
+        }
+
+    @property
+    def _block_updates(self) -> bool:
+        return not self.on_policy and self.config.off_policy_update_block_size > 0
 
     def _setup_collector(self):
         self.policy = self.algorithm.get_policy_for_collection()
@@ -560,12 +596,23 @@ class Experiment(CallbackNotifier):
                     self.replay_buffers[group].extend(group_batch)
 
                     training_tds = []
-                    for _ in range(self.config.n_optimizer_steps(self.on_policy)):
-                        for _ in range(
+                    if self._block_updates:
+                        n_steps = self.config.n_optimizer_steps(self.on_policy) * (
                             self.config.train_batch_size(self.on_policy)
                             // self.config.train_minibatch_size(self.on_policy)
-                        ):
-                            training_tds.append(self._optimizer_loop(group))
+                        )
+                        block_size = self.config.off_policy_update_block_size
+                        for start in range(0, n_steps, block_size):
+                            training_tds += self._optimizer_block(
+                                group, min(block_size, n_steps - start)
+                            )
+                    else:
+                        for _ in range(self.config.n_optimizer_steps(self.on_policy)):
+                            for _ in range(
+                                self.config.train_batch_size(self.on_policy)
+                                // self.config.train_minibatch_size(self.on_policy)
+                            ):
+                                training_tds.append(self._optimizer_loop(group))
                     training_td = torch.stack(training_tds)
                     self.logger.log_training(
                         group, training_td, step=self.n_iters_performed
@@ -637,8 +684,25 @@ class Experiment(CallbackNotifier):
         excluded_keys += ["info", (group, "info"), ("next", group, "info")]
         return excluded_keys
 
-    def _optimizer_loop(self, group: str) -> TensorDictBase:
-        subdata = self.replay_buffers[group].sample()
+    def _optimizer_block(self, group: str, n_steps: int) -> List[TensorDictBase]:
+        """
+        Runs n_steps off-policy optimizer steps on minibatches sampled uniformly from the replay buffer,
+        like its RandomSampler, and gathered from the storage in one indexed read.
+        """
+        replay_buffer = self.replay_buffers[group]
+        minibatch_size = self.config.train_minibatch_size(self.on_policy)
+        index = torch.randint(len(replay_buffer), (n_steps * minibatch_size,))
+        block = replay_buffer[index].reshape(n_steps, minibatch_size)
+        block.set("index", index.reshape(n_steps, minibatch_size).to(block.device))
+        return [
+            self._optimizer_loop(group, subdata=block[step]) for step in range(n_steps)
+        ]
+
+    def _optimizer_loop(
+        self, group: str, subdata: Optional[TensorDictBase] = None
+    ) -> TensorDictBase:
+        if subdata is None:
+            subdata = self.replay_buffers[group].sample()
         loss_vals = self.losses[group](subdata)
         training_td = loss_vals.detach()
         loss_vals = self.algorithm.process_loss_vals(group, loss_vals)
@@ -653,7 +717,7 @@ class Experiment(CallbackNotifier):
 
                 training_td.set(
                     f"grad_norm_{loss_name}",
-                    torch.tensor(grad_norm, device=self.config.train_device),
+                    grad_norm.to(self.config.train_device),
                 )
 
                 optimizer.step()
@@ -668,19 +732,26 @@ class Experiment(CallbackNotifier):
 
         return training_td
 
-    def _grad_clip(self, optimizer: torch.optim.Optimizer) -> float:
-        params = []
-        for param_group in optimizer.param_groups:
-            params += param_group["params"]
+    def _grad_clip(self, optimizer: torch.optim.Optimizer) -> torch.Tensor:
+        # The norm stays on device, it is moved to the host with the other training metrics
+        params = self._optimizer_params[optimizer]
 
         if self.config.clip_grad_norm and self.config.clip_grad_val is not None:
             gn = torch.nn.utils.clip_grad_norm_(params, self.config.clip_grad_val)
         else:
-            gn = sum(p.grad.pow(2).sum() for p in params if p.grad is not None).sqrt()
+            gn = torch.linalg.vector_norm(
+                torch.stack(
+                    [
+                        torch.linalg.vector_norm(p.grad)
+                        for p in params
+                        if p.grad is not None
+                    ]
+                )
+            )
             if self.config.clip_grad_val is not None:
                 torch.nn.utils.clip_grad_value_(params, self.config.clip_grad_val)
 
-        return float(gn)
+        return gn.detach()
 
     @torch.no_grad()
     def _evaluation_loop(self):
@@ -753,6 +824,21 @@ class Experiment(CallbackNotifier):
         )
         return state_dict
 
+    def policy_state_dict(self) -> OrderedDict:
+        """Get the state_dict for the experiment without replay buffers and environment state"""
+        collector_state_dict = self.collector.state_dict()
+        collector_state_dict.pop("env_state_dict", None)
+        return OrderedDict(
+            state=OrderedDict(
+                total_time=self.total_time,
+                total_frames=self.total_frames,
+                n_iters_performed=self.n_iters_performed,
+                mean_return=self.mean_return,
+            ),
+            collector=collector_state_dict,
+            **{f"loss_{k}": item.state_dict() for k, item in self.losses.items()},
+        )
+
     def load_state_dict(self, state_dict: Dict) -> None:
         """Load the state_dict for the experiment"""
         for group in self.group_map.keys():
@@ -768,7 +854,11 @@ class Experiment(CallbackNotifier):
         """Load the state_dict for the experiment"""
         for group in self.group_map.keys():
             self.losses[group].load_state_dict(state_dict[f"loss_{group}"])
-            self.replay_buffers[group].load_state_dict(state_dict[f"buffer_{group}"])
+            # Policy checkpoints do not contain the replay buffers
+            if f"buffer_{group}" in state_dict:
+                self.replay_buffers[group].load_state_dict(
+                    state_dict[f"buffer_{group}"]
+                )
         self.collector.load_state_dict(state_dict["collector"], strict=False)
 
     def _save_experiment(self) -> None:
@@ -777,6 +867,10 @@ class Experiment(CallbackNotifier):
         checkpoint_folder.mkdir(parents=False, exist_ok=True)
         checkpoint_file = checkpoint_folder / f"checkpoint_{self.total_frames}.pt"
         torch.save(self.state_dict(), checkpoint_file)
+        if self.config.save_policy_checkpoint:
+            torch.save(
+                self.policy_state_dict(), policy_checkpoint_file(checkpoint_file)
+            )
 
     def _load_experiment(self) -> Experiment:
         """Load trainer from checkpoint"""
@@ -789,6 +883,6 @@ class Experiment(CallbackNotifier):
         print(loaded_dict["collector"]["frames"])
         loaded_dict["collector"]["frames"] = 0
         loaded_dict["collector"]["iter"] = 0
-        del loaded_dict["collector"]["env_state_dict"]
+        loaded_dict["collector"].pop("env_state_dict", None)
         self.load_policy_only(loaded_dict)
         return self
@@ -5,8 +5,9 @@
 #
 
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 import numpy as np
 import torch
@@ -68,6 +69,14 @@ class Logger:
                 )
             )
 
+        # A single worker keeps the calls to the loggers in order
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1)
+            if experiment_config.async_logging and len(self.loggers)
+            else None
+        )
+        self._async_error = None
+
     def log_hparams(self, **kwargs):
         for logger in self.loggers:
             kwargs.update(
@@ -89,73 +98,112 @@ class Logger:
         step: int,
         eval = False
     ) -> float:
+        # All reductions stay on device until a single transfer to the host
         to_log = {}
-        json_metrics = {}
+        counts = {}
+        group_returns = []
+        group_dones = []
         for group in self.group_map.keys():
             episode_reward = self._get_episode_reward(group, batch)
             done = self._get_done(group, batch)
             reward = self._get_reward(group, batch)
+            group_returns.append(episode_reward.mean(-2))
+            group_dones.append(done.any(-2))
+            if not len(self.loggers):
+                continue
             to_log.update(
                 {
-                    f"collection/{group}/reward/reward_min": reward.min().item(),
-                    f"collection/{group}/reward/reward_mean": reward.mean().item(),
-                    f"collection/{group}/reward/reward_max": reward.max().item(),
+                    f"collection/{group}/reward/reward_min": reward.min(),
+                    f"collection/{group}/reward/reward_mean": reward.mean(),
+                    f"collection/{group}/reward/reward_max": reward.max(),
                 }
             )
-            json_metrics[group + "_return"] = episode_reward.mean(-2)[done.any(-2)]
-            episode_reward = episode_reward[done]
-            if episode_reward.numel() > 0:
-                to_log.update(
-                    {
-                        f"collection/{group}/reward/episode_reward_min": episode_reward.min().item(),
-                        f"collection/{group}/reward/episode_reward_mean": episode_reward.mean().item(),
-                        f"collection/{group}/reward/episode_reward_max": episode_reward.max().item(),
-                    }
-                )
+            self._masked_stats(
+                to_log,
+                counts,
+                f"collection/{group}/reward/episode_reward",
+                episode_reward,
+                done,
+            )
             if "info" in batch.get(("next", group)).keys():
                 to_log.update(
                     {
-                        f"collection/{group}/info/{key}": value.to(torch.float)
-                        .mean()
-                        .item()
+                        f"collection/{group}/info/{key}": value.to(torch.float).mean()
                         for key, value in batch.get(("next", group, "info")).items()
                     }
                 )
-        if "info" in batch.keys():
+        if len(self.loggers) and "info" in batch.keys():
             to_log.update(
                 {
-                    f"collection/info/{key}": value.to(torch.float).mean().item()
+                    f"collection/info/{key}": value.to(torch.float).mean()
                     for key, value in batch.get(("next", "info")).items()
                 }
             )
-        to_log.update(task.log_info(batch))
-        mean_group_return = torch.stack(
-            [value for key, value in json_metrics.items()], dim=0
-        ).mean(0)
-        if mean_group_return.numel() > 0:
-            to_log.update(
-                {
-                    "collection/reward/episode_reward_min": mean_group_return.min().item(),
-                    "collection/reward/episode_reward_mean": mean_group_return.mean().item(),
-                    "collection/reward/episode_reward_max": mean_group_return.max().item(),
-                }
-            )
-        self.log(to_log, step=step)
-        
+        mean_group_return = torch.stack(group_returns, dim=0).mean(0)
+        # Envs are done at the same time for all groups
+        self._masked_stats(
+            to_log,
+            counts,
+            "collection/reward/episode_reward",
+            mean_group_return,
+            group_dones[0],
+        )
+
+        to_log, counts = self._to_host(to_log, counts)
+        mean_return = to_log["collection/reward/episode_reward_mean"]
+        for prefix, count in counts.items():
+            # Same as not logging the stats of empty tensors
+            if count == 0:
+                for stat in ("min", "mean", "max"):
+                    del to_log[f"{prefix}_{stat}"]
+        if len(self.loggers):
+            to_log.update(task.log_info(batch))
+            self.log(to_log, step=step)
+
         if eval:
-            return mean_group_return.mean().item(), episode_reward, reward
+            return mean_return, episode_reward[done], reward
         else:
-            return mean_group_return.mean().item()
-        
+            return mean_return
+
     def log_training(self, group: str, training_td: TensorDictBase, step: int):
         if not len(self.loggers):
             return
-        to_log = {
-            f"train/{group}/{key}": value.mean().item()
-            for key, value in training_td.items()
-        }
+        to_log, _ = self._to_host(
+            {
+                f"train/{group}/{key}": value.to(torch.float).mean()
+                for key, value in training_td.items()
+            }
+        )
         self.log(to_log, step=step)
 
+    @staticmethod
+    def _masked_stats(
+        to_log: Dict, counts: Dict, prefix: str, value: Tensor, mask: Tensor
+    ):
+        # min, mean and max of value[mask] without indexing, which would sync with the device
+        count = mask.sum()
+        to_log.update(
+            {
+                f"{prefix}_min": torch.where(mask, value, torch.inf).min(),
+                f"{prefix}_mean": (value * mask).sum() / count,
+                f"{prefix}_max": torch.where(mask, value, -torch.inf).max(),
+            }
+        )
+        counts[prefix] = count
+
+    @staticmethod
+    def _to_host(to_log: Dict[str, Tensor], counts: Optional[Dict[str, Tensor]] = None):
+        # Moves all scalars to the host in one transfer
+        counts = counts if counts is not None else {}
+        tensors = list(to_log.values()) + list(counts.values())
+        if not len(tensors):
+            return {}, {}
+        values = torch.stack([tensor.to(torch.float) for tensor in tensors]).tolist()
+        return (
+            dict(zip(to_log.keys(), values[: len(to_log)])),
+            dict(zip(counts.keys(), values[len(to_log) :])),
+        )
+
     def log_evaluation(
         self,
         rollouts: List[TensorDictBase],
@@ -227,18 +275,48 @@ class Logger:
                 ),
                 dtype=torch.uint8,
             ).unsqueeze(0)
-            for logger in self.loggers:
-                if isinstance(logger, WandbLogger):
-                    logger.log_video("eval/video", vid, fps=20, commit=False)
-                else:
-                    logger.log_video("eval_video", vid, step=step)
+            self._submit(self._log_video, vid, step)
 
     def commit(self):
+        self._submit(self._commit)
+
+    def log(self, dict_to_log: Dict, step: int = None):
+        self._submit(self._log, dict_to_log, step)
+
+    def finish(self):
+        if self._executor is not None:
+            # Flush the pending calls
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._raise_async_error()
+        if self.json_writer is not None:
+            self.json_writer.finalize()
         for logger in self.loggers:
             if isinstance(logger, WandbLogger):
-                logger.experiment.log({}, commit=True)
+                import wandb
 
-    def log(self, dict_to_log: Dict, step: int = None):
+                wandb.finish()
+
+    def _submit(self, function: Callable, *args):
+        # Runs the call on the background thread when logging asynchronously
+        if self._executor is None:
+            function(*args)
+        else:
+            self._raise_async_error()
+            self._executor.submit(function, *args).add_done_callback(
+                self._store_async_error
+            )
+
+    def _store_async_error(self, future: Future):
+        if future.exception() is not None and self._async_error is None:
+            self._async_error = future.exception()
+
+    def _raise_async_error(self):
+        if self._async_error is not None:
+            error, self._async_error = self._async_error, None
+            raise error
+
+    def _log(self, dict_to_log: Dict, step: int = None):
         for logger in self.loggers:
             if isinstance(logger, WandbLogger):
                 logger.experiment.log(dict_to_log, commit=False)
@@ -246,12 +324,17 @@ class Logger:
                 for key, value in dict_to_log.items():
                     logger.log_scalar(key.replace("/", "_"), value, step=step)
 
-    def finish(self):
+    def _commit(self):
         for logger in self.loggers:
             if isinstance(logger, WandbLogger):
-                import wandb
+                logger.experiment.log({}, commit=True)
 
-                wandb.finish()
+    def _log_video(self, vid: Tensor, step: int):
+        for logger in self.loggers:
+            if isinstance(logger, WandbLogger):
+                logger.log_video("eval/video", vid, fps=20, commit=False)
+            else:
+                logger.log_video("eval_video", vid, step=step)
 
     def _get_reward(
         self, group: str, td: TensorDictBase, remove_agent_dim: bool = False
@@ -291,6 +374,11 @@ class JsonWriter:
 
     Follows conventions from https://github.com/instadeepai/marl-eval/tree/main#usage-
 
+    Each evaluation step is appended as one compact record to a ``.jsonl`` file next to the json file,
+    so the cost of a write does not grow with the length of the run.
+    :meth:`finalize` compacts the records into the marl-eval json file, computing the absolute metrics
+    from the records, which also include the steps of earlier runs resumed in the same folder.
+
     Args:
         folder (str): folder where to write the file
         name (str): file name
@@ -311,18 +399,25 @@ class JsonWriter:
         seed: int,
     ):
         self.path = Path(folder) / Path(name)
-        self.run_data = {"absolute_metrics": {}}
-        self.data = {
-            environment_name: {
-                task_name: {algorithm_name: {f"seed_{seed}": self.run_data}}
+        self.stream_path = self.path.with_suffix(".jsonl")
+        self._append(
+            {
+                "environment_name": environment_name,
+                "task_name": task_name,
+                "algorithm_name": algorithm_name,
+                "seed": seed,
             }
-        }
+        )
+
+    def _append(self, record: Dict):
+        with open(self.stream_path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
 
     def write(
         self, total_frames: int, metrics: Dict[str, List[Tensor]], evaluation_step: int
     ):
         """
-        Writes a step into the json reporting file
+        Appends a step to the jsonl reporting file
 
         Args:
             total_frames (int): total frames collected so far in the experiment
@@ -332,22 +427,59 @@ class JsonWriter:
 
         """
         metrics = {k: val.tolist() for k, val in metrics.items()}
-        step_metrics = {"step_count": total_frames}
-        step_metrics.update(metrics)
-        step_str = f"step_{evaluation_step}"
-        if step_str in self.run_data:
-            self.run_data[step_str].update(step_metrics)
-        else:
-            self.run_data[step_str] = step_metrics
-
-        # Store the maximum of each metric
-        for metric_name in metrics.keys():
-            if len(metrics[metric_name]):
-                max_metric = max(metrics[metric_name])
-                if metric_name in self.run_data["absolute_metrics"]:
-                    prev_max_metric = self.run_data["absolute_metrics"][metric_name][0]
-                    max_metric = max(max_metric, prev_max_metric)
-                self.run_data["absolute_metrics"][metric_name] = [max_metric]
-
-        with open(self.path, "w+") as f:
-            json.dump(self.data, f, indent=4)
+        record = {"evaluation_step": evaluation_step, "step_count": total_frames}
+        record.update(metrics)
+        self._append(record)
+
+    def finalize(self):
+        """
+        Writes the marl-eval json file from the records appended so far
+        """
+        compact_jsonl(self.stream_path, self.path)
+
+
+def compact_jsonl(jsonl_file: str, json_file: Optional[str] = None) -> Dict:
+    """
+    Compacts the records of a :class:`JsonWriter` into the marl-eval layout.
+    This also recovers the json file of runs that stopped before finalizing.
+
+    Args:
+        jsonl_file (str): the jsonl file written by a :class:`JsonWriter`
+        json_file (str, optional): if given, where to write the marl-eval json file
+
+    Returns: the marl-eval dictionary
+
+    """
+    data = {}
+    run_data = None
+    with open(jsonl_file, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "evaluation_step" not in record:
+                # Header, written again when a run is resumed in the same folder
+                run_data = (
+                    data.setdefault(record["environment_name"], {})
+                    .setdefault(record["task_name"], {})
+                    .setdefault(record["algorithm_name"], {})
+                    .setdefault(f"seed_{record['seed']}", {"absolute_metrics": {}})
+                )
+                continue
+            step_str = f"step_{record.pop('evaluation_step')}"
+            run_data.setdefault(step_str, {}).update(record)
+
+            # Store the maximum of each metric
+            absolute_metrics = run_data["absolute_metrics"]
+            for metric_name, values in record.items():
+                if metric_name == "step_count" or not len(values):
+                    continue
+                max_metric = max(values)
+                if metric_name in absolute_metrics:
+                    max_metric = max(max_metric, absolute_metrics[metric_name][0])
+                absolute_metrics[metric_name] = [max_metric]
+
+    if json_file is not None:
+        with open(json_file, "w+") as f:
+            json.dump(data, f, indent=4)
+    return data
@@ -0,0 +1,311 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import torch
+from torch import nn, Tensor
+
+from benchmarl.environments import Task
+from benchmarl.experiment.checkpoint import load_checkpoint
+
+_ACTOR_LAYER_PATTERN = re.compile(
+    r"^module\.0\..*mlp\.agent_networks\.(\d+)\.(\d+)\.(weight|bias)$"
+)
+_SIGMA_KEY = "module.0.sigma"
+
+# (checkpoint path, index of the agent network inside that checkpoint)
+PolicySource = Tuple[str, int]
+
+
+@dataclass
+class ActorCheckpoint:
+    """
+    Actor weights extracted from an experiment checkpoint.
+
+    Args:
+        networks (list): for each agent network, the list of ``(weight, bias)`` of its linear layers in order
+        sigma (float, optional): the exploration sigma stored in the checkpoint, if any
+
+    """
+
+    networks: List[List[Tuple[Tensor, Tensor]]]
+    sigma: Optional[float] = None
+
+    def get_network(self, index: int) -> List[Tuple[Tensor, Tensor]]:
+        """
+        Returns the layers of network ``index``.
+        Checkpoints with shared policy parameters contain a single network, which is used for every index.
+        """
+        if len(self.networks) == 1:
+            return self.networks[0]
+        if index >= len(self.networks):
+            raise ValueError(
+                f"Network {index} requested but checkpoint only has {len(self.networks)} networks"
+            )
+        return self.networks[index]
+
+
+def load_actor_checkpoint(path: str, map_location="cpu") -> ActorCheckpoint:
+    """
+    Loads only the actor weights of an experiment checkpoint.
+
+    Args:
+        path (str): path to a checkpoint written by :class:`~benchmarl.experiment.Experiment`
+        map_location: passed to :func:`~benchmarl.experiment.checkpoint.load_checkpoint`
+
+    Returns: an :class:`ActorCheckpoint`
+
+    """
+    state_dict = load_checkpoint(path, map_location=map_location)
+    if "collector" in state_dict:
+        state_dict = state_dict["collector"]["policy_state_dict"]
+
+    layers: Dict[int, Dict[int, Dict[str, Tensor]]] = {}
+    for key, value in state_dict.items():
+        match = _ACTOR_LAYER_PATTERN.match(key)
+        if match is None:
+            continue
+        network, layer, param = int(match.group(1)), int(match.group(2)), match.group(3)
+        layers.setdefault(network, {}).setdefault(layer, {})[param] = value
+    if not len(layers):
+        raise ValueError(f"No MLP actor weights found in checkpoint {path}")
+
+    networks = [
+        [
+            (layers[network][layer]["weight"], layers[network][layer]["bias"])
+            for layer in sorted(layers[network].keys())
+        ]
+        for network in sorted(layers.keys())
+    ]
+    sigma = state_dict.get(_SIGMA_KEY, None)
+    return ActorCheckpoint(
+        networks=networks, sigma=float(sigma) if sigma is not None else None
+    )
+
+
+def batched_mlp_forward(
+    layers: List[Tuple[Tensor, Tensor]],
+    input: Tensor,
+    activation: nn.Module,
+) -> Tensor:
+    """
+    Runs P different MLPs on P batches of inputs at once.
+
+    Args:
+        layers (list): ``(weight, bias)`` for each layer, with shapes ``(P, out, in)`` and ``(P, out)``
+        input (Tensor): input of shape ``(P, B, in)``
+        activation (nn.Module): activation applied after every layer but the last
+
+    Returns: the output of shape ``(P, B, out)``
+
+    """
+    out = input
+    for i, (weight, bias) in enumerate(layers):
+        out = torch.baddbmm(bias.unsqueeze(1), out, weight.transpose(1, 2))
+        if i < len(layers) - 1:
+            out = activation(out)
+    return out
+
+
+def tanh_delta_mode(param: Tensor, low: Tensor, high: Tensor) -> Tensor:
+    """
+    Deterministic action of a :class:`~torchrl.modules.TanhDelta` head with bounds ``low`` and ``high``.
+
+    As in ``TanhDelta``, when the bounds are not ``[-1, 1]`` the parameter is shifted by ``(high - low) / 2 + low``
+    before the tanh, and the tanh is then rescaled to the bounds.
+
+    Args:
+        param (Tensor): output of the actor network
+        low (Tensor): lower bound of the action
+        high (Tensor): upper bound of the action
+
+    Returns: the action
+
+    """
+    if (low != -1.0).any() or (high != 1.0).any():
+        param = param + (high - low) / 2 + low
+        return (high + low) / 2 + (high - low) / 2 * torch.tanh(param)
+    return torch.tanh(param)
+
+
+class CheckpointPairingEvaluator:
+    """
+    Evaluates combinations of agent policies taken from different checkpoints.
+
+    Each checkpoint is loaded once and only its actor weights are kept.
+    All the requested combinations are stacked in a single VMAS batch: every combination
+    gets ``n_envs_per_pairing`` consecutive environments, and each agent is driven by a
+    batched forward over the stacked weights of its source networks.
+    This avoids creating an :class:`~benchmarl.experiment.Experiment` per combination.
+
+    The actors are assumed to be MLPs with a ``TanhDelta`` head, like the ones created by MADDPG.
+
+    Args:
+        task (Task): the VMAS task to evaluate on
+        n_envs_per_pairing (int): number of vectorized environments for each combination
+        device (str): device for the simulation and the forward passes
+        activation_class (Type[nn.Module]): activation of the hidden layers of the actors
+        max_pairings_per_rollout (int, optional): maximum number of combinations in one rollout.
+            If ``None``, all combinations are evaluated in a single rollout.
+        explore (bool): if ``True``, gaussian noise with the sigma stored in a checkpoint
+            is added to the actions, like during the collection of ``Experiment.run(eval=True)``.
+            The checkpoint is chosen per combination with the ``sigma_sources`` argument of :meth:`evaluate`
+
+    """
+
+    def __init__(
+        self,
+        task: Task,
+        n_envs_per_pairing: int = 100,
+        device: str = "cpu",
+        activation_class: Type[nn.Module] = nn.Tanh,
+        max_pairings_per_rollout: Optional[int] = None,
+        explore: bool = True,
+    ):
+        if task.env_name() != "vmas":
+            raise ValueError(
+                f"CheckpointPairingEvaluator only supports vmas tasks, got {task.env_name()}"
+            )
+        if max_pairings_per_rollout is not None and max_pairings_per_rollout < 1:
+            raise ValueError("max_pairings_per_rollout must be at least 1")
+        self.task = task
+        self.n_envs_per_pairing = n_envs_per_pairing
+        self.device = device
+        self.activation = activation_class()
+        self.max_pairings_per_rollout = max_pairings_per_rollout
+        self.explore = explore
+        self._checkpoints: Dict[str, ActorCheckpoint] = {}
+
+    def get_checkpoint(self, path: str) -> ActorCheckpoint:
+        """Returns the actor weights of checkpoint ``path``, loading them on first use."""
+        if path not in self._checkpoints:
+            self._checkpoints[path] = load_actor_checkpoint(
+                path, map_location=self.device
+            )
+        return self._checkpoints[path]
+
+    def evaluate(
+        self,
+        pairings: Sequence[Sequence[PolicySource]],
+        seed: int = 0,
+        reward_agent: int = 0,
+        sigma_sources: Optional[Sequence[str]] = None,
+    ) -> Tensor:
+        """
+        Evaluates policy combinations.
+
+        Args:
+            pairings: for each combination, the ``(checkpoint path, network index)`` driving each agent
+            seed (int): seed of the vmas environment
+            reward_agent (int): agent whose reward is reported
+            sigma_sources: for each combination, the checkpoint path whose exploration sigma is used
+                for all the agents. If ``None``, the checkpoint of agent 0 is used
+
+        Returns: tensor of shape ``(len(pairings), n_envs_per_pairing)`` with the
+            return of ``reward_agent`` over one episode in each environment
+
+        """
+        if sigma_sources is None:
+            sigma_sources = [pairing[0][0] for pairing in pairings]
+        elif len(sigma_sources) != len(pairings):
+            raise ValueError(
+                f"Got {len(sigma_sources)} sigma sources for {len(pairings)} pairings"
+            )
+        chunk = self.max_pairings_per_rollout or len(pairings)
+        returns = [
+            self._rollout(
+                pairings[i : i + chunk],
+                sigma_sources[i : i + chunk],
+                seed=seed,
+                reward_agent=reward_agent,
+            )
+            for i in range(0, len(pairings), chunk)
+        ]
+        return torch.cat(returns, dim=0)
+
+    @torch.no_grad()
+    def _rollout(
+        self,
+        pairings: Sequence[Sequence[PolicySource]],
+        sigma_sources: Sequence[str],
+        seed: int,
+        reward_agent: int,
+    ) -> Tensor:
+        from vmas import make_env
+
+        n_pairings = len(pairings)
+        n_envs = self.n_envs_per_pairing
+        env = make_env(
+            scenario=self.task.name.lower(),
+            num_envs=n_pairings * n_envs,
+            device=self.device,
+            continuous_actions=True,
+            seed=seed,
+            **self.task.config,
+        )
+        n_agents = len(env.agents)
+        for pairing in pairings:
+            if len(pairing) != n_agents:
+                raise ValueError(
+                    f"Each pairing must provide a policy for each of the {n_agents} agents, got {len(pairing)}"
+                )
+
+        agent_layers = [
+            self._stack_layers([pairing[i] for pairing in pairings])
+            for i in range(n_agents)
+        ]
+        sigma = None
+        if self.explore:
+            sigma = torch.tensor(
+                [self.get_checkpoint(path).sigma or 0.0 for path in sigma_sources],
+                device=self.device,
+            ).view(n_pairings, 1, 1)
+        bounds = []
+        for agent in env.agents:
+            space = env.get_agent_action_space(agent)
+            bounds.append(
+                (
+                    torch.tensor(space.low, device=self.device),
+                    torch.tensor(space.high, device=self.device),
+                )
+            )
+
+        episode_return = torch.zeros(n_pairings * n_envs, device=self.device)
+        obs = env.reset()
+        for _ in range(self.task.config["max_steps"]):
+            actions = []
+            for i in range(n_agents):
+                low, high = bounds[i]
+                param = batched_mlp_forward(
+                    agent_layers[i],
+                    obs[i].view(n_pairings, n_envs, -1),
+                    self.activation,
+                )
+                action = tanh_delta_mode(param, low, high)
+                if sigma is not None:
+                    action = action + sigma * torch.randn_like(action)
+                    action = torch.max(torch.min(action, high), low)
+                actions.append(action.view(n_pairings * n_envs, -1))
+            obs, rews, dones, _ = env.step(actions)
+            episode_return += rews[reward_agent]
+        return episode_return.view(n_pairings, n_envs)
+
+    def _stack_layers(
+        self, sources: Sequence[PolicySource]
+    ) -> List[Tuple[Tensor, Tensor]]:
+        networks = [
+            self.get_checkpoint(path).get_network(index) for path, index in sources
+        ]
+        return [
+            (
+                torch.stack([network[layer][0] for network in networks]),
+                torch.stack([network[layer][1] for network in networks]),
+            )
+            for layer in range(len(networks[0]))
+        ]
@@ -7,16 +7,160 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, MISSING
-from typing import Optional, Sequence, Type
+from typing import List, Optional, Sequence, Type, Union
 
 import torch
 from tensordict import TensorDictBase
-from torch import nn
+from torch import nn, Tensor
 from torchrl.modules import MLP, MultiAgentMLP
 
 from benchmarl.models.common import Model, ModelConfig
 
 
+class AgentBatchedMLP(nn.Module):
+    """
+    The MLPs of ``n_agents`` agents that do not share parameters, evaluated together.
+
+    The weights of each linear layer are stacked in a single ``(n_agents, in, out)`` parameter, so each layer runs
+    as one batched matmul for all agents instead of one matmul per agent.
+    The state dict uses the per-agent layout ``{networks_key}.{agent}.{layer}.{weight|bias}`` of a
+    :class:`torch.nn.ModuleList` of :class:`torchrl.modules.MLP`, so checkpoints load in either model.
+
+    Args:
+        in_features (int): number of input features of each agent network
+        out_features (int): number of output features of each agent network
+        n_agents (int): number of agent networks
+        device: the device of the parameters
+        networks_key (str): name of the per-agent networks in the state dict.
+            ``"agent_networks"`` matches :class:`torchrl.modules.MultiAgentMLP`, ``""`` a plain module list.
+        **kwargs: the keyword arguments of :class:`torchrl.modules.MLP`
+
+    """
+
+    def __init__(
+        self,
+        in_features: int,
+        out_features: int,
+        n_agents: int,
+        device=None,
+        networks_key: str = "agent_networks",
+        **kwargs,
+    ):
+        super().__init__()
+        self.n_agents = n_agents
+        self.networks_key = networks_key
+
+        # Build the per-agent networks to get their structure and initialisation, then stack them
+        networks = [
+            MLP(
+                in_features=in_features,
+                out_features=out_features,
+                device=device,
+                **kwargs,
+            )
+            for _ in range(n_agents)
+        ]
+        self._layers: List[Union[int, nn.Module]] = []
+        self._linear_indices = []
+        for idx, layer in enumerate(networks[0]):
+            if isinstance(layer, nn.Linear):
+                self._linear_indices.append(idx)
+                self._layers.append(idx)
+                self.register_parameter(
+                    f"weight_{idx}",
+                    nn.Parameter(
+                        torch.stack(
+                            [network[idx].weight.detach().t() for network in networks]
+                        )
+                    ),
+                )
+                self.register_parameter(
+                    f"bias_{idx}",
+                    nn.Parameter(
+                        torch.stack(
+                            [network[idx].bias.detach() for network in networks]
+                        )
+                    )
+                    if layer.bias is not None
+                    else None,
+                )
+            elif len(list(layer.parameters())) or len(list(layer.buffers())):
+                raise ValueError(
+                    f"Agent batched MLPs only support linear layers and parameter-free layers, got {layer}"
+                )
+            else:
+                self._layers.append(layer)
+
+        self._register_state_dict_hook(AgentBatchedMLP._to_agent_state_dict)
+        self._register_load_state_dict_pre_hook(self._from_agent_state_dict)
+
+    def forward(self, inputs: Tensor) -> Tensor:
+        """
+        Args:
+            inputs (Tensor): the input of each agent network, of shape ``(*batch, n_agents, in_features)``
+
+        Returns: the outputs, of shape ``(*batch, n_agents, out_features)``
+
+        """
+        batch = inputs.shape[:-2]
+        # (n_agents, batch_size, features)
+        x = inputs.reshape(-1, self.n_agents, inputs.shape[-1]).transpose(0, 1)
+        for layer in self._layers:
+            if isinstance(layer, int):
+                weight = getattr(self, f"weight_{layer}")
+                bias = getattr(self, f"bias_{layer}")
+                if bias is not None:
+                    x = torch.baddbmm(bias.unsqueeze(-2), x, weight)
+                else:
+                    x = torch.bmm(x, weight)
+            else:
+                x = layer(x)
+        return x.transpose(0, 1).reshape(*batch, self.n_agents, x.shape[-1])
+
+    def _agent_key(self, prefix: str, agent: int, idx: int, param: str) -> str:
+        networks_key = f"{self.networks_key}." if len(self.networks_key) else ""
+        return f"{prefix}{networks_key}{agent}.{idx}.{param}"
+
+    @staticmethod
+    def _to_agent_state_dict(module, state_dict, prefix, local_metadata):
+        stacked = {
+            (idx, param): state_dict.pop(f"{prefix}{param}_{idx}")
+            for idx in module._linear_indices
+            for param in ("weight", "bias")
+            if f"{prefix}{param}_{idx}" in state_dict
+        }
+        # Same order as the per-agent networks
+        for agent in range(module.n_agents):
+            for (idx, param), value in stacked.items():
+                state_dict[module._agent_key(prefix, agent, idx, param)] = (
+                    value[agent].t() if param == "weight" else value[agent]
+                )
+
+    def _from_agent_state_dict(
+        self,
+        state_dict,
+        prefix,
+        local_metadata,
+        strict,
+        missing_keys,
+        unexpected_keys,
+        error_msgs,
+    ):
+        for idx in self._linear_indices:
+            for param in ("weight", "bias"):
+                keys = [
+                    self._agent_key(prefix, agent, idx, param)
+                    for agent in range(self.n_agents)
+                ]
+                if not all(key in state_dict for key in keys):
+                    # Left to the default loading to report
+                    continue
+                values = [state_dict.pop(key) for key in keys]
+                state_dict[f"{prefix}{param}_{idx}"] = torch.stack(
+                    [value.t() for value in values] if param == "weight" else values
+                )
+
+
 class Mlp(Model):
     def __init__(
         self,
@@ -33,11 +177,24 @@ class Mlp(Model):
             device=kwargs.pop("device"),
             action_spec=kwargs.pop("action_spec"),
         )
+        self.agent_batched = kwargs.pop("agent_batched")
 
         self.input_features = self.input_leaf_spec.shape[-1]
         self.output_features = self.output_leaf_spec.shape[-1]
 
-        if self.input_has_agent_dim:
+        if self.agent_batched and not self.share_params:
+            self.mlp = AgentBatchedMLP(
+                in_features=self.input_features * self.n_agents
+                if self.input_has_agent_dim and self.centralised
+                else self.input_features,
+                out_features=self.output_features,
+                n_agents=self.n_agents,
+                device=self.device,
+                # Same state dict as the MultiAgentMLP and ModuleList below
+                networks_key="agent_networks" if self.input_has_agent_dim else "",
+                **kwargs,
+            )
+        elif self.input_has_agent_dim:
             self.mlp = MultiAgentMLP(
                 n_agent_inputs=self.input_features,
                 n_agent_outputs=self.output_features,
@@ -81,8 +238,18 @@ class Mlp(Model):
         # Gather in_key
         input = tensordict.get(self.in_key)
 
+        if self.agent_batched and not self.share_params:
+            if not self.input_has_agent_dim:
+                input = input.unsqueeze(-2).expand(
+                    *input.shape[:-1], self.n_agents, input.shape[-1]
+                )
+            elif self.centralised:
+                input = input.reshape(*input.shape[:-2], -1).unsqueeze(-2)
+                input = input.expand(*input.shape[:-2], self.n_agents, input.shape[-1])
+            res = self.mlp.forward(input)
+
         # Has multi-agent input dimension
-        if self.input_has_agent_dim:
+        elif self.input_has_agent_dim:
             res = self.mlp.forward(input)
             if not self.output_has_agent_dim:
                 # If we are here the module is centralised and parameter shared.
@@ -115,6 +282,8 @@ class MlpConfig(ModelConfig):
     norm_class: Type[nn.Module] = None
     norm_kwargs: Optional[dict] = None
 
+    agent_batched: bool = False
+
     @staticmethod
     def associated_class():
         return Mlp
@@ -7,8 +7,9 @@ import numpy as np
 import scipy.stats as st
 import matplotlib.pyplot as plt
 from eval_seed import run_benchmark, get_error
+from result_cache import ResultCache
 
-def get_means(paths, task, shared, seeds_per_eval, checkpoints):
+def get_means(paths, task, shared, seeds_per_eval, checkpoints, cache=None):
     means = np.zeros((len(paths), len(checkpoints)))
     errors = np.zeros(len(checkpoints))
     for idx_checkpoint, checkpoint in enumerate(checkpoints):
@@ -16,7 +17,7 @@ def get_means(paths, task, shared, seeds_per_eval, checkpoints):
             checkpoint_path = path+str(checkpoint)+".pt"
             seed_means = []
             for seed in range(seeds_per_eval):
-                stats, mean_stats, to_graphs = run_benchmark(task=task, PATH=checkpoint_path, seed=seed, share_params=shared)
+                stats, mean_stats, to_graphs = run_benchmark(task=task, PATH=checkpoint_path, seed=seed, share_params=shared, cache=cache)
                 seed_means.append(mean_stats["Mean Rewards"])
             means[idx_path, idx_checkpoint] = np.mean(seed_means)
         errors[idx_checkpoint] = get_error(means[:, idx_checkpoint])
@@ -35,7 +36,7 @@ def write_csv(save_path, eval_type, means):
         for mean in means:
             writer.writerow(mean)
 
-def plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new, save_path, random=False):
+def plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new, save_path, random=False, cache=None):
     
     if not os.path.isdir(save_path):
         os.makedirs(save_path)
@@ -46,10 +47,10 @@ def plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_pa
         task_noise = VmasTask.SIMPLE_REFERENCE_IDIOLECT.get_from_yaml() if not new else IdiolectEvoTask.SPEED_NEW_NOISE.get_from_yaml()
 
     # Get Means and Errors
-    shared_noiseless_means, shared_noiseless_errors = get_means(paths=shared_noiseless_paths, task=task_noiseless, shared=True, seeds_per_eval=seeds, checkpoints=checkpoints)
-    unshared_noiseless_means, unshared_noiseless_errors = get_means(paths=unshared_noiseless_paths, task=task_noiseless, shared=False, seeds_per_eval=seeds, checkpoints=checkpoints)
-    shared_noise_means, shared_noise_errors = get_means(paths=shared_noise_paths, task=task_noise, shared=True, seeds_per_eval=seeds, checkpoints=checkpoints)
-    unshared_noise_means, unshared_noise_errors = get_means(paths=unshared_noise_paths, task=task_noise, shared=False, seeds_per_eval=seeds, checkpoints=checkpoints)
+    shared_noiseless_means, shared_noiseless_errors = get_means(paths=shared_noiseless_paths, task=task_noiseless, shared=True, seeds_per_eval=seeds, checkpoints=checkpoints, cache=cache)
+    unshared_noiseless_means, unshared_noiseless_errors = get_means(paths=unshared_noiseless_paths, task=task_noiseless, shared=False, seeds_per_eval=seeds, checkpoints=checkpoints, cache=cache)
+    shared_noise_means, shared_noise_errors = get_means(paths=shared_noise_paths, task=task_noise, shared=True, seeds_per_eval=seeds, checkpoints=checkpoints, cache=cache)
+    unshared_noise_means, unshared_noise_errors = get_means(paths=unshared_noise_paths, task=task_noise, shared=False, seeds_per_eval=seeds, checkpoints=checkpoints, cache=cache)
 
     # Save to Spreadsheet
     write_csv(save_path, "shared_noiseless", shared_noiseless_means)
@@ -148,5 +149,7 @@ if __name__ == "__main__":
     # Seeds
     seeds = 5
 
-    plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new=False, save_path="evaluation/graphs/4-18-update/old_evals/")
-    plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new=True, save_path="evaluation/graphs/4-18-update/new_evals/")
\ No newline at end of file
+    # Re-running the sweep only rolls out the cells that are not cached yet
+    cache = ResultCache()
+    plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new=False, save_path="evaluation/graphs/4-18-update/old_evals/", cache=cache)
+    plot_means(shared_noiseless_paths, unshared_noiseless_paths, shared_noise_paths, unshared_noise_paths, seeds, checkpoints, new=True, save_path="evaluation/graphs/4-18-update/new_evals/", cache=cache)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from benchmarl.algorithms import MaddpgConfig
 from benchmarl.environments import IdiolectEvoTask, VmasTask
 from benchmarl.experiment import Experiment, ExperimentConfig
+from benchmarl.experiment.checkpoint import load_checkpoint
 from benchmarl.models.mlp import MlpConfig
 import torch, itertools, csv, os, time
 import numpy as np
@@ -30,7 +31,7 @@ def run_benchmark(task, load_path, save_path, seed, share_params):
         critic_model_config = critic_model_config
     )
 
-    x = torch.load(load_path)
+    x = load_checkpoint(load_path)
     experiment = experiment.load_experiment_policy(x)
     experiment._evaluation_loop()
     experiment.close()
@@ -1,4 +1,5 @@
 from eval import *
+from metrics import reward_metrics
 
 def run_benchmark(task, PATH, seed):
     # Loads from "benchmarl/conf/experiment/base_experiment.yaml"
@@ -43,40 +44,24 @@ def run_benchmark(task, PATH, seed):
 
 def process_rewards(reward, episode_reward):
     # Get the individual rewards for each environment
-    reward = torch.squeeze(reward, -1)[:,:,0]
-    max_rewards, _ = torch.max(reward.clone().detach(), dim=1, keepdim=True)
-    min_rewards, _ = torch.min(reward.clone().detach(), dim=1, keepdim=True)
-    mean_rewards = torch.mean(reward.clone().detach(), dim=1, keepdim=True)
-
-    # Find the last time the rewards dip under a certain threshold (speed)
-    def find_speed(row, threshold):
-        out = float('nan')
-        for idx, val in enumerate(row):
-            if (-1*val)<threshold:
-                return idx
-        return float('nan')
-    
-    # Return the speed for each row
-    speed_data = map(lambda row: find_speed(row, threshold=.2), reward.clone().detach())
-    speed_tensor = torch.Tensor(list(speed_data))
-    speed_length = torch.sum(torch.isnan(speed_tensor)).item()
-
-    thresholds = []
-    num_nans = []
-    speed_means = []
+    reward = torch.squeeze(reward, -1)[:,:,0].clone().detach()
 
+    # Speed (first step where the reward rises above -threshold) for the .2 threshold
+    # and for the threshold sweep, computed together with the reward stats in one pass
     num_steps = 20
+    thresholds = [.2] + list(np.linspace(0, 2, num_steps))
+    metrics = reward_metrics(reward, thresholds)
+
+    max_rewards = metrics["max"]
+    min_rewards = metrics["min"]
+    mean_rewards = metrics["mean"]
 
-    for step in np.linspace(0, 2, num_steps):
-        # thresh = thresh - i*inc
-        speed = map(lambda row: find_speed(row, threshold=step), reward.clone().detach())
-        speed = torch.Tensor(list(speed))
-        speed_mean = np.nanmean(speed)
-        num_nan = torch.sum(torch.isnan(speed)).item()
+    speed_tensor = metrics["speeds"][0]
+    speed_length = metrics["num_nans"][0].item()
 
-        thresholds.append(step)
-        num_nans.append(num_nan)
-        speed_means.append(speed_mean)
+    thresholds = thresholds[1:]
+    num_nans = metrics["num_nans"][1:].tolist()
+    speed_means = metrics["speed_means"][1:].tolist()
 
     # Get Unique Episode Rewards
     episode_reward = episode_reward[::2]
@@ -1,46 +1,53 @@
 from benchmarl.algorithms import MaddpgConfig
 from benchmarl.environments import IdiolectEvoTask, VmasTask
-from benchmarl.experiment import Experiment, ExperimentConfig
+from benchmarl.experiment import Evaluator, ExperimentConfig
 from benchmarl.models.mlp import MlpConfig
+from metrics import reward_metrics
+from result_cache import evaluator_config, ResultCache
 import torch, itertools, csv, os
 import numpy as np
 import scipy.stats as st
 import matplotlib.pyplot as plt
 
-def run_benchmark(task, PATH, seed, share_params):
+def run_benchmark(task, PATH, seed, share_params, cache=None):
     # Loads from "benchmarl/conf/experiment/base_experiment.yaml"
     experiment_config = ExperimentConfig.get_from_yaml()
 
     # You can override from the script
     experiment_config.train_device = "cpu"  # Change the training device
-    experiment_config.off_policy_n_envs_per_worker = 1_000
-    experiment_config.off_policy_collected_frames_per_batch = 100_000
-    experiment_config.max_n_frames = 100_000
-    experiment_config.evaluation = False
-    experiment_config.render = False
-    experiment_config.loggers = []
-    experiment_config.checkpoint_interval = 10_000_000
     experiment_config.share_policy_params = share_params
 
     # Some basic other configs
     algorithm_config = MaddpgConfig.get_from_yaml()
     model_config = MlpConfig.get_from_yaml()
     critic_model_config = MlpConfig.get_from_yaml()
-
-    experiment = Experiment(
-        algorithm_config = algorithm_config,
-        task = task,
-        seed = seed,
-        config = experiment_config,
-        model_config = model_config,
-        critic_model_config = critic_model_config
-    )
-    
-    x = torch.load(PATH)
-    experiment = experiment.load_experiment_policy(x)
-    experiment.run(eval = True)
-    reward = experiment.reward
-    episode_reward = experiment.episode_reward
+    n_envs = 1_000
+
+    # With a ResultCache, only cells that were never evaluated with this policy, task and settings are rolled out
+    key = None
+    reward = None
+    if cache is not None:
+        key = cache.key(PATH, task, seed, share_params=share_params, n_envs=n_envs, algorithm_config=algorithm_config, model_config=model_config, experiment_config=evaluator_config(experiment_config), explore=True)
+        reward = cache.get(key)
+
+    if reward is None:
+        # Only the policy and the environment are built, one episode is rolled out in each env
+        evaluator = Evaluator(
+            algorithm_config = algorithm_config,
+            task = task,
+            seed = seed,
+            config = experiment_config,
+            model_config = model_config,
+            critic_model_config = critic_model_config,
+            n_envs = n_envs,
+            checkpoint = PATH,
+            explore = True
+        )
+        reward = evaluator.evaluate()["agents"]
+        evaluator.close()
+        if cache is not None:
+            cache.put(key, reward)
+    episode_reward = torch.sum(reward, dim=1)[:, 0]
 
     stats, mean_stats, to_graphs = process_rewards(reward, episode_reward)
 
@@ -48,42 +55,24 @@ def run_benchmark(task, PATH, seed, share_params):
 
 def process_rewards(reward, episode_reward):
     # Get the individual rewards for each environment
-    reward = torch.squeeze(reward, -1)[:,:,0]
-    max_rewards, _ = torch.max(reward.clone().detach(), dim=1, keepdim=True)
-    min_rewards, _ = torch.min(reward.clone().detach(), dim=1, keepdim=True)
-    mean_rewards = torch.mean(reward.clone().detach(), dim=1, keepdim=True)
-
-    # Find the last time the rewards dip under a certain threshold (speed)
-    def find_speed(row, threshold):
-        out = float('nan')
-        for idx, val in enumerate(row):
-            if (-1*val)<threshold:
-                return idx
-        return float('nan')
-    
-    # Return the speed for each row
-    speed_data = map(lambda row: find_speed(row, threshold=.2), reward.clone().detach())
-    speed_tensor = torch.Tensor(list(speed_data))
-    speed_length = torch.sum(torch.isnan(speed_tensor)).item()
-
-    thresholds = []
-    num_nans = []
-    speed_means = []
-    speeds = []
+    reward = torch.squeeze(reward, -1)[:,:,0].clone().detach()
 
+    # Speed (first step where the reward rises above -threshold) for the .2 threshold
+    # and for the threshold sweep, computed together with the reward stats in one pass
     num_steps = 20
+    thresholds = [.2] + list(np.linspace(0, 2, num_steps))
+    metrics = reward_metrics(reward, thresholds)
+
+    max_rewards = metrics["max"]
+    min_rewards = metrics["min"]
+    mean_rewards = metrics["mean"]
 
-    for step in np.linspace(0, 2, num_steps):
-        # thresh = thresh - i*inc
-        speed = map(lambda row: find_speed(row, threshold=step), reward.clone().detach())
-        speed = torch.Tensor(list(speed))
-        speeds.append(speed)
-        speed_mean = np.nanmean(speed)
-        num_nan = torch.sum(torch.isnan(speed)).item()
+    speed_tensor = metrics["speeds"][0]
+    speed_length = metrics["num_nans"][0].item()
 
-        thresholds.append(step)
-        num_nans.append(num_nan)
-        speed_means.append(speed_mean)
+    thresholds = thresholds[1:]
+    num_nans = metrics["num_nans"][1:].tolist()
+    speed_means = metrics["speed_means"][1:].tolist()
 
     stats = {
         "Max Rewards": max_rewards.squeeze(),
@@ -91,7 +80,7 @@ def process_rewards(reward, episode_reward):
         "Mean Rewards": mean_rewards.squeeze(),
         "Episode Rewards": episode_reward,
         "Speeds": speed_tensor,
-        "All Speed Data": [np.nanmean(tsr) for tsr in speeds],
+        "All Speed Data": speed_means,
         "Speed Length": speed_length,
         "Percent Nans": [x/10000 for x in num_nans]
     }
@@ -187,7 +176,7 @@ def eval_pairs(pairs, out_dict):
 #     save_path = type+'_graph.png'
 #     plt.savefig(save_path)
 
-def generate_data(paths, seed, share_params, noise = False):
+def generate_data(paths, seed, share_params, noise = False, cache = None):
     # NOISE PARAMETER REPRESENTS WETHER NOISY COMPARISONS OR NON-NOISY
     old_task = VmasTask.SIMPLE_REFERENCE.get_from_yaml() if not noise else VmasTask.SIMPLE_REFERENCE_IDIOLECT.get_from_yaml()
     new_task = IdiolectEvoTask.SPEED_NEW.get_from_yaml() if not noise else IdiolectEvoTask.SPEED_NEW_NOISE.get_from_yaml()
@@ -197,16 +186,16 @@ def generate_data(paths, seed, share_params, noise = False):
     noise_path = paths[1]
 
     # Get Stats for old environment
-    universal_old, universal_old_means, universal_old_graphs = run_benchmark(old_task, universal_path, seed, share_params[0])
-    noise_old, noise_old_means, noise_old_graphs = run_benchmark(old_task, noise_path, seed, share_params[1])
+    universal_old, universal_old_means, universal_old_graphs = run_benchmark(old_task, universal_path, seed, share_params[0], cache=cache)
+    noise_old, noise_old_means, noise_old_graphs = run_benchmark(old_task, noise_path, seed, share_params[1], cache=cache)
     old_evals = [universal_old, noise_old]
     old_means = [universal_old_means, noise_old_means]
     old_pairs = list(itertools.combinations(old_evals, 2))
     old_graphs = [universal_old_graphs, noise_old_graphs]
 
     # Get Stats for new environment
-    universal_new, universal_new_means, universal_new_graphs = run_benchmark(new_task, universal_path, seed, share_params[0])
-    noise_new, noise_new_means, noise_new_graphs = run_benchmark(new_task, noise_path, seed, share_params[1])
+    universal_new, universal_new_means, universal_new_graphs = run_benchmark(new_task, universal_path, seed, share_params[0], cache=cache)
+    noise_new, noise_new_means, noise_new_graphs = run_benchmark(new_task, noise_path, seed, share_params[1], cache=cache)
     new_evals = [universal_new, noise_new]
     new_means = [universal_new_means, noise_new_means]
     new_pairs = list(itertools.combinations(new_evals, 2))
@@ -589,7 +578,7 @@ def make_list(trials):
 
     return uni_to_graphs, idio_to_graphs
 
-def plot_comparisons(sim_paths, folder = "", noise = False):
+def plot_comparisons(sim_paths, folder = "", noise = False, cache = None):
 
     # Initialize arrays for graphing
     old_trials = []
@@ -600,7 +589,7 @@ def plot_comparisons(sim_paths, folder = "", noise = False):
     # Generate Stats
     for seed in range(seeds):
         print("SEED ", seed)
-        old_evals, new_evals, old_means, new_means, old_graphs, new_graphs = generate_data(sim_paths, seed, [True, False], noise=noise)
+        old_evals, new_evals, old_means, new_means, old_graphs, new_graphs = generate_data(sim_paths, seed, [True, False], noise=noise, cache=cache)
         old_trials.append(old_graphs)
         new_trials.append(new_graphs)
         evals["old"].append(old_evals)
@@ -645,7 +634,9 @@ if __name__ == "__main__":
     # Seed
     seeds = 30
 
-    plot_comparisons(sim_paths_noiseless_one, folder="FirstCheckpoints/NoNoise/", noise = False)
-    plot_comparisons(sim_paths_noisy_one, folder="FirstCheckpoints/WithNoise/", noise = True)
-    plot_comparisons(sim_paths_noiseless_two, folder="SecondCheckpoints/NoNoise/", noise = False)
-    plot_comparisons(sim_paths_noisy_two, folder="SecondCheckpoints/WithNoise/", noise = True)
\ No newline at end of file
+    # Re-running the sweep only rolls out the cells that are not cached yet
+    cache = ResultCache()
+    plot_comparisons(sim_paths_noiseless_one, folder="FirstCheckpoints/NoNoise/", noise = False, cache = cache)
+    plot_comparisons(sim_paths_noisy_one, folder="FirstCheckpoints/WithNoise/", noise = True, cache = cache)
+    plot_comparisons(sim_paths_noiseless_two, folder="SecondCheckpoints/NoNoise/", noise = False, cache = cache)
+    plot_comparisons(sim_paths_noisy_two, folder="SecondCheckpoints/WithNoise/", noise = True, cache = cache)
\ No newline at end of file
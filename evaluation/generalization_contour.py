@@ -1,6 +1,6 @@
 from benchmarl.algorithms import MaddpgConfig
 from benchmarl.environments import IdiolectEvoTask, VmasTask
-from benchmarl.experiment import Experiment, ExperimentConfig
+from benchmarl.experiment import Evaluator, ExperimentConfig
 from benchmarl.models.mlp import MlpConfig
 import torch, itertools, csv, os
 import numpy as np
@@ -13,13 +13,6 @@ def run_benchmark(task, PATH, seed, share_params):
 
     # You can override from the script
     experiment_config.train_device = "cpu"  # Change the training device
-    experiment_config.off_policy_n_envs_per_worker = 10_000
-    experiment_config.off_policy_collected_frames_per_batch = 1_000_000
-    experiment_config.max_n_frames = 1_000_000
-    experiment_config.evaluation = False
-    experiment_config.render = False
-    experiment_config.loggers = []
-    experiment_config.checkpoint_interval = 100_000_000
     experiment_config.share_policy_params = share_params
 
     # Some basic other configs
@@ -27,17 +20,17 @@ def run_benchmark(task, PATH, seed, share_params):
     model_config = MlpConfig.get_from_yaml()
     critic_model_config = MlpConfig.get_from_yaml()
 
-    experiment = Experiment(
+    # Only the policy and the environment are built, one episode is rolled out in each env
+    evaluator = Evaluator(
         algorithm_config = algorithm_config,
         task = task,
         seed = seed,
         config = experiment_config,
         model_config = model_config,
-        critic_model_config = critic_model_config
+        critic_model_config = critic_model_config,
+        n_envs = 10_000,
+        checkpoint = PATH
     )
-
-    x = torch.load(PATH)
-    experiment = experiment.load_experiment_policy(x)
-    experiment.run(eval = True)
-    reward = experiment.reward
-    episode_reward = experiment.episode_reward
\ No newline at end of file
+    reward = evaluator.evaluate()["agents"]
+    episode_reward = torch.sum(reward, dim=1)[:, 0]
+    evaluator.close()
\ No newline at end of file
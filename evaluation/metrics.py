@@ -0,0 +1,23 @@
+import torch
+
+def first_crossings(reward, thresholds):
+    # First step at which each env's reward rises above -threshold (the "speed"), for every threshold at once
+    # reward: (n_envs, n_steps), thresholds: (n_thresholds,) -> (n_thresholds, n_envs), nan if it never happens
+    thresholds = torch.as_tensor(thresholds, dtype=reward.dtype, device=reward.device)
+    crossed = (-1*reward).unsqueeze(0) < thresholds.view(-1, 1, 1)
+
+    # argmax returns the first maximal index, i.e. the first crossing
+    first_idx = torch.argmax(crossed.to(torch.uint8), dim=-1).to(reward.dtype)
+    return torch.where(crossed.any(dim=-1), first_idx, torch.full_like(first_idx, float('nan')))
+
+def reward_metrics(reward, thresholds):
+    # Per env reward stats and per threshold speed stats of (n_envs, n_steps) rewards
+    speeds = first_crossings(reward, thresholds)
+    return {
+        "max": reward.max(dim=1).values,
+        "min": reward.min(dim=1).values,
+        "mean": reward.mean(dim=1),
+        "speeds": speeds,
+        "num_nans": torch.isnan(speeds).sum(dim=1),
+        "speed_means": torch.nanmean(speeds, dim=1)
+    }
@@ -0,0 +1,93 @@
+import hashlib, json, os
+from dataclasses import asdict
+import numpy as np
+import torch
+from benchmarl.experiment.checkpoint import load_checkpoint, policy_checkpoint_file
+
+# Evaluation results are stored once per (policy weights, task config, seed, eval settings),
+# so re-running a sweep only rolls out the cells that are missing
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+_file_hashes = {}
+
+# Experiment config fields that the Evaluator uses, the other fields only matter for training
+EVALUATOR_CONFIG_FIELDS = ("sampling_device", "train_device", "share_policy_params", "prefer_continuous_actions")
+
+def file_hash(path):
+    # Hash of the file contents, memoized while the file is unchanged
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+def policy_hash(checkpoint):
+    # Hash of the policy the Evaluator loads from checkpoint. Like load_checkpoint, this is the sibling
+    # policy_{frames}.pt when it exists. Otherwise only the policy state of the full checkpoint is hashed,
+    # its memory-mapped replay buffer is never read.
+    policy_file = policy_checkpoint_file(checkpoint)
+    if policy_file.is_file():
+        return file_hash(policy_file)
+    stat = os.stat(checkpoint)
+    memo_key = ("policy", os.path.abspath(checkpoint), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        policy_state_dict = load_checkpoint(checkpoint)["collector"]["policy_state_dict"]
+        digest = hashlib.sha256()
+        for name, value in sorted(policy_state_dict.items()):
+            digest.update(name.encode())
+            if isinstance(value, torch.Tensor):
+                value = value.detach().cpu().contiguous()
+                digest.update(f"{value.dtype}{tuple(value.shape)}".encode())
+                digest.update(value.view(-1).view(torch.uint8).numpy().tobytes())
+            else:
+                digest.update(repr(value).encode())
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+def _as_dict(config):
+    return asdict(config) if hasattr(config, '__dataclass_fields__') else config
+
+def evaluator_config(experiment_config):
+    # The part of an ExperimentConfig that changes the rollouts of an Evaluator, to pass as a key setting
+    return {field: getattr(experiment_config, field) for field in EVALUATOR_CONFIG_FIELDS}
+
+class ResultCache:
+    def __init__(self, folder=None):
+        # EVAL_CACHE_DIR is read when the cache is created, not when the module is imported
+        self.folder = folder if folder is not None else os.environ.get("EVAL_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+    def key(self, checkpoint, task, seed, **settings):
+        # settings holds everything else that changes the rollouts (n_envs, share_params, configs, ...)
+        description = {
+            "checkpoint": policy_hash(checkpoint),
+            "task": f"{task.env_name()}/{task.name.lower()}",
+            "task_config": task.config,
+            "seed": seed,
+            "settings": {name: _as_dict(value) for name, value in settings.items()},
+        }
+        encoded = json.dumps(description, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + '.npz')
+
+    def get(self, key):
+        # Returns the stored reward tensor, or None if this cell was never evaluated
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        with np.load(path) as data:
+            return torch.from_numpy(data["reward"])
+
+    def put(self, key, reward):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written to a temporary file first so that concurrent sweeps never read a partial result
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, reward=reward.detach().cpu().numpy())
+        os.replace(tmp_path, path)
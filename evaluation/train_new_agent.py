@@ -1,6 +1,8 @@
 from benchmarl.algorithms import MaddpgConfig
 from benchmarl.environments import IdiolectEvoTask, VmasTask
-from benchmarl.experiment import Experiment, ExperimentConfig
+from benchmarl.experiment import Evaluator, Experiment, ExperimentConfig
+from benchmarl.experiment.checkpoint import load_checkpoint
+from benchmarl.experiment.pairing import CheckpointPairingEvaluator
 from benchmarl.models.mlp import MlpConfig
 import torch, itertools, csv, os, random, sys, argparse
 import numpy as np
@@ -147,6 +149,27 @@ def sub_policy_unshared(policy_one, policy_two):
 
     return combined_policy
 
+def sub_policy_actors(base_policy, policy_one, policy_two, shared):
+    # Same substitution as sub_policy_shared / sub_policy_unshared, restricted to the collection policy
+    prefix = 'module.0.td_module.module.0.mlp.agent_networks.'
+    combined_policy = base_policy['collector']['policy_state_dict']
+    pop0_policy = policy_one['collector']['policy_state_dict']
+    pop1_policy = policy_two['collector']['policy_state_dict']
+
+    for idx in range(3):
+        layer_idx = idx*2
+        for param in ['weight', 'bias']:
+            key0 = prefix+'0.'+str(layer_idx)+'.'+param
+            key1 = prefix+'1.'+str(layer_idx)+'.'+param
+            if shared:
+                combined_policy[key0] = pop0_policy[key0]
+                combined_policy[key1] = pop1_policy[key0]
+            else:
+                combined_policy[key0] = pop1_policy[key0]
+
+    combined_policy['module.0.sigma'] = pop0_policy['module.0.sigma']
+    return base_policy
+
 def agent_integration(task, PATH_ONE, PATH_TWO, seed, agent, shared, save_path = None, train=False, vis = False):
     assert agent < 2
 
@@ -173,13 +196,26 @@ def agent_integration(task, PATH_ONE, PATH_TWO, seed, agent, shared, save_path =
         experiment_config.save_folder = save_path
 
     else:
-        experiment_config.off_policy_n_envs_per_worker = 100
-        experiment_config.off_policy_collected_frames_per_batch = 10_000
-        experiment_config.max_n_frames = 10_000
-        experiment_config.evaluation = False
-        experiment_config.render = False
-        experiment_config.loggers = []
-        experiment_config.checkpoint_interval = 10_000_000
+        # Evaluation only needs the policy and the environment
+        evaluator = Evaluator(
+            algorithm_config = algorithm_config,
+            task = task,
+            seed = seed,
+            config = experiment_config,
+            model_config = model_config,
+            critic_model_config = critic_model_config,
+            n_envs = 100
+        )
+
+        policy_one = load_checkpoint(PATH_ONE)
+        policy_two = load_checkpoint(PATH_TWO)
+
+        base_policy = evaluator.state_dict() if shared else policy_one
+        evaluator.load_state_dict(sub_policy_actors(base_policy, policy_one, policy_two, shared))
+
+        reward = evaluator.evaluate()["agents"]
+        evaluator.close()
+        return torch.sum(reward, dim=1)[:, 0]
 
     experiment = Experiment(
         algorithm_config = algorithm_config,
@@ -192,12 +228,13 @@ def agent_integration(task, PATH_ONE, PATH_TWO, seed, agent, shared, save_path =
 
     experiment_policy = experiment.state_dict()
 
-    policy_one = torch.load(PATH_ONE)
-    policy_two = torch.load(PATH_TWO)
+    policy_one = load_checkpoint(PATH_ONE)
+    policy_two = load_checkpoint(PATH_TWO)
                             
     combined_policy = sub_policy_unshared(policy_one, policy_two) if not shared else sub_policy_shared(experiment_policy, policy_one, policy_two)
 
-    combined_policy['buffer_agents']['_storage']['_storage'] = policy_one['buffer_agents']['_storage']['_storage']
+    if 'buffer_agents' in policy_one:
+        combined_policy['buffer_agents']['_storage']['_storage'] = policy_one['buffer_agents']['_storage']['_storage']
     combined_policy['collector']['policy_state_dict']['module.0.sigma'] = policy_one['collector']['policy_state_dict']['module.0.sigma']
 
     experiment = experiment.load_experiment_policy(combined_policy)
@@ -366,12 +403,13 @@ def get_comms(task, PATH_ONE, PATH_TWO, shared, seed, agent):
 
     experiment_policy = experiment.state_dict()
 
-    policy_one = torch.load(PATH_ONE)
-    policy_two = torch.load(PATH_TWO)
+    policy_one = load_checkpoint(PATH_ONE)
+    policy_two = load_checkpoint(PATH_TWO)
                             
     combined_policy = sub_policy_unshared(policy_one, policy_two) if not shared else sub_policy_shared(experiment_policy, policy_one, policy_two)
 
-    combined_policy['buffer_agents']['_storage']['_storage'] = policy_one['buffer_agents']['_storage']['_storage']
+    if 'buffer_agents' in policy_one:
+        combined_policy['buffer_agents']['_storage']['_storage'] = policy_one['buffer_agents']['_storage']['_storage']
     combined_policy['collector']['policy_state_dict']['module.0.sigma'] = policy_one['collector']['policy_state_dict']['module.0.sigma']
 
     experiment = experiment.load_experiment_policy(combined_policy)
@@ -385,18 +423,24 @@ def plot_heatmap(paths, task, seeds, shared, checkpoints, save_path, scenario):
     if not os.path.isdir(save_path):
         os.makedirs(save_path)
     
-    heat = np.zeros((len(checkpoints)*3, len(checkpoints)*3))
-    
     paths = [path+"checkpoint_"+str(checkpoint)+".pt" for path in paths for checkpoint in checkpoints]
     labels = [str(checkpoint) for checkpoint in checkpoints]+[str(checkpoint) for checkpoint in checkpoints]+[str(checkpoint) for checkpoint in checkpoints]
 
-    for idx_x, path_x in enumerate(paths):
-        for idx_y, path_y in enumerate(paths):
-            rewards = []
-            for seed in range(seeds):
-                reward = agent_integration(task=task, PATH_ONE=path_x, PATH_TWO=path_y, seed=seed, agent=0, shared=shared)
-                rewards.append(reward)
-            heat[idx_x][idx_y] = np.mean(rewards)
+    # Same agent substitution as agent_integration:
+    # shared -> agent 0 from path_x and agent 1 from path_y, both using network 0
+    # unshared -> agent 0 is network 0 of path_y, agent 1 is network 1 of path_x
+    if shared:
+        pairings = [((path_x, 0), (path_y, 0)) for path_x in paths for path_y in paths]
+    else:
+        pairings = [((path_y, 0), (path_x, 1)) for path_x in paths for path_y in paths]
+
+    # As in agent_integration, the exploration sigma is the one of path_x
+    sigma_sources = [path_x for path_x in paths for path_y in paths]
+
+    # Every cell of the heatmap is evaluated in the same vectorized rollout
+    evaluator = CheckpointPairingEvaluator(task, n_envs_per_pairing=100)
+    rewards = torch.stack([evaluator.evaluate(pairings, seed=seed, reward_agent=0, sigma_sources=sigma_sources).mean(-1) for seed in range(seeds)])
+    heat = rewards.mean(0).view(len(paths), len(paths)).cpu().numpy()
 
     # Plot Heatmap
     ax = sns.heatmap(heat, linewidth=0.5, xticklabels=labels, yticklabels=labels)
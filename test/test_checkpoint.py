@@ -0,0 +1,23 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import torch
+
+from benchmarl.experiment.checkpoint import load_checkpoint, policy_checkpoint_file
+
+
+def test_load_prefers_policy_checkpoint(tmp_path):
+    checkpoint_file = tmp_path / "checkpoint_300.pt"
+    assert policy_checkpoint_file(checkpoint_file) == tmp_path / "policy_300.pt"
+
+    torch.save({"buffer_agents": torch.zeros(3), "w": torch.ones(2)}, checkpoint_file)
+    assert "buffer_agents" in load_checkpoint(checkpoint_file)
+
+    torch.save({"w": torch.ones(2)}, policy_checkpoint_file(checkpoint_file))
+    loaded = load_checkpoint(checkpoint_file)
+    assert "buffer_agents" not in loaded
+    assert torch.equal(loaded["w"], torch.ones(2))
+    assert "buffer_agents" in load_checkpoint(checkpoint_file, policy_only=False)
@@ -0,0 +1,84 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import torch
+
+from benchmarl.eval_results import load_and_merge_json_dicts
+from benchmarl.experiment.logger import compact_jsonl, JsonWriter
+
+
+def _write_steps(writer, n_steps):
+    for step in range(n_steps):
+        writer.write(
+            total_frames=100 * (step + 1),
+            metrics={
+                "return": torch.tensor([float(step), -float(step)]),
+                "win_rate": torch.tensor([]),
+            },
+            evaluation_step=step,
+        )
+
+
+def _expected_run(n_steps):
+    run = {"absolute_metrics": {"return": [float(n_steps - 1)]}}
+    for step in range(n_steps):
+        run[f"step_{step}"] = {
+            "step_count": 100 * (step + 1),
+            "return": [float(step), -float(step)],
+            "win_rate": [],
+        }
+    return run
+
+
+def _writer(folder, seed):
+    return JsonWriter(
+        folder=str(folder),
+        name=f"experiment_{seed}.json",
+        algorithm_name="mappo",
+        task_name="balance",
+        environment_name="vmas",
+        seed=seed,
+    )
+
+
+def test_json_writer_finalize(tmp_path):
+    writer = _writer(tmp_path, seed=0)
+    _write_steps(writer, 3)
+    writer.finalize()
+
+    # A run that stopped before finalizing is recovered from its jsonl file
+    unfinalized_writer = _writer(tmp_path, seed=1)
+    _write_steps(unfinalized_writer, 2)
+    assert not unfinalized_writer.path.exists()
+    compact_jsonl(unfinalized_writer.stream_path, unfinalized_writer.path)
+
+    merged = load_and_merge_json_dicts([str(writer.path), str(unfinalized_writer.path)])
+    assert merged == {
+        "vmas": {
+            "balance": {
+                "mappo": {"seed_0": _expected_run(3), "seed_1": _expected_run(2)}
+            }
+        }
+    }
+
+
+def test_json_writer_resumed_run(tmp_path):
+    _write_steps(_writer(tmp_path, seed=0), 3)
+    # The resumed run appends to the same file, the absolute metrics cover both runs
+    writer = _writer(tmp_path, seed=0)
+    writer.write(
+        total_frames=400,
+        metrics={"return": torch.tensor([-1.0])},
+        evaluation_step=3,
+    )
+    writer.finalize()
+
+    run = load_and_merge_json_dicts([str(writer.path)])["vmas"]["balance"]["mappo"][
+        "seed_0"
+    ]
+    assert run["absolute_metrics"] == {"return": [2.0]}
+    assert run["step_3"] == {"step_count": 400, "return": [-1.0]}
+    assert run["step_0"]["return"] == [0.0, -0.0]
@@ -0,0 +1,60 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "evaluation"))
+from metrics import reward_metrics  # noqa: E402
+
+
+def find_speed(row, threshold):
+    # The per-row loop that reward_metrics replaces in process_rewards
+    for idx, val in enumerate(row):
+        if (-1 * val) < threshold:
+            return idx
+    return float("nan")
+
+
+def test_reward_metrics_matches_find_speed():
+    generator = torch.Generator().manual_seed(0)
+    reward = -3 * torch.rand(30, 25, generator=generator)
+    # Rows that never cross any threshold
+    reward[:5] = -3.0
+    # Rewards sitting exactly on the 0 and 2 threshold edges
+    reward[5] = 0.0
+    reward[6] = -2.0
+    reward[7, 10:] = 0.0
+    thresholds = [0.2] + list(np.linspace(0, 2, 20))
+
+    metrics = reward_metrics(reward, thresholds)
+
+    assert torch.equal(metrics["max"], reward.max(dim=1).values)
+    assert torch.equal(metrics["min"], reward.min(dim=1).values)
+    assert torch.allclose(metrics["mean"], reward.mean(dim=1))
+    for i, threshold in enumerate(thresholds):
+        speed = torch.Tensor([find_speed(row, threshold=threshold) for row in reward])
+        assert torch.allclose(
+            metrics["speeds"][i], speed, rtol=0, atol=0, equal_nan=True
+        )
+        assert metrics["num_nans"][i].item() == torch.sum(torch.isnan(speed)).item()
+        with warnings.catch_warnings():
+            # The mean of a threshold that no row crosses is nan
+            warnings.simplefilter("ignore", RuntimeWarning)
+            speed_mean = np.nanmean(speed)
+        np.testing.assert_allclose(
+            metrics["speed_means"][i].item(), speed_mean, equal_nan=True
+        )
+    # Rewards are never positive, so the 0 threshold is never crossed
+    assert metrics["num_nans"][1].item() == len(reward)
+    assert torch.isnan(metrics["speed_means"][1])
+    # A reward of exactly -2 does not cross the 2 threshold, a reward of 0 does
+    assert torch.isnan(metrics["speeds"][-1, [0, 1, 2, 3, 4, 6]]).all()
+    assert metrics["speeds"][-1, 5].item() == 0
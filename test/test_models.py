@@ -5,12 +5,16 @@
 #
 
 import pytest
+import torch
 
 from benchmarl.hydra_config import load_model_config_from_hydra
 from benchmarl.models import model_config_registry
 
 from benchmarl.models.common import SequenceModelConfig
+from benchmarl.models.mlp import AgentBatchedMLP
 from hydra import compose, initialize
+from torch import nn
+from torchrl.modules import MLP
 
 
 @pytest.mark.parametrize("model_name", model_config_registry.keys())
@@ -50,3 +54,30 @@ def test_loading_sequence_models(model_name, intermidiate_size=10):
             intermediate_sizes=[intermidiate_size, intermidiate_size],
         )
         assert hydra_model_config == yaml_config
+
+
+@pytest.mark.parametrize("networks_key", ["agent_networks", ""])
+def test_agent_batched_mlp(networks_key, n_agents=3):
+    kwargs = {"num_cells": [8, 4], "activation_class": nn.Tanh}
+    networks = nn.ModuleList(
+        [MLP(in_features=5, out_features=2, **kwargs) for _ in range(n_agents)]
+    )
+    state_dict = (
+        nn.ModuleDict({networks_key: networks}) if len(networks_key) else networks
+    ).state_dict()
+
+    model = AgentBatchedMLP(
+        in_features=5,
+        out_features=2,
+        n_agents=n_agents,
+        networks_key=networks_key,
+        **kwargs,
+    )
+    model.load_state_dict(state_dict)
+    assert list(model.state_dict().keys()) == list(state_dict.keys())
+
+    input = torch.randn(4, 6, n_agents, 5)
+    expected = torch.stack(
+        [net(input[..., i, :]) for i, net in enumerate(networks)], dim=-2
+    )
+    assert torch.allclose(model(input), expected, atol=1e-6)
@@ -0,0 +1,108 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import torch
+
+from benchmarl.experiment.pairing import (
+    batched_mlp_forward,
+    load_actor_checkpoint,
+    tanh_delta_mode,
+)
+from tensordict import TensorDict
+from tensordict.nn import TensorDictModule
+from torch import nn
+from torchrl.data import BoundedTensorSpec
+from torchrl.envs.utils import ExplorationType, set_exploration_type
+from torchrl.modules import MultiAgentMLP, ProbabilisticActor, TanhDelta
+
+
+def _mlp():
+    return nn.Sequential(
+        nn.Linear(5, 8), nn.Tanh(), nn.Linear(8, 8), nn.Tanh(), nn.Linear(8, 3)
+    )
+
+
+def test_load_and_batched_forward(tmp_path):
+    networks = [_mlp(), _mlp()]
+    policy_state_dict = {"module.0.sigma": torch.tensor(0.1)}
+    for i, network in enumerate(networks):
+        for key, value in network.state_dict().items():
+            policy_state_dict[
+                f"module.0.td_module.module.0.mlp.agent_networks.{i}.{key}"
+            ] = value
+    path = tmp_path / "checkpoint.pt"
+    torch.save({"collector": {"policy_state_dict": policy_state_dict}}, path)
+
+    checkpoint = load_actor_checkpoint(str(path))
+    assert len(checkpoint.networks) == 2
+    assert checkpoint.sigma == torch.tensor(0.1).item()
+
+    layers = [
+        (
+            torch.stack([checkpoint.get_network(i)[layer][0] for i in range(2)]),
+            torch.stack([checkpoint.get_network(i)[layer][1] for i in range(2)]),
+        )
+        for layer in range(3)
+    ]
+    input = torch.randn(2, 4, 5)
+    with torch.no_grad():
+        out = batched_mlp_forward(layers, input, nn.Tanh())
+        expected = torch.stack([networks[i](input[i]) for i in range(2)])
+    assert torch.allclose(out, expected, atol=1e-6)
+
+
+def test_tanh_delta_mode_matches_actor(tmp_path):
+    n_agents = 2
+    # Bounds of each agent, the mode of TanhDelta is not their midpoint
+    low, high = torch.tensor([0.0, -2.0, 0.0]), torch.tensor([1.0, 2.0, 3.0])
+    spec = BoundedTensorSpec(
+        low.expand(n_agents, 3), high.expand(n_agents, 3), shape=(n_agents, 3)
+    )
+    policy = ProbabilisticActor(
+        module=TensorDictModule(
+            MultiAgentMLP(
+                n_agent_inputs=5,
+                n_agent_outputs=3,
+                n_agents=n_agents,
+                centralised=False,
+                share_params=False,
+                depth=2,
+                num_cells=8,
+                activation_class=nn.Tanh,
+            ),
+            in_keys=[("agents", "observation")],
+            out_keys=[("agents", "param")],
+        ),
+        spec=spec,
+        in_keys=[("agents", "param")],
+        out_keys=[("agents", "action")],
+        distribution_class=TanhDelta,
+        distribution_kwargs={"min": spec.space.low, "max": spec.space.high},
+        return_log_prob=False,
+    )
+    policy_state_dict = {
+        f"module.0.td_module.module.0.mlp.{key}": value
+        for key, value in policy.module[0].module.state_dict().items()
+    }
+    path = tmp_path / "checkpoint.pt"
+    torch.save({"collector": {"policy_state_dict": policy_state_dict}}, path)
+    checkpoint = load_actor_checkpoint(str(path))
+
+    observation = torch.randn(4, n_agents, 5)
+    with torch.no_grad(), set_exploration_type(ExplorationType.MODE):
+        expected = policy(
+            TensorDict({("agents", "observation"): observation}, batch_size=[4])
+        ).get(("agents", "action"))
+        layers = [
+            (
+                torch.stack([checkpoint.get_network(i)[layer][0] for i in range(2)]),
+                torch.stack([checkpoint.get_network(i)[layer][1] for i in range(2)]),
+            )
+            for layer in range(3)
+        ]
+        param = batched_mlp_forward(layers, observation.transpose(0, 1), nn.Tanh())
+        action = tanh_delta_mode(param, low, high).transpose(0, 1)
+    assert torch.allclose(action, expected, atol=1e-6)
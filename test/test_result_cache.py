@@ -0,0 +1,68 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import sys
+from pathlib import Path
+
+import torch
+
+from benchmarl.environments import VmasTask
+from benchmarl.experiment import ExperimentConfig
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "evaluation"))
+from result_cache import evaluator_config, ResultCache  # noqa: E402
+
+
+def _save_checkpoint(path, weight, buffer):
+    torch.save(
+        {
+            "collector": {"policy_state_dict": {"weight": weight}},
+            "buffer_agents": {"storage": buffer},
+        },
+        path,
+    )
+
+
+def test_result_cache(tmp_path):
+    checkpoint = tmp_path / "checkpoint_100.pt"
+    _save_checkpoint(checkpoint, torch.ones(3), torch.zeros(10))
+    task = VmasTask.BALANCE.get_from_yaml()
+    experiment_config = ExperimentConfig.get_from_yaml()
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    def key(seed=0, **config_overrides):
+        config = evaluator_config(experiment_config)
+        config.update(config_overrides)
+        return cache.key(
+            str(checkpoint), task, seed, n_envs=10, experiment_config=config
+        )
+
+    assert key() == key()
+    assert cache.get(key()) is None
+    reward = torch.randn(10, 5, 2, 1)
+    cache.put(key(), reward)
+    assert torch.equal(cache.get(key()), reward)
+
+    # The evaluator settings and the seed are part of the key
+    prefer_continuous = experiment_config.prefer_continuous_actions
+    assert cache.get(key(prefer_continuous_actions=not prefer_continuous)) is None
+    assert cache.get(key(sampling_device="cuda")) is None
+    assert cache.get(key(seed=1)) is None
+
+    # Only the policy is part of the key
+    _save_checkpoint(checkpoint, torch.ones(3), torch.ones(20))
+    assert torch.equal(cache.get(key()), reward)
+    _save_checkpoint(checkpoint, torch.zeros(3), torch.ones(20))
+    assert cache.get(key()) is None
+
+    # When it exists, the policy checkpoint loaded by the Evaluator is the one hashed
+    cache.put(key(), reward)
+    policy_checkpoint = tmp_path / "policy_100.pt"
+    torch.save(
+        {"collector": {"policy_state_dict": {"weight": torch.ones(4)}}},
+        policy_checkpoint,
+    )
+    assert cache.get(key()) is None
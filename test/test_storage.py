@@ -0,0 +1,104 @@
+#  Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+#  This source code is licensed under the license found in the
+#  LICENSE file in the root directory of this source tree.
+#
+
+import pytest
+import torch
+from benchmarl.algorithms.storage import CompactTensorStorage
+from tensordict import TensorDict
+from torchrl.data import LazyTensorStorage, TensorDictReplayBuffer
+from torchrl.data.replay_buffers import RandomSampler
+
+
+def collected_batch(n_envs, n_steps, n_agents=3, seed=0):
+    """A flattened collector batch where episodes end at random and restart from a new observation"""
+    generator = torch.Generator().manual_seed(seed)
+    next_obs = torch.randn(n_envs, n_steps, n_agents, 5, generator=generator)
+    reset_obs = torch.randn(n_envs, n_steps, n_agents, 5, generator=generator)
+    done = torch.rand(n_envs, n_steps, 1, generator=generator) < 0.2
+    obs = torch.randn(n_envs, n_steps, n_agents, 5, generator=generator)
+    obs[:, 1:] = torch.where(done[:, :-1, :, None], reset_obs[:, 1:], next_obs[:, :-1])
+    reward = torch.randn(n_envs, n_steps, 1, generator=generator)
+    agent_shape = (n_envs, n_steps, n_agents, 1)
+    batch = TensorDict(
+        {
+            ("agents", "observation"): obs,
+            ("agents", "action"): torch.randn(
+                n_envs, n_steps, n_agents, 2, generator=generator
+            ),
+            "done": torch.zeros(n_envs, n_steps, 1, dtype=torch.bool),
+            ("next", "agents", "observation"): next_obs,
+            ("next", "agents", "reward"): reward.unsqueeze(-1).expand(agent_shape),
+            ("next", "agents", "done"): done.unsqueeze(-1).expand(agent_shape),
+            ("next", "done"): done,
+        },
+        batch_size=[n_envs, n_steps],
+    )
+    return batch.reshape(-1)
+
+
+def make_buffer(storage):
+    return TensorDictReplayBuffer(
+        storage=storage, sampler=RandomSampler(), batch_size=8
+    )
+
+
+@pytest.mark.parametrize("observation_dtype", [None, torch.bfloat16])
+def test_compact_storage_matches_lazy_storage(observation_dtype):
+    lazy_buffer = make_buffer(LazyTensorStorage(100))
+    compact_buffer = make_buffer(
+        CompactTensorStorage(100, observation_dtype=observation_dtype)
+    )
+    # The buffers wrap around several times
+    for seed in range(12):
+        batch = collected_batch(n_envs=3, n_steps=7 + seed % 3, seed=seed)
+        lazy_buffer.extend(batch.clone())
+        compact_buffer.extend(batch)
+
+        index = torch.arange(len(lazy_buffer))
+        expected, sampled = lazy_buffer[index], compact_buffer[index]
+        assert set(sampled.keys(True, True)) == set(expected.keys(True, True))
+        for key, value in expected.items(True, True):
+            assert sampled.get(key).dtype == value.dtype
+            assert sampled.get(key).shape == value.shape
+            if observation_dtype is not None and key[-1] == "observation":
+                value = value.to(observation_dtype).to(value.dtype)
+            assert (sampled.get(key) == value).all()
+
+    storage = compact_buffer._storage._storage
+    # Observations are stored once and the per-agent copies of the flags only once per step
+    assert ("_data", "next", "agents", "observation") not in storage.keys(True, True)
+    assert storage.get(("_data", "next", "agents", "done")).shape == (100, 1, 1)
+    if observation_dtype is not None:
+        assert (
+            storage.get(("_data", "agents", "observation")).dtype == observation_dtype
+        )
+
+
+def test_compact_storage_state_dict():
+    buffer = make_buffer(CompactTensorStorage(50))
+    for seed in range(4):
+        buffer.extend(collected_batch(n_envs=2, n_steps=10, seed=seed))
+
+    loaded_buffer = make_buffer(CompactTensorStorage(50))
+    loaded_buffer.load_state_dict(buffer.state_dict())
+    index = torch.arange(len(buffer))
+    expected, loaded = buffer[index], loaded_buffer[index]
+    for key, value in expected.items(True, True):
+        assert (loaded.get(key) == value).all()
+
+
+def test_compact_storage_larger_batches():
+    lazy_buffer = make_buffer(LazyTensorStorage(13))
+    compact_buffer = make_buffer(CompactTensorStorage(13))
+    for seed in range(6):
+        batch = collected_batch(n_envs=3, n_steps=3 + 3 * seed, seed=seed)
+        lazy_buffer.extend(batch.clone())
+        compact_buffer.extend(batch)
+
+        index = torch.arange(len(lazy_buffer))
+        expected, sampled = lazy_buffer[index], compact_buffer[index]
+        for key, value in expected.items(True, True):
+            assert (sampled.get(key) == value).all()
@@ -25,3 +25,10 @@ def test_loading_tasks(task_name):
         task_name_hydra = cfg.hydra.runtime.choices.task
         task: Task = load_task_config_from_hydra(cfg.task, task_name=task_name_hydra)
         assert task == task_config_registry[task_name].get_from_yaml()
+
+
+def test_task_yaml_is_copied():
+    config = Task._load_from_yaml("vmas/balance")
+    config["max_steps"] = -1
+    # The cached yaml is not modified by callers
+    assert Task._load_from_yaml("vmas/balance")["max_steps"] != -1
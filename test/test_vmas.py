@@ -19,7 +19,7 @@ from benchmarl.algorithms import (
 )
 from benchmarl.algorithms.common import AlgorithmConfig
 from benchmarl.environments import Task, VmasTask
-from benchmarl.experiment import Experiment
+from benchmarl.experiment import Evaluator, Experiment
 from benchmarl.models import MlpConfig
 from torch import nn
 from utils_experiment import ExperimentUtils
@@ -124,3 +124,88 @@ class TestVmas:
             task=task,
         )
         experiment.run()
+
+    @pytest.mark.parametrize("algo_config", [QmixConfig, MaddpgConfig, MasacConfig])
+    @pytest.mark.parametrize("task", [VmasTask.BALANCE])
+    def test_block_updates(
+        self,
+        algo_config: AlgorithmConfig,
+        task: Task,
+        experiment_config,
+        mlp_sequence_config,
+    ):
+        # Blocks do not divide the number of optimizer steps
+        experiment_config.off_policy_n_optimizer_steps = 5
+        experiment_config.off_policy_update_block_size = 2
+        experiment = Experiment(
+            algorithm_config=algo_config.get_from_yaml(),
+            model_config=mlp_sequence_config,
+            seed=0,
+            config=experiment_config,
+            task=task.get_from_yaml(),
+        )
+        experiment.run()
+        assert experiment.n_iters_performed == experiment_config.max_n_iters
+
+    @pytest.mark.parametrize("algo_config", [QmixConfig, MaddpgConfig])
+    @pytest.mark.parametrize("task", [VmasTask.BALANCE])
+    def test_compact_storage(
+        self,
+        algo_config: AlgorithmConfig,
+        task: Task,
+        experiment_config,
+        mlp_sequence_config,
+    ):
+        experiment_config.off_policy_compact_storage = True
+        experiment_config.off_policy_observation_dtype = "bfloat16"
+        experiment = Experiment(
+            algorithm_config=algo_config.get_from_yaml(),
+            model_config=mlp_sequence_config,
+            seed=0,
+            config=experiment_config,
+            task=task.get_from_yaml(),
+        )
+        experiment.run()
+
+    @pytest.mark.parametrize("task", [VmasTask.BALANCE])
+    def test_evaluator_from_policy_checkpoint(
+        self,
+        task: Task,
+        experiment_config,
+        mlp_sequence_config,
+    ):
+        task = task.get_from_yaml()
+        algo_config = MaddpgConfig.get_from_yaml()
+        experiment = Experiment(
+            algorithm_config=algo_config,
+            model_config=mlp_sequence_config,
+            seed=0,
+            config=experiment_config,
+            task=task,
+        )
+        experiment.run()
+        checkpoint_file = (
+            experiment.folder_name
+            / "checkpoints"
+            / f"checkpoint_{experiment.total_frames}.pt"
+        )
+        assert (
+            checkpoint_file.parent / f"policy_{experiment.total_frames}.pt"
+        ).is_file()
+
+        evaluator = Evaluator(
+            algorithm_config=algo_config,
+            model_config=mlp_sequence_config,
+            seed=0,
+            config=experiment_config,
+            task=task,
+            n_envs=3,
+            checkpoint=str(checkpoint_file),
+        )
+        for param1, param2 in zip(
+            list(evaluator.policy.parameters()), list(experiment.policy.parameters())
+        ):
+            assert (param1 == param2).all()
+        rewards = evaluator.evaluate(max_steps=5)
+        for group, agents in experiment.group_map.items():
+            assert rewards[group].shape == (3, 5, len(agents), 1)
@@ -1,13 +1,14 @@
 from benchmarl.algorithms import MaddpgConfig
+from benchmarl.benchmark import run_parallel
 from benchmarl.environments import IdiolectEvoTask, VmasTask
-from benchmarl.experiment import Experiment, ExperimentConfig
+from benchmarl.experiment import ExperimentConfig
 from benchmarl.models.mlp import MlpConfig
 import torch, itertools, csv, os, random, sys, argparse
 import numpy as np
 import scipy.stats as st
 import matplotlib.pyplot as plt
 
-def run_experiment(task, shared, seed, max):
+def get_experiment(task, shared, seed, max_n_frames):
     # Loads from "benchmarl/conf/experiment/base_experiment.yaml"
     experiment_config = ExperimentConfig.get_from_yaml('fine_tuned/vmas/conf/vmas_parameters.yaml')
 
@@ -21,8 +22,8 @@ def run_experiment(task, shared, seed, max):
     experiment_config.share_policy_params = shared
     experiment_config.max_n_frames = max_n_frames
 
-    # Load Experiment
-    experiment = Experiment(
+    # Experiment arguments
+    return dict(
         algorithm_config = algorithm_config,
         task = task,
         seed = seed,
@@ -31,10 +32,12 @@ def run_experiment(task, shared, seed, max):
         critic_model_config = critic_model_config
     )
 
-    # Train
-    experiment.run(eval=True)
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="number of populations trained at the same time")
+    parser.add_argument("--retries", type=int, default=1, help="number of times a failed population is trained again")
+    args = parser.parse_args()
+
     # Set Necessary Variables
     task_noiseless = VmasTask.SIMPLE_REFERENCE.get_from_yaml()
     task_noise = VmasTask.SIMPLE_REFERENCE_IDIOLECT.get_from_yaml()
@@ -46,20 +49,18 @@ if __name__ == "__main__":
     # 3. 1x Unshared Noise
 
     # Below order is prioritized such that I can run experiments 
+    experiments = [
+        # Shared Noise
+        get_experiment(task_noise, shared=True, seed = 1, max_n_frames = max_n_frames),
+        # Unshared Noise
+        get_experiment(task_noiseless, shared=True, seed = 1, max_n_frames = max_n_frames),
+        # Shared Noise    
+        get_experiment(task_noise, shared=True, seed = 2, max_n_frames = max_n_frames),
+        # Unshared Noise
+        get_experiment(task_noiseless, shared=True, seed = 2, max_n_frames = max_n_frames),
+        # Unshared Noise
+        get_experiment(task_noise, shared=False, seed = 1, max_n_frames = max_n_frames),
+    ]
 
-    # Shared Noise
-    run_experiment(task_noise, shared=True, seed = 1, max = max_n_frames)
-    # Unshared Noise
-    run_experiment(task_noiseless, shared=True, seed = 1, max = max_n_frames)
-    # Shared Noise    
-    run_experiment(task_noise, shared=True, seed = 2, max = max_n_frames)
-    # Unshared Noise
-    run_experiment(task_noiseless, shared=True, seed = 2, max = max_n_frames)
-    # Unshared Noise
-    run_experiment(task_noise, shared=False, seed = 1, max = max_n_frames)
-
-
-
-
-
-    
\ No newline at end of file
+    # Train
+    run_parallel(experiments, n_workers = args.workers, max_retries = args.retries, run_kwargs = {"eval": True})